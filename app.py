@@ -1,23 +1,30 @@
 import streamlit as st
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 import pandas as pd
 from sqlalchemy.orm import Session
-from utils.database import get_db, init_db
-from utils.auth import get_user_by_username, verify_password
+from utils.database import engine, get_page_db, bootstrap_db, rerun_session, get_pool_stats
+from utils.instrumentacion import INSTRUMENTACION_ACTIVA, medir_rerun
+from utils.auth import authenticate, issue_session_token, validate_session_token, renew_session_token, revoke_session_tokens
 from modules.ordenes import show_ordenes_page
 from modules.inventario import show_inventario_page
 from modules.informes import show_reports_page
 from modules.productos import show_productos_page # <--- Importar el nuevo módulo de productos
+from utils.planes_mantenimiento import PLANES_EN_SEGUNDO_PLANO, start_scheduler
 
 # --- Inicialización de variables de session_state (TOP-LEVEL en app.py) ---
 # Se inicializan aquí para asegurar que estén presentes desde el inicio de la aplicación
-if 'db_initialized' not in st.session_state:
-    init_db()
-    st.session_state['db_initialized'] = True
-    print("Base de datos y usuario admin inicializados (primera carga).")
+# Esquema y usuario admin: una sola vez por proceso (no por sesión de navegador)
+bootstrap_db()
+
+# Planes de mantenimiento recurrente: hilo de fondo por proceso (opcional; ver scripts/ejecutar_planes.py)
+if PLANES_EN_SEGUNDO_PLANO:
+    start_scheduler()
 
 if 'authenticated' not in st.session_state:
     st.session_state['authenticated'] = False
 
+SESSION_QUERY_PARAM = "sesion"
+
 # Inicialización de variables para la selección de ubicación jerárquica (Órdenes de Trabajo)
 if 'hierarchy_selection' not in st.session_state:
     st.session_state.hierarchy_selection = {}
@@ -30,6 +37,33 @@ if 'inventory_hierarchy_selection' not in st.session_state:
 if 'inventory_final_selected_activo_id' not in st.session_state:
     st.session_state.inventory_final_selected_activo_id = None
 
+def sync_session_token(db: Session):
+    """
+    Al recargar el navegador se pierde session_state: se recupera el login desde el token firmado de la URL.
+    En una sesión abierta, el token se renueva mientras se usa; si venció, se revocó al cerrar sesión o
+    el usuario se desactivó, la sesión se cierra.
+    """
+    token = st.query_params.get(SESSION_QUERY_PARAM)
+    if not token:
+        return
+    if not st.session_state['authenticated']:
+        sesion = validate_session_token(db, token)
+        if sesion:
+            st.session_state['authenticated'] = True
+            st.session_state.update(sesion)
+        else:
+            del st.query_params[SESSION_QUERY_PARAM]
+        return
+    nuevo, sesion = renew_session_token(db, token)
+    if nuevo is None:
+        st.session_state.clear()
+        st.session_state['authenticated'] = False
+        st.query_params.clear()
+        st.warning("Tu sesión venció o fue cerrada. Por favor, inicia sesión de nuevo.")
+    elif nuevo != token:
+        st.query_params[SESSION_QUERY_PARAM] = nuevo
+        st.session_state.update(sesion) # Rol y nombre actuales
+
 def show_login_page():
     st.title("Sistema de Gestión")
     st.header("Por favor, inicia sesión para continuar.")
@@ -38,20 +72,22 @@ def show_login_page():
     password = st.text_input("Contraseña", type="password")
 
     if st.button("Iniciar Sesión"):
-        db: Session = next(get_db())
+        db: Session = get_page_db()
         try:
-            user = get_user_by_username(db, username)
-            if user and verify_password(password, user.password_hash):
-                st.session_state['authenticated'] = True
-                st.session_state['user_id'] = user.id
-                st.session_state['username'] = user.nombre_usuario
-                st.session_state['user_role'] = user.rol
-                st.success(f"¡Inicio de sesión exitoso! Bienvenido, {user.nombre_usuario}")
-                st.rerun()
-            else:
-                st.error("Usuario o contraseña incorrectos.")
-        finally:
-            db.close()
+            user = authenticate(db, username, password)
+        except FuturesTimeoutError:
+            st.error("El servidor está atendiendo muchos inicios de sesión. Por favor, intenta de nuevo en unos segundos.")
+            return
+        if user:
+            st.session_state['authenticated'] = True
+            st.session_state['user_id'] = user.id
+            st.session_state['username'] = user.nombre_usuario
+            st.session_state['user_role'] = user.rol
+            st.query_params[SESSION_QUERY_PARAM] = issue_session_token(user)
+            st.success(f"¡Inicio de sesión exitoso! Bienvenido, {user.nombre_usuario}")
+            st.rerun()
+        else:
+            st.error("Usuario o contraseña incorrectos.")
 
 def show_main_app():
     st.sidebar.title("Menú")
@@ -63,9 +99,18 @@ def show_main_app():
     # --- FIN Añadir "Productos" ---
 
     if st.sidebar.button("Cerrar Sesión"):
+        # Revoca el token: un enlace copiado o el historial del navegador ya no inician sesión
+        revoke_session_tokens(get_page_db(), st.session_state['user_id'])
         st.session_state.clear()
+        st.query_params.clear()
         st.rerun()
 
+    if st.session_state['user_role'] == "admin":
+        with st.sidebar.expander("Pool de conexiones"):
+            st.json(get_pool_stats())
+        # Activa la medición de SQL desde el próximo rerun (también con DB_INSTRUMENTACION=1)
+        st.sidebar.toggle("Depuración SQL", key="debug_sql")
+
     if page == "Panel de Control":
         st.title("🏠 Panel de Control")
         st.write("¡Aquí irán tus dashboards y resúmenes!")
@@ -77,8 +122,37 @@ def show_main_app():
         show_productos_page()
     elif page == "Informes":
         show_reports_page()
+    return page
+
+def show_sql_debug_panel(medicion):
+    with st.sidebar.expander("Depuración SQL", expanded=True):
+        st.write(f"Página: {medicion.pagina}")
+        col1, col2 = st.columns(2)
+        col1.metric("Sentencias", medicion.sentencias)
+        col2.metric("Tiempo BD", f"{medicion.tiempo_db_ms:.0f} ms")
+        st.caption(f"Rerun completo: {medicion.duracion_ms:.0f} ms")
+        for sql, veces in medicion.n_mas_1():
+            st.warning(f"Posible N+1: {veces} ejecuciones de\n\n`{sql[:300]}`")
+        if medicion.lentas:
+            st.write("Sentencias más lentas:")
+            st.dataframe(
+                pd.DataFrame([{"ms": round(ms, 1), "SQL": sql} for ms, sql in medicion.lentas]),
+                hide_index=True
+            )
+
+# Una sesión de base de datos (y una conexión) por rerun, compartida por toda la página
+debug_sql = INSTRUMENTACION_ACTIVA or st.session_state.get('debug_sql', False)
+with medir_rerun(engine, activa=debug_sql) as medicion, rerun_session() as page_db:
+    sync_session_token(page_db)
+    if not st.session_state['authenticated']:
+        show_login_page()
+        if medicion:
+            medicion.pagina = "Login"
+    else:
+        page = show_main_app()
+        if medicion:
+            medicion.pagina = page
 
-if not st.session_state['authenticated']:
-    show_login_page()
-else:
-    show_main_app()
+# El panel se dibuja al final, con la medición del rerun ya cerrada
+if medicion and st.session_state['authenticated']:
+    show_sql_debug_panel(medicion)
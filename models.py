@@ -1,10 +1,16 @@
 # models.py
 
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Float
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Date, Float, Index, Sequence, BigInteger, DDL, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from utils.base_model import Base
 
+# Índice de trigramas (pg_trgm) para búsquedas ILIKE '%texto%' y por similitud; solo en PostgreSQL
+def trigram_index(name: str, column: str) -> Index:
+    return Index(name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"}).ddl_if(dialect="postgresql")
+
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+
 # Modelo para la tabla de Usuarios
 class Usuario(Base):
     __tablename__ = "usuarios"
@@ -14,6 +20,8 @@ class Usuario(Base):
     password_hash = Column(String, nullable=False)
     rol = Column(String, default="usuario")
     is_activo = Column(Boolean, default=True)
+    # Versión de los tokens de sesión: al cerrar sesión se incrementa y los tokens emitidos dejan de valer
+    sesion_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     ordenes_asignadas = relationship(
         "OrdenTrabajo",
@@ -54,6 +62,8 @@ class Inventario(Base):
     id = Column(Integer, primary_key=True, index=True)
     producto_id = Column(Integer, ForeignKey("productos.id"), unique=True, nullable=False)
     cantidad = Column(Integer, default=0, nullable=False)
+    # Unidades comprometidas en órdenes abiertas; disponibles = cantidad - reservado (ver utils/reservas_stock.py)
+    reservado = Column(Integer, default=0, server_default="0", nullable=False)
     ultima_actualizacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     producto = relationship("Producto", back_populates="inventario")
@@ -62,6 +72,13 @@ class Inventario(Base):
 # --- MODELO PARA ÍTEMS INDIVIDUALES DE INVENTARIO ---
 class InventarioItem(Base):
     __tablename__ = "inventario_items"
+    __table_args__ = (
+        # Índice para la paginación por clave (fecha_alta, id) del listado de inventario
+        Index("ix_inventario_items_fecha_alta_id", "fecha_alta", "id"),
+        trigram_index("ix_inventario_items_numero_item_trgm", "numero_item"),
+        trigram_index("ix_inventario_items_numero_serie_trgm", "numero_serie"),
+        trigram_index("ix_inventario_items_descripcion_breve_trgm", "descripcion_breve"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     numero_item = Column(String, unique=True, nullable=False, index=True)
@@ -91,12 +108,20 @@ class InventarioItem(Base):
 # Modelo para la tabla de Activos (ubicaciones)
 class Activo(Base):
     __tablename__ = "activos"
+    __table_args__ = (
+        # text_pattern_ops permite que PostgreSQL use el índice en búsquedas LIKE '/1/5/%'
+        Index("ix_activos_path", "path", postgresql_ops={"path": "text_pattern_ops"}),
+        trigram_index("ix_activos_nombre_trgm", "nombre"),
+        trigram_index("ix_activos_descripcion_trgm", "descripcion"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nombre = Column(String, nullable=False)
     tipo = Column(String)
     descripcion = Column(String)
-    parent_id = Column(Integer, ForeignKey("activos.id"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("activos.id"), nullable=True, index=True) # Hijos de un nivel de la cascada
+    # Ruta materializada con los IDs de los ancestros y el propio (ej: /1/5/220/)
+    path = Column(String, nullable=True)
 
     children = relationship(
         "Activo",
@@ -112,9 +137,25 @@ class Activo(Base):
 
     ordenes_trabajo = relationship("OrdenTrabajo", back_populates="ubicacion")
 
+
+# Tabla de clausura de la jerarquía de Activos: una fila por cada par (ancestro, descendiente),
+# incluyendo la fila del propio activo con profundidad 0.
+class ActivoClausura(Base):
+    __tablename__ = "activos_clausura"
+
+    ancestro_id = Column(Integer, ForeignKey("activos.id", ondelete="CASCADE"), primary_key=True)
+    descendiente_id = Column(Integer, ForeignKey("activos.id", ondelete="CASCADE"), primary_key=True, index=True)
+    profundidad = Column(Integer, nullable=False)
+
 # Modelo para la tabla de Órdenes de Trabajo
 class OrdenTrabajo(Base):
     __tablename__ = "ordenes_trabajo"
+    __table_args__ = (
+        # Cubre los conteos por estado y rango de fechas (backlog abierto, recálculo de la analítica)
+        Index("ix_ordenes_trabajo_estado_fecha_creacion", "estado", "fecha_creacion"),
+        # Activos que ya tienen orden en una campaña (reintentos sin duplicar, ver utils/campanas.py)
+        Index("ix_ordenes_trabajo_campana_ubicacion", "campana", "ubicacion_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     numero_orden = Column(String, unique=True, nullable=False)
@@ -125,6 +166,8 @@ class OrdenTrabajo(Base):
     fecha_creacion = Column(DateTime, default=datetime.utcnow, nullable=False)
     fecha_actualizacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     fecha_limite = Column(DateTime, nullable=True)
+    fecha_cierre = Column(DateTime, nullable=True) # Al pasar a un estado cerrado (ver ESTADOS_CERRADOS)
+    campana = Column(String, nullable=True) # Clave de la campaña que generó la orden
 
     ubicacion_id = Column(Integer, ForeignKey("activos.id"), nullable=False)
     ubicacion = relationship("Activo", back_populates="ordenes_trabajo")
@@ -155,6 +198,129 @@ class ItemOrden(Base):
     nombre_item = Column(String, nullable=False)
     cantidad = Column(Integer, nullable=False)
     precio_unitario_actual = Column(Float, nullable=False)
+    cantidad_reservada = Column(Integer, default=0, server_default="0", nullable=False) # Parte de 'cantidad' reservada en inventario
 
     orden = relationship("OrdenTrabajo", back_populates="items")
     producto = relationship("Producto")
+
+
+# --- NUMERACIÓN DE ÓRDENES E ÍTEMS ---
+# En PostgreSQL se usan secuencias nativas; en el resto de motores, la tabla de contadores.
+SEQ_NUMERO_ORDEN = Sequence("seq_numero_orden", start=10000, metadata=Base.metadata)
+SEQ_NUMERO_ITEM = Sequence("seq_numero_item", start=200000, metadata=Base.metadata)
+
+class Contador(Base):
+    __tablename__ = "contadores"
+
+    nombre = Column(String, primary_key=True)
+    valor = Column(BigInteger, nullable=False) # Último valor entregado
+
+
+# --- AGREGADOS PARA INFORMES ---
+# Totales mantenidos en cada alta/cambio (ver utils/agregados.py): una fila por (métrica, dimensión, clave).
+# Ej: ('inventario', 'tipo_item', 'Minero'), ('ordenes', 'estado', 'Pendiente'), ('inventario', 'ubicacion', '42').
+class Agregado(Base):
+    __tablename__ = "agregados"
+
+    metrica = Column(String, primary_key=True) # 'inventario' u 'ordenes'
+    dimension = Column(String, primary_key=True) # 'total', 'estado', 'tipo_item', 'ubicacion' (subárbol) o 'dia'
+    clave = Column(String, primary_key=True)
+    registros = Column(BigInteger, nullable=False, default=0) # Cantidad de filas
+    unidades = Column(BigInteger, nullable=False, default=0) # Suma de cantidad (ítems de inventario)
+    valor = Column(Float, nullable=False, default=0.0) # Suma de precio_estimado_usd * cantidad
+
+
+# --- HECHOS DIARIOS DE ÓRDENES (analítica) ---
+# Una fila por día, criticidad y sitio (activo raíz de la ubicación), mantenida en cada alta y cierre
+# (ver utils/analitica_ordenes.py). El tiempo de resolución se guarda ya agrupado en intervalos.
+class HechoOrdenDiario(Base):
+    __tablename__ = "hechos_ordenes_diarios"
+
+    dia = Column(Date, primary_key=True)
+    criticidad = Column(String, primary_key=True)
+    sitio_id = Column(Integer, primary_key=True) # 0 si la ubicación no pertenece a ningún sitio conocido
+    creadas = Column(Integer, nullable=False, default=0)
+    cerradas = Column(Integer, nullable=False, default=0)
+    cerradas_vencidas = Column(Integer, nullable=False, default=0) # Cerradas después de su fecha_limite
+    segundos_resolucion = Column(Float, nullable=False, default=0.0) # Suma de (fecha_cierre - fecha_creacion)
+    resolucion_1d = Column(Integer, nullable=False, default=0) # Menos de 1 día
+    resolucion_3d = Column(Integer, nullable=False, default=0) # De 1 a 3 días
+    resolucion_7d = Column(Integer, nullable=False, default=0) # De 3 a 7 días
+    resolucion_30d = Column(Integer, nullable=False, default=0) # De 7 a 30 días
+    resolucion_mas = Column(Integer, nullable=False, default=0) # 30 días o más
+
+
+# --- PLANES DE MANTENIMIENTO RECURRENTE ---
+# Reglas que generan órdenes cada cierto intervalo (ver utils/planes_mantenimiento.py). El planificador
+# solo lee las filas con proximo_vencimiento vencido, a través del índice (habilitado, proximo_vencimiento).
+class PlanMantenimiento(Base):
+    __tablename__ = "planes_mantenimiento"
+    __table_args__ = (
+        Index("ix_planes_mantenimiento_habilitado_proximo", "habilitado", "proximo_vencimiento"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    nombre = Column(String, nullable=False)
+    titulo = Column(String, nullable=False) # Título de las órdenes generadas
+    descripcion = Column(String)
+    criticidad = Column(String, nullable=False)
+    activo_id = Column(Integer, ForeignKey("activos.id"), nullable=False) # Activo de la orden, o raíz del subárbol
+    tipo_objetivo = Column(String, nullable=True) # Si se indica: una orden por cada activo de este tipo en el subárbol
+    tipo_padre = Column(String, nullable=True) # Filtro opcional por el tipo del padre (ej: 'Familia Minero')
+    intervalo = Column(Integer, nullable=False)
+    unidad = Column(String, nullable=False, default="dias") # 'dias' o 'meses'
+    proximo_vencimiento = Column(DateTime, nullable=False)
+    ultimo_periodo = Column(DateTime, nullable=True) # Vencimiento del último período generado
+    ordenes_generadas = Column(Integer, nullable=False, default=0)
+    habilitado = Column(Boolean, nullable=False, default=True)
+    creado_por_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    fecha_creacion = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    activo = relationship("Activo")
+
+
+# --- LIBRO DE MOVIMIENTOS DE INVENTARIO ---
+# Registro de solo inserción: cada alta, traslado, consumo en una orden o baja de un ítem es una fila
+# (ver utils/movimientos_inventario.py). Las existencias actuales y las de una fecha pasada se derivan de él.
+class MovimientoInventario(Base):
+    __tablename__ = "movimientos_inventario"
+
+    id = Column(Integer, primary_key=True, index=True) # Orden de aplicación al reconstruir
+    fecha = Column(DateTime, default=datetime.utcnow, nullable=False)
+    tipo = Column(String, nullable=False) # 'alta', 'traslado', 'consumo' o 'baja'
+    item_id = Column(Integer, ForeignKey("inventario_items.id"), nullable=False, index=True)
+    producto_id = Column(Integer, nullable=False, default=0) # producto_asociado_id del ítem, 0 si no tiene
+    ubicacion_origen_id = Column(Integer, ForeignKey("activos.id"), nullable=True) # Vacía en las altas
+    ubicacion_destino_id = Column(Integer, ForeignKey("activos.id"), nullable=True) # Vacía en consumos y bajas
+    cantidad = Column(Integer, nullable=False)
+    orden_id = Column(Integer, ForeignKey("ordenes_trabajo.id"), nullable=True) # Orden en la que se consumió
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
+
+
+# Existencias actuales por ubicación (directa, sin subárbol) y producto, mantenidas con cada movimiento
+class StockUbicacion(Base):
+    __tablename__ = "stock_ubicaciones"
+
+    ubicacion_id = Column(Integer, primary_key=True)
+    producto_id = Column(Integer, primary_key=True) # 0 para ítems sin producto asociado
+    cantidad = Column(BigInteger, nullable=False, default=0)
+
+
+# Foto de las existencias hasta un movimiento: "stock a la fecha X" lee el punto de control anterior
+# a X y aplica solo los movimientos posteriores a él
+class CheckpointStock(Base):
+    __tablename__ = "checkpoints_stock"
+
+    id = Column(Integer, primary_key=True, index=True)
+    fecha = Column(DateTime, nullable=False, index=True)
+    hasta_movimiento_id = Column(Integer, nullable=False) # Último movimiento incluido (0 si ninguno)
+    fecha_creacion = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class CheckpointStockFila(Base):
+    __tablename__ = "checkpoints_stock_filas"
+
+    checkpoint_id = Column(Integer, ForeignKey("checkpoints_stock.id"), primary_key=True)
+    ubicacion_id = Column(Integer, primary_key=True)
+    producto_id = Column(Integer, primary_key=True)
+    cantidad = Column(BigInteger, nullable=False)
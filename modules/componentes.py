@@ -0,0 +1,130 @@
+# modules/componentes.py
+
+import streamlit as st
+from sqlalchemy.orm import Session
+from utils.ordenes_trabajo import children_of, get_activo_ancestor_ids
+
+class CascadaUbicacion:
+    """
+    Selección jerárquica de ubicación con un selectbox por nivel, compartida por las páginas de
+    Órdenes de Trabajo e Inventario. Las opciones de cada nivel salen de children_of (memorizadas),
+    así que dibujar la cascada no consulta la base de datos salvo la primera vez.
+    - selection_key / final_key: claves de session_state con la selección por nivel y el ID final.
+    - level_prefix: prefijo de las claves de nivel dentro de la selección (ej: 'level_').
+    - widget_key: formato de la clave de cada selectbox, con {level}.
+    - label / help: formatos del texto de cada selectbox, con {n} (nivel empezando en 1).
+    - allow_partial: si es True, un nivel sin elegir deja seleccionado el último nivel elegido
+      (ej: la raíz de un subárbol) en lugar de no retornar ninguna ubicación.
+    """
+
+    def __init__(self, selection_key: str, final_key: str, level_prefix: str, widget_key: str,
+                 label: str, help: str, for_module: str = None, placeholder: str = "--- Selecciona ---",
+                 max_depth: int = None, max_depth_warning: str = None, allow_partial: bool = False):
+        self.selection_key = selection_key
+        self.final_key = final_key
+        self.level_prefix = level_prefix
+        self.widget_key = widget_key
+        self.label = label
+        self.help = help
+        self.for_module = for_module
+        self.placeholder = placeholder
+        self.max_depth = max_depth
+        self.max_depth_warning = max_depth_warning
+        self.allow_partial = allow_partial
+
+    def _init_state(self):
+        if self.selection_key not in st.session_state:
+            st.session_state[self.selection_key] = {}
+        if self.final_key not in st.session_state:
+            st.session_state[self.final_key] = None
+
+    def _clear_levels_below(self, level: int):
+        selection = st.session_state[self.selection_key]
+        for k in list(selection.keys()):
+            if not k.startswith(self.level_prefix):
+                continue
+            try:
+                if int(k[len(self.level_prefix):]) > level:
+                    del selection[k]
+            except ValueError:
+                continue
+
+    def show(self, db: Session):
+        """
+        Dibuja la cascada y retorna el ID de la ubicación seleccionada (o None).
+        """
+        self._init_state()
+        selection = st.session_state[self.selection_key]
+        current_parent_id = None
+        level = 0
+
+        while True:
+            # Rompe el bucle si se excede la profundidad máxima para evitar infinitos selectbox
+            if self.max_depth is not None and level >= self.max_depth:
+                st.warning(self.max_depth_warning.format(max_depth=self.max_depth))
+                break
+
+            level_key = f'{self.level_prefix}{level}'
+            opciones = children_of(db, parent_id=current_parent_id, for_module=self.for_module)
+
+            if not opciones.ids:
+                st.session_state[self.final_key] = current_parent_id
+                break
+
+            options_labels = (self.placeholder,) + opciones.labels
+            options_ids = (None,) + opciones.ids
+
+            default_index = 0
+            if selection.get(level_key) is not None:
+                try:
+                    default_index = options_ids.index(selection[level_key])
+                except ValueError:
+                    default_index = 0
+
+            selected_label = st.selectbox(
+                self.label.format(n=level + 1),
+                options=options_labels,
+                index=default_index,
+                key=self.widget_key.format(level=level),
+                help=self.help.format(n=level + 1)
+            )
+
+            selected_id = options_ids[options_labels.index(selected_label)] if selected_label != self.placeholder else None
+
+            if selected_id != selection.get(level_key):
+                selection[level_key] = selected_id
+                self._clear_levels_below(level)
+                st.session_state[self.final_key] = selected_id
+                st.rerun()
+
+            if selected_id is None:
+                st.session_state[self.final_key] = current_parent_id if self.allow_partial else None
+                break
+
+            current_parent_id = selected_id
+            level += 1
+
+        return st.session_state[self.final_key]
+
+    def select(self, db: Session, activo_id: int):
+        """
+        Lleva la selección directamente hasta el activo: fija cada nivel con su ancestro
+        y descarta el estado de los selectbox para que tomen los nuevos valores por defecto.
+        """
+        self._init_state()
+        chain = get_activo_ancestor_ids(db, activo_id)
+        st.session_state[self.selection_key] = {f'{self.level_prefix}{level}': ancestor_id for level, ancestor_id in enumerate(chain)}
+        st.session_state[self.final_key] = activo_id
+        self.reset_widgets()
+
+    def reset(self):
+        """
+        Vacía la selección (ej: después de crear un registro con la ubicación elegida).
+        """
+        st.session_state[self.selection_key] = {}
+        st.session_state[self.final_key] = None
+
+    def reset_widgets(self):
+        widget_prefix = self.widget_key.split("{level}")[0]
+        for key in [k for k in st.session_state if str(k).startswith(widget_prefix)]:
+            del st.session_state[key]
@@ -1,19 +1,151 @@
 # modules/informes.py
 
 import streamlit as st
+import pandas as pd
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from utils.database import get_db
+from utils.database import get_page_db
 # ¡CAMBIA ESTA LÍNEA!
 # De: from utils.reports import get_ordenes_by_estado, get_inventario_stats
 # A:
 from utils.reports import get_ordenes_by_status_count, get_inventario_stats # <-- ¡Así es como debe quedar!
+from utils.reports import get_inventario_by_tipo, get_inventario_by_ubicacion, get_ordenes_by_dia
+from utils.ordenes_trabajo import children_of
+from utils.valoracion import get_valoracion
+from utils.arbol_activos import get_arbol_activos, paths_for
+from utils.movimientos_inventario import SIN_PRODUCTO, get_stock_at
+from models import Producto
+from utils.analitica_ordenes import (
+    SIN_SITIO, get_throughput_por_dia, get_histograma_resolucion, get_resumen_vencimientos, get_backlog_abierto
+)
 
 # ... el resto de tu código para informes.py ...
 
+def show_valoracion_drilldown(db: Session):
+    """
+    Recorrido de la jerarquía con los totales de inventario de cada subárbol (valoración en memoria).
+    """
+    st.subheader("Valoración del Inventario por Ubicación")
+    valoracion = get_valoracion(db)
+    drill_path = st.session_state.setdefault('valoracion_drill_path', [])
+    current_id = drill_path[-1] if drill_path else None
+
+    if current_id is not None:
+        st.write(f"Ubicación: **{valoracion.arbol.path(current_id)}**")
+        totales = valoracion.subtree(current_id)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Items", totales["items"])
+        col2.metric("Funcionando", totales["funcionando"])
+        col3.metric("No Funcionando", totales["no_funcionando"])
+        col4.metric("Valor (USD)", f"${totales['valor']:,.2f}")
+        if st.button("⬆️ Subir un nivel", key="valoracion_up"):
+            drill_path.pop()
+            st.rerun()
+    else:
+        st.write("Ubicación: **Todas las ubicaciones**")
+
+    hijos = children_of(db, parent_id=current_id)
+    if not hijos.ids:
+        st.info("Esta ubicación no tiene sub-ubicaciones.")
+        return
+
+    subtotales = valoracion.subtrees(hijos.ids)
+    st.dataframe(pd.DataFrame([
+        {"Ubicación": label, "Items": subtotales[activo_id]["items"], "Unidades": subtotales[activo_id]["unidades"],
+         "Funcionando": subtotales[activo_id]["funcionando"], "No Funcionando": subtotales[activo_id]["no_funcionando"],
+         "Valor (USD)": round(subtotales[activo_id]["valor"], 2)}
+        for label, activo_id in zip(hijos.labels, hijos.ids)
+    ]), hide_index=True)
+
+    col_select, col_button = st.columns([3, 1])
+    with col_select:
+        selected_label = st.selectbox("Ver detalle de:", hijos.labels, key=f"valoracion_child_{current_id}")
+    with col_button:
+        if st.button("Entrar ➡️", key="valoracion_down"):
+            drill_path.append(hijos.ids[hijos.labels.index(selected_label)])
+            st.rerun()
+
+def show_stock_a_fecha(db: Session):
+    """
+    Existencias por ubicación y producto al final de un día, leídas del último punto de control
+    anterior más los movimientos posteriores (ver utils/movimientos_inventario.py).
+    """
+    st.subheader("Stock por Ubicación a una Fecha")
+    col_fecha, col_sitio = st.columns(2)
+    with col_fecha:
+        fecha = st.date_input("Fecha", value=datetime.utcnow().date(), key="stock_fecha")
+    with col_sitio:
+        sitios = children_of(db, parent_id=None, for_module='inventario')
+        sitio_label = st.selectbox("Sitio", ["--- Todos ---"] + list(sitios.labels), key="stock_sitio")
+    sitio_id = sitios.ids[sitios.labels.index(sitio_label)] if sitio_label in sitios.labels else None
+
+    stock = get_stock_at(db, datetime.combine(fecha, datetime.max.time()), ubicacion_id=sitio_id)
+    if not stock:
+        st.info("No hay existencias registradas a esa fecha.")
+        return
+    rutas = paths_for(db, [ubicacion_id for ubicacion_id, _ in stock])
+    nombres = dict(db.query(Producto.id, Producto.nombre).filter(Producto.id.in_({p for _, p in stock})))
+    st.dataframe(pd.DataFrame([
+        {"Ubicación": rutas.get(ubicacion_id, str(ubicacion_id)),
+         "Producto": "Sin producto" if producto_id == SIN_PRODUCTO else nombres.get(producto_id, str(producto_id)),
+         "Cantidad": cantidad}
+        for (ubicacion_id, producto_id), cantidad in stock.items()
+    ]).sort_values(["Ubicación", "Producto"]), hide_index=True)
+
+def _resumen_dataframe(rows, column: str, label_of=str):
+    return pd.DataFrame([
+        {column: label_of(clave), "Creadas": creadas, "Cerradas": cerradas, "Cerradas Vencidas": vencidas,
+         "% Vencidas": round(100 * vencidas / cerradas, 1) if cerradas else None,
+         "Horas Promedio": round(horas, 1) if horas is not None else None}
+        for clave, creadas, cerradas, vencidas, horas in rows
+    ])
+
+def show_analitica_ordenes(db: Session):
+    """
+    Series de tiempo de órdenes leídas de la tabla de hechos diarios (no recorre las órdenes).
+    """
+    st.subheader("Analítica de Órdenes")
+    hoy = datetime.utcnow().date()
+    rango = st.date_input("Rango de fechas", value=(hoy - timedelta(days=90), hoy), key="analitica_rango")
+    if not isinstance(rango, (tuple, list)) or len(rango) != 2:
+        st.info("Selecciona la fecha de inicio y la de fin.")
+        return
+    desde, hasta = rango
+
+    backlog = get_backlog_abierto(db)
+    if backlog:
+        st.write("Órdenes abiertas: " + ", ".join(f"{estado}: **{cantidad}**" for estado, cantidad in backlog))
+
+    throughput = get_throughput_por_dia(db, desde, hasta)
+    if not throughput:
+        st.info("No hay órdenes creadas ni cerradas en el rango seleccionado.")
+        return
+
+    st.write("Órdenes Creadas vs Cerradas por Día")
+    st.line_chart(pd.DataFrame(
+        [(str(dia)[:10], creadas, cerradas) for dia, creadas, cerradas in throughput],
+        columns=["Día", "Creadas", "Cerradas"]
+    ).set_index("Día"))
+
+    st.write("Tiempo de Resolución (creación a cierre)")
+    st.bar_chart(pd.DataFrame(get_histograma_resolucion(db, desde, hasta), columns=["Tiempo", "Órdenes"]).set_index("Tiempo"))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("Vencimientos por Criticidad")
+        st.dataframe(_resumen_dataframe(get_resumen_vencimientos(db, desde, hasta, por="criticidad"), "Criticidad"), hide_index=True)
+    with col2:
+        arbol = get_arbol_activos(db)
+        st.write("Vencimientos por Sitio")
+        st.dataframe(_resumen_dataframe(
+            get_resumen_vencimientos(db, desde, hasta, por="sitio"), "Sitio",
+            lambda sitio_id: "Sin sitio" if sitio_id == SIN_SITIO else (arbol.path(sitio_id) or str(sitio_id))
+        ), hide_index=True)
+
 def show_reports_page():
     st.title("📊 Informes y Analíticas")
 
-    db: Session = next(get_db())
+    db: Session = get_page_db()
     try:
         # Llama a la función corregida
         ordenes_por_estado = get_ordenes_by_status_count(db) # <-- Asegúrate de usar el nombre correcto aquí también
@@ -24,10 +156,37 @@ def show_reports_page():
         st.subheader("Estadísticas de Inventario")
         st.write(f"Total de Items en Inventario: **{total_items}**")
         st.write(f"Valor Total del Inventario: **${total_value:,.2f}**")
+
+        por_tipo = get_inventario_by_tipo(db)
+        if por_tipo:
+            st.write("Inventario por Tipo de Item")
+            st.dataframe(pd.DataFrame(
+                [{"Tipo": tipo, "Items": registros, "Unidades": unidades, "Valor (USD)": round(valor, 2)}
+                 for tipo, registros, unidades, valor in por_tipo]
+            ), hide_index=True)
+
+        # Sitios de inventario (nivel superior); cada uno suma todo su subárbol
+        sitios = children_of(db, parent_id=None, for_module='inventario')
+        por_sitio = get_inventario_by_ubicacion(db, list(sitios.ids))
+        if por_sitio:
+            st.write("Inventario por Sitio")
+            st.dataframe(pd.DataFrame(
+                [{"Sitio": label, "Items": por_sitio[activo_id][0], "Unidades": por_sitio[activo_id][1],
+                  "Valor (USD)": round(por_sitio[activo_id][2], 2)}
+                 for label, activo_id in zip(sitios.labels, sitios.ids) if activo_id in por_sitio]
+            ), hide_index=True)
+
+        show_valoracion_drilldown(db)
+        show_stock_a_fecha(db)
+
+        ordenes_por_dia = get_ordenes_by_dia(db)
+        if ordenes_por_dia:
+            st.subheader("Órdenes Creadas por Día (últimos 30 días)")
+            st.bar_chart(pd.DataFrame(ordenes_por_dia, columns=["Día", "Órdenes"]).set_index("Día"))
+
+        show_analitica_ordenes(db)
         
         # ... otras llamadas a funciones de informes ...
 
     except Exception as e:
-        st.error(f"Error al cargar los informes: {e}")
-    finally:
-        db.close()
\ No newline at end of file
+        st.error(f"Error al cargar los informes: {e}")
\ No newline at end of file
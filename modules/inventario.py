@@ -1,21 +1,206 @@
 # modules/inventario.py
 
+import os
 import streamlit as st
 import pandas as pd
 from sqlalchemy.orm import Session
 from datetime import datetime
-from utils.database import get_db
-from utils.ordenes_trabajo import get_activos, get_activo_full_path, get_activo_by_id
-from utils.inventario_db import get_next_item_number, create_inventory_item, get_inventory_items, get_inventory_item_by_id, get_inventory_item_by_serial_or_number
-from models import Producto, Usuario, InventarioItem 
+from utils.database import get_page_db
+from utils.ordenes_trabajo import get_activo_full_path, get_activo_by_id
+from utils.arbol_activos import paths_for
+from utils.inventario_db import (
+    get_next_item_number, create_inventory_item, get_inventory_items_page, estimate_inventory_count,
+    get_inventory_item_by_id, get_inventory_item_by_serial_or_number,
+    move_inventory_item, consume_inventory_item, retire_inventory_item
+)
+from utils.movimientos_inventario import get_movimientos_item
+from utils.exportacion import ENTIDADES, export_parquet, zip_exportacion, new_export_path
+from utils.importacion_inventario import (
+    COLUMNAS_OBLIGATORIAS, COLUMNAS_OPCIONALES, import_inventory_items, new_report_path
+)
+from models import Producto, Usuario, InventarioItem, OrdenTrabajo
+from modules.componentes import CascadaUbicacion
 
 # Opciones para el tipo de ítem
 ITEM_TYPES = ["Minero", "Cooler", "CB", "Fuente", "Conectores", "Carcaza", "Otro"]
 ESTADO_FUNCIONAMIENTO_OPTIONS = ["Funcionando", "No Funcionando"]
 
+# Opciones de tamaño de página para el listado de inventario
+PAGE_SIZE_OPTIONS = [50, 100, 250, 500]
+
+# Tamaño máximo de una exportación descargable desde la página: st.download_button la sirve desde
+# memoria, así que las más grandes se dejan en el servidor (o se generan con scripts/exportar_parquet.py)
+EXPORT_MAX_DESCARGA_MB = 200
+
 # Define un límite de seguridad para la profundidad de la jerarquía
 MAX_HIERARCHY_DEPTH = 10 
 
+# Cascadas de ubicación (solo sitios de inventario): alta de ítems y filtro del listado
+CASCADA_ALTA = CascadaUbicacion(
+    selection_key='inventory_hierarchy_selection',
+    final_key='inventory_final_selected_activo_id',
+    level_prefix='inventory_level_',
+    widget_key="inventory_ubicacion_select_level_{level}",
+    label="Nivel {n} de Ubicación",
+    help="Selecciona la ubicación del item en el nivel {n}.",
+    for_module='inventario',
+    max_depth=MAX_HIERARCHY_DEPTH,
+    max_depth_warning="Se alcanzó la profundidad máxima de ubicación ({max_depth} niveles)."
+)
+CASCADA_FILTRO = CascadaUbicacion(
+    selection_key='view_inventory_hierarchy_selection',
+    final_key='view_inventory_final_selected_activo_id',
+    level_prefix='view_inventory_level_',
+    widget_key="view_inventory_ubicacion_select_level_{level}",
+    label="Ubicación (Nivel {n}):",
+    help="Filtra por ubicación en el nivel {n}.",
+    for_module='inventario',
+    placeholder="--- Selecciona Ubicación ---",
+    max_depth=MAX_HIERARCHY_DEPTH,
+    max_depth_warning="Se alcanzó la profundidad máxima de ubicación ({max_depth} niveles) para el filtro."
+)
+CASCADA_TRASLADO = CascadaUbicacion(
+    selection_key='mov_hierarchy_selection',
+    final_key='mov_final_selected_activo_id',
+    level_prefix='mov_level_',
+    widget_key="mov_ubicacion_select_level_{level}",
+    label="Nueva Ubicación (Nivel {n}):",
+    help="Selecciona la nueva ubicación del item en el nivel {n}.",
+    for_module='inventario',
+    max_depth=MAX_HIERARCHY_DEPTH,
+    max_depth_warning="Se alcanzó la profundidad máxima de ubicación ({max_depth} niveles)."
+)
+
+# Acciones del panel de movimientos y el tipo de movimiento que registran en el libro
+ACCIONES_MOVIMIENTO = {"Trasladar": "traslado", "Consumir en una orden": "consumo", "Dar de baja": "baja"}
+
+def show_export_panel(db: Session):
+    """
+    Exportación a Parquet (particionada por sitio y mes) de inventario, órdenes y activos.
+    Se genera en disco por lotes y se ofrece como un .zip.
+    """
+    with st.expander("📦 Exportar datos a Parquet"):
+        st.caption("Incluye la ruta completa de la ubicación. Cada tabla queda en carpetas sitio=.../mes=....")
+        entidades = st.multiselect("Tablas a exportar", ENTIDADES, default=ENTIDADES, key="export_entidades")
+        if st.button("Generar exportación", key="export_generar", disabled=not entidades):
+            destino = new_export_path()
+            with st.spinner("Exportando..."):
+                resumen = export_parquet(db, destino, entidades)
+                st.session_state.export_zip = zip_exportacion(destino, destino + ".zip")
+                st.session_state.export_resumen = resumen
+
+        zip_path = st.session_state.get('export_zip')
+        if zip_path and os.path.exists(zip_path):
+            resumen = st.session_state.get('export_resumen', {})
+            st.write(", ".join(f"{entidad}: **{filas}** filas" for entidad, (filas, _) in resumen.items()))
+            size_mb = os.path.getsize(zip_path) / (1024 * 1024)
+            if size_mb <= EXPORT_MAX_DESCARGA_MB:
+                with open(zip_path, "rb") as f:
+                    st.download_button(f"Descargar ({size_mb:.1f} MB)", data=f, file_name=os.path.basename(zip_path),
+                                       mime="application/zip", key="export_descargar")
+            else:
+                st.info(f"La exportación ocupa {size_mb:.0f} MB y quedó en el servidor: {os.path.abspath(zip_path)}")
+
+def show_import_panel(db: Session):
+    """
+    Alta masiva de ítems desde un CSV o XLSX, por lotes. Las filas con errores se omiten
+    y se listan en un reporte descargable.
+    """
+    with st.expander("📥 Importar ítems desde CSV/Excel"):
+        st.caption(
+            f"Columnas obligatorias: {', '.join(COLUMNAS_OBLIGATORIAS)}. Opcionales: {', '.join(COLUMNAS_OPCIONALES)}. "
+            "La ubicación es el tag del activo o su ruta completa (ej: Depósito > Estante 01)."
+        )
+        archivo = st.file_uploader("Archivo a importar", type=["csv", "xlsx"], key="import_archivo")
+        if st.button("Importar", key="import_ejecutar", disabled=archivo is None):
+            barra = st.progress(0.0, text="Importando...")
+            total_bytes = max(archivo.size, 1)
+            def progreso(filas, importadas):
+                # El avance se estima por la posición en el archivo (no se conoce el total de filas)
+                avance = min(archivo.tell() / total_bytes, 1.0)
+                barra.progress(avance, text=f"{filas} filas leídas, {importadas} importadas")
+            try:
+                resultado = import_inventory_items(
+                    db, archivo, archivo.name, st.session_state.get('user_id'), new_report_path(), progreso=progreso
+                )
+                barra.progress(1.0, text="Importación terminada")
+                st.session_state.import_resultado = resultado
+            except ValueError as e:
+                db.rollback()
+                st.error(str(e))
+
+        resultado = st.session_state.get('import_resultado')
+        if resultado:
+            st.success(f"{resultado.importadas} de {resultado.filas} filas importadas.")
+            if resultado.errores and os.path.exists(resultado.reporte):
+                st.warning(f"{resultado.errores} filas con errores.")
+                with open(resultado.reporte, "rb") as f:
+                    st.download_button("Descargar reporte de errores", data=f, file_name=os.path.basename(resultado.reporte),
+                                       mime="text/csv", key="import_reporte")
+
+def show_movimientos_panel(db: Session):
+    """
+    Traslado, consumo en una orden y baja de un ítem; cada acción queda en el libro de movimientos.
+    Muestra el historial de movimientos del ítem.
+    """
+    mensaje = st.session_state.pop('mov_mensaje', None)
+    if mensaje:
+        st.success(mensaje)
+    busqueda = st.text_input("Número de Serie o Número de Item:", key="mov_item_busqueda")
+    if not busqueda:
+        st.info("Ingresa un número de serie o número de item para registrar un movimiento.")
+        return
+    item = get_inventory_item_by_serial_or_number(db, busqueda)
+    if not item:
+        st.warning("Item no encontrado con el Número de Serie o Número de Item proporcionado.")
+        return
+
+    st.write(f"**Item {item.numero_item}** ({item.numero_serie}) · Cantidad: **{item.cantidad}** · "
+             f"Ubicación: **{get_activo_full_path(db, item.ubicacion_id)}**")
+    usuario_id = st.session_state.get('user_id')
+    accion = st.radio("Movimiento", list(ACCIONES_MOVIMIENTO), horizontal=True, key="mov_accion")
+
+    try:
+        if ACCIONES_MOVIMIENTO[accion] == "traslado":
+            nueva_ubicacion_id = CASCADA_TRASLADO.show(db)
+            if st.button("Trasladar Item", key="mov_trasladar", disabled=not nueva_ubicacion_id):
+                move_inventory_item(db, item.id, nueva_ubicacion_id, usuario_id)
+                CASCADA_TRASLADO.reset()
+                st.session_state['mov_mensaje'] = f"Item {item.numero_item} trasladado a {get_activo_full_path(db, nueva_ubicacion_id)}."
+                st.rerun()
+        elif item.cantidad <= 0:
+            st.info("El item no tiene unidades disponibles.")
+        elif ACCIONES_MOVIMIENTO[accion] == "consumo":
+            cantidad = st.number_input("Unidades consumidas", min_value=1, max_value=item.cantidad, value=1, step=1, key="mov_cantidad")
+            numero_orden = st.text_input("Número de Orden", key="mov_numero_orden")
+            if st.button("Registrar Consumo", key="mov_consumir", disabled=not numero_orden):
+                orden = db.query(OrdenTrabajo).filter(OrdenTrabajo.numero_orden == numero_orden.strip()).first()
+                if not orden:
+                    st.error(f"No existe la orden {numero_orden}.")
+                else:
+                    consume_inventory_item(db, item.id, cantidad, orden.id, usuario_id)
+                    st.session_state['mov_mensaje'] = f"{cantidad} unidad(es) del item {item.numero_item} consumidas en la orden {orden.numero_orden}."
+                    st.rerun()
+        else:
+            st.warning(f"Se darán de baja las {item.cantidad} unidades restantes; el item se conserva con su historial.")
+            if st.button("Dar de baja", key="mov_baja"):
+                retire_inventory_item(db, item.id, usuario_id)
+                st.session_state['mov_mensaje'] = f"Item {item.numero_item} dado de baja."
+                st.rerun()
+    except Exception as e:
+        db.rollback()
+        st.error(f"Error al registrar el movimiento: {e}")
+
+    movimientos = get_movimientos_item(db, item.id)
+    if movimientos:
+        st.write("Historial de movimientos:")
+        rutas = paths_for(db, [u for m in movimientos for u in (m.ubicacion_origen_id, m.ubicacion_destino_id) if u])
+        st.dataframe(pd.DataFrame([
+            {"Fecha": m.fecha.strftime('%Y-%m-%d %H:%M'), "Tipo": m.tipo, "Cantidad": m.cantidad,
+             "Origen": rutas.get(m.ubicacion_origen_id, ""), "Destino": rutas.get(m.ubicacion_destino_id, "")}
+            for m in movimientos
+        ]), hide_index=True)
+
 def show_inventario_page():
     st.title("📦 Gestión de Inventario")
 
@@ -24,7 +209,7 @@ def show_inventario_page():
     with tab1:
         st.header("Dar de alta Nuevo Item")
 
-        db: Session = next(get_db())
+        db: Session = get_page_db()
         try:
             next_item_num = get_next_item_number(db)
             st.info(f"**Número de Item:** `{next_item_num}` (Generado automáticamente)")
@@ -48,79 +233,7 @@ def show_inventario_page():
 
             st.subheader("Seleccionar Ubicación del Item")
 
-            if 'inventory_hierarchy_selection' not in st.session_state:
-                st.session_state.inventory_hierarchy_selection = {}
-            if 'inventory_final_selected_activo_id' not in st.session_state:
-                st.session_state.inventory_final_selected_activo_id = None
-            
-            selected_ubicacion_id = None
-            current_parent_id_inventory_loop = None
-            level_inventory = 0
-
-            while True:
-                # Rompe el bucle si se excede la profundidad máxima para evitar infinitos selectbox
-                if level_inventory >= MAX_HIERARCHY_DEPTH:
-                    st.warning(f"Se alcanzó la profundidad máxima de ubicación ({MAX_HIERARCHY_DEPTH} niveles).")
-                    break
-
-                level_key_inventory = f'inventory_level_{level_inventory}'
-                
-                current_level_activos_inventory = get_activos(db, parent_id=current_parent_id_inventory_loop, for_module='inventario')
-
-                if not current_level_activos_inventory:
-                    st.session_state.inventory_final_selected_activo_id = current_parent_id_inventory_loop
-                    break
-
-                options_labels_inventory = ["--- Selecciona ---"] + \
-                                         [f"{a.nombre} ({a.tipo})" for a in current_level_activos_inventory]
-                options_ids_inventory = [None] + [a.id for a in current_level_activos_inventory]
-
-                default_index_inventory = 0
-                if level_key_inventory in st.session_state.inventory_hierarchy_selection and \
-                   st.session_state.inventory_hierarchy_selection[level_key_inventory] is not None:
-                    try:
-                        default_index_inventory = options_ids_inventory.index(
-                            st.session_state.inventory_hierarchy_selection[level_key_inventory]
-                        )
-                    except ValueError:
-                        default_index_inventory = 0
-
-                selected_display_label_inventory = st.selectbox(
-                    f"Nivel {level_inventory + 1} de Ubicación",
-                    options=options_labels_inventory,
-                    index=default_index_inventory,
-                    key=f"inventory_ubicacion_select_level_{level_inventory}",
-                    help=f"Selecciona la ubicación del item en el nivel {level_inventory + 1}."
-                )
-                
-                actual_selected_id_inventory = options_ids_inventory[options_labels_inventory.index(selected_display_label_inventory)] if selected_display_label_inventory != "--- Selecciona ---" else None
-
-                if actual_selected_id_inventory != st.session_state.inventory_hierarchy_selection.get(level_key_inventory):
-                    st.session_state.inventory_hierarchy_selection[level_key_inventory] = actual_selected_id_inventory
-                    keys_to_delete_inventory = []
-                    for k in st.session_state.inventory_hierarchy_selection.keys():
-                        if k.startswith('inventory_level_'):
-                            try:
-                                current_level_num = int(k.split('_')[2])
-                                if current_level_num > level_inventory:
-                                    keys_to_delete_inventory.append(k)
-                            except (ValueError, IndexError):
-                                continue
-
-                    for k in keys_to_delete_inventory:
-                        del st.session_state.inventory_hierarchy_selection[k]
-                    
-                    st.session_state.inventory_final_selected_activo_id = actual_selected_id_inventory
-                    st.rerun()
-
-                if actual_selected_id_inventory is None:
-                    st.session_state.inventory_final_selected_activo_id = None
-                    break
-                
-                current_parent_id_inventory_loop = actual_selected_id_inventory
-                level_inventory += 1
-            
-            selected_ubicacion_id = st.session_state.inventory_final_selected_activo_id
+            selected_ubicacion_id = CASCADA_ALTA.show(db)
 
             if selected_ubicacion_id:
                 full_path_display_inventory = get_activo_full_path(db, selected_ubicacion_id)
@@ -158,12 +271,12 @@ def show_inventario_page():
                         )
                         st.success(f"Item {new_inventory_item.numero_item} '{new_inventory_item.numero_serie}' dado de alta exitosamente!")
                         
-                        st.session_state.inventory_hierarchy_selection = {}
-                        st.session_state.inventory_final_selected_activo_id = None
+                        CASCADA_ALTA.reset()
                         
                         st.rerun() 
 
                     except Exception as e:
+                        db.rollback()
                         st.error(f"Error al dar de alta el item: {e}")
                         if "duplicate key value violates unique constraint" in str(e).lower() and "numero_serie" in str(e).lower():
                             st.error("Error: El número de serie ingresado ya existe. Por favor, introduce uno único.")
@@ -172,170 +285,122 @@ def show_inventario_page():
 
         except Exception as e:
             st.error(f"Error al cargar la página de alta de items: {e}")
-        finally:
-            db.close()
+
+        show_import_panel(db)
 
     with tab2:
         st.header("Ver Inventario")
-        db: Session = next(get_db())
-        try:
-            # --- SECCIÓN DE FILTROS ---
-            st.subheader("Filtros de Inventario")
-            col_filter1, col_filter2 = st.columns(2)
-
-            with col_filter1:
-                item_number_filter = st.text_input("Filtrar por Número de Item:", key="filter_item_number", help="Introduce un número de item o parte de él.")
-                # Si el filtro por número de ítem cambia, resetear la selección de ubicación
-                if "last_item_number_filter_value" not in st.session_state:
-                    st.session_state.last_item_number_filter_value = ""
-                if item_number_filter != st.session_state.last_item_number_filter_value:
-                    st.session_state.last_item_number_filter_value = item_number_filter
-                    st.session_state.view_inventory_hierarchy_selection = {}
-                    st.session_state.view_inventory_final_selected_activo_id = None
+        db: Session = get_page_db()
+        # --- SECCIÓN DE FILTROS ---
+        st.subheader("Filtros de Inventario")
+        col_filter1, col_filter2 = st.columns(2)
+
+        with col_filter1:
+            inventory_search_text = st.text_input("Buscar por Número de Item, Serie o Descripción:", key="filter_item_number", help="Introduce un número de item, de serie o parte de la descripción breve.")
+            # Si el filtro por número de ítem cambia, resetear la selección de ubicación
+            if "last_item_number_filter_value" not in st.session_state:
+                st.session_state.last_item_number_filter_value = ""
+            if inventory_search_text != st.session_state.last_item_number_filter_value:
+                st.session_state.last_item_number_filter_value = inventory_search_text
+                CASCADA_FILTRO.reset()
+                st.rerun()
+
+        with col_filter2:
+            # --- Filtro Jerárquico de Ubicación ---
+            selected_view_location_id = CASCADA_FILTRO.show(db)
+            if selected_view_location_id:
+                st.info(f"Filtro de ubicación activo: {get_activo_full_path(db, selected_view_location_id)}")
+        st.markdown("---")
+
+
+        # --- PAGINACIÓN POR CLAVE (solo se consulta la página visible) ---
+        page_size = st.selectbox("Items por página:", PAGE_SIZE_OPTIONS, key="inventory_page_size")
+        page_filter_key = (inventory_search_text or None, selected_view_location_id, page_size)
+        if st.session_state.get('inventory_page_filter_key') != page_filter_key:
+            st.session_state.inventory_page_filter_key = page_filter_key
+            st.session_state.inventory_page_cursors = [None]
+        page_cursors = st.session_state.inventory_page_cursors
+
+        items, next_cursor = get_inventory_items_page(db,
+                                                      page_size=page_size,
+                                                      after=page_cursors[-1],
+                                                      search_text=inventory_search_text if inventory_search_text else None,
+                                                      location_id_filter=selected_view_location_id)
+
+        if items:
+            st.write("Lista de Items en Inventario:")
+            
+            # Rutas de ubicación resueltas en lote desde el árbol en memoria (sin consultas por fila)
+            ubicacion_paths = paths_for(db, [item.ubicacion_id for item in items])
+
+            item_data = []
+            for item in items:
+                ubicacion_path = ubicacion_paths.get(item.ubicacion_id, "N/A")
+                item_data.append({
+                    "ID": item.id,
+                    "Número Item": item.numero_item,
+                    "Tipo": item.tipo_item,
+                    "Número de Serie": item.numero_serie,
+                    "Estado": item.estado_funcionamiento,
+                    "Ubicación": ubicacion_path,
+                    "Fecha de Alta": item.fecha_alta.strftime('%Y-%m-%d %H:%M')
+                })
+            
+            df_items = pd.DataFrame(item_data)
+            
+            st.dataframe(df_items, use_container_width=True, hide_index=True)
+
+            total_estimado = estimate_inventory_count(db,
+                                                      search_text=inventory_search_text if inventory_search_text else None,
+                                                      location_id_filter=selected_view_location_id)
+            col_prev, col_page, col_next = st.columns([1, 2, 1])
+            with col_prev:
+                if st.button("⬅️ Anterior", key="inventory_prev_page", disabled=len(page_cursors) == 1):
+                    page_cursors.pop()
+                    st.rerun()
+            with col_page:
+                st.write(f"Página {len(page_cursors)} · ~{total_estimado} items en total")
+            with col_next:
+                if st.button("Siguiente ➡️", key="inventory_next_page", disabled=next_cursor is None):
+                    page_cursors.append(next_cursor)
                     st.rerun()
 
-            with col_filter2:
-                # --- Filtro Jerárquico de Ubicación ---
-                if 'view_inventory_hierarchy_selection' not in st.session_state:
-                    st.session_state.view_inventory_hierarchy_selection = {}
-                if 'view_inventory_final_selected_activo_id' not in st.session_state:
-                    st.session_state.view_inventory_final_selected_activo_id = None
-                
-                current_parent_id_view_inventory = None
-                level_view_inventory = 0
-                
-                selected_view_location_id = None
-
-                while True:
-                    # Rompe el bucle si se excede la profundidad máxima para evitar infinitos selectbox
-                    if level_view_inventory >= MAX_HIERARCHY_DEPTH:
-                        st.warning(f"Se alcanzó la profundidad máxima de ubicación ({MAX_HIERARCHY_DEPTH} niveles) para el filtro.")
-                        break
-
-                    view_level_key = f'view_inventory_level_{level_view_inventory}'
+            st.markdown("---")
+            st.subheader("Ver Detalles de Item")
+            st.info("Introduce el Número de Serie o Número de Item para ver los detalles completos de un item.")
+            detail_search_input = st.text_input("Número de Serie o Número de Item:", key="detail_search_input")
+            
+            if detail_search_input:
+                item_to_show = get_inventory_item_by_serial_or_number(db, detail_search_input)
+                if item_to_show:
+                    st.write(f"**Detalles del Item: {item_to_show.numero_item}**")
+                    st.write(f"**Tipo:** {item_to_show.tipo_item}")
+                    st.write(f"**Número de Serie:** {item_to_show.numero_serie}")
+                    st.write(f"**Descripción Breve:** {item_to_show.descripcion_breve}")
+                    st.write(f"**Descripción Detallada:** {item_to_show.descripcion_detallada}")
+                    st.write(f"**Estado de Funcionamiento:** {item_to_show.estado_funcionamiento}")
+                    st.write(f"**Fecha de Alta:** {item_to_show.fecha_alta.strftime('%Y-%m-%d %H:%M:%S')}")
+                    st.write(f"**Cantidad:** {item_to_show.cantidad}")
+                    st.write(f"**Precio Estimado (USD):** ${item_to_show.precio_estimado_usd:.2f}")
                     
-                    current_view_level_activos = get_activos(db, parent_id=current_parent_id_view_inventory, for_module='inventario')
-
-                    if not current_view_level_activos:
-                        selected_view_location_id = current_parent_id_view_inventory
-                        break
-
-                    view_options_labels = ["--- Selecciona Ubicación ---"] + \
-                                            [f"{a.nombre} ({a.tipo})" for a in current_view_level_activos]
-                    view_options_ids = [None] + [a.id for a in current_view_level_activos]
-
-                    default_view_index = 0
-                    if view_level_key in st.session_state.view_inventory_hierarchy_selection and \
-                       st.session_state.view_inventory_hierarchy_selection[view_level_key] is not None:
-                        try:
-                            default_view_index = view_options_ids.index(
-                                st.session_state.view_inventory_hierarchy_selection[view_level_key]
-                            )
-                        except ValueError:
-                            default_view_index = 0
-
-                    selected_view_display_label = st.selectbox(
-                        f"Ubicación (Nivel {level_view_inventory + 1}):",
-                        options=view_options_labels,
-                        index=default_view_index,
-                        key=f"view_inventory_ubicacion_select_level_{level_view_inventory}",
-                        help=f"Filtra por ubicación en el nivel {level_view_inventory + 1}."
-                    )
+                    alta_por_user = db.query(Usuario).get(item_to_show.dado_de_alta_por_id)
+                    st.write(f"**Dado de alta por:** {alta_por_user.nombre_usuario if alta_por_user else 'N/A'}")
                     
-                    actual_selected_view_id = view_options_ids[view_options_labels.index(selected_view_display_label)] if selected_view_display_label != "--- Selecciona Ubicación ---" else None
-
-                    if actual_selected_view_id != st.session_state.view_inventory_hierarchy_selection.get(view_level_key):
-                        st.session_state.view_inventory_hierarchy_selection[view_level_key] = actual_selected_view_id
-                        keys_to_delete_view = []
-                        for k in st.session_state.view_inventory_hierarchy_selection.keys():
-                            if k.startswith('view_inventory_level_'):
-                                try:
-                                    current_level_num = int(k.split('_')[2])
-                                    if current_level_num > level_view_inventory:
-                                        keys_to_delete_view.append(k)
-                                except (ValueError, IndexError):
-                                    continue
-
-                        for k in keys_to_delete_view:
-                            del st.session_state.view_inventory_hierarchy_selection[k]
-                        
-                        st.session_state.view_inventory_final_selected_activo_id = actual_selected_view_id
-                        st.rerun()
+                    ubicacion_item_path = get_activo_full_path(db, item_to_show.ubicacion_id)
+                    st.write(f"**Ubicación:** {ubicacion_item_path}")
 
-                    # Si se selecciona "--- Selecciona Ubicación ---" en cualquier nivel, romper el bucle.
-                    if actual_selected_view_id is None:
-                        st.session_state.view_inventory_final_selected_activo_id = None
-                        break
-                    
-                    current_parent_id_view_inventory = actual_selected_view_id
-                    level_view_inventory += 1
-                
-                selected_view_location_id = st.session_state.view_inventory_final_selected_activo_id
-                if selected_view_location_id:
-                    st.info(f"Filtro de ubicación activo: {get_activo_full_path(db, selected_view_location_id)}")
-            st.markdown("---")
-
-
-            items = get_inventory_items(db, 
-                                        item_number_filter=item_number_filter if item_number_filter else None, 
-                                        location_id_filter=selected_view_location_id)
-
-            if items:
-                st.write("Lista de Items en Inventario:")
-                
-                item_data = []
-                for item in items:
-                    ubicacion_path = get_activo_full_path(db, item.ubicacion_id) if item.ubicacion_id else "N/A"
-                    item_data.append({
-                        "ID": item.id,
-                        "Número Item": item.numero_item,
-                        "Tipo": item.tipo_item,
-                        "Número de Serie": item.numero_serie,
-                        "Estado": item.estado_funcionamiento,
-                        "Ubicación": ubicacion_path,
-                        "Fecha de Alta": item.fecha_alta.strftime('%Y-%m-%d %H:%M')
-                    })
-                
-                df_items = pd.DataFrame(item_data)
-                
-                st.dataframe(df_items, use_container_width=True, hide_index=True)
-
-                st.markdown("---")
-                st.subheader("Ver Detalles de Item")
-                st.info("Introduce el Número de Serie o Número de Item para ver los detalles completos de un item.")
-                detail_search_input = st.text_input("Número de Serie o Número de Item:", key="detail_search_input")
-                
-                if detail_search_input:
-                    item_to_show = get_inventory_item_by_serial_or_number(db, detail_search_input)
-                    if item_to_show:
-                        st.write(f"**Detalles del Item: {item_to_show.numero_item}**")
-                        st.write(f"**Tipo:** {item_to_show.tipo_item}")
-                        st.write(f"**Número de Serie:** {item_to_show.numero_serie}")
-                        st.write(f"**Descripción Breve:** {item_to_show.descripcion_breve}")
-                        st.write(f"**Descripción Detallada:** {item_to_show.descripcion_detallada}")
-                        st.write(f"**Estado de Funcionamiento:** {item_to_show.estado_funcionamiento}")
-                        st.write(f"**Fecha de Alta:** {item_to_show.fecha_alta.strftime('%Y-%m-%d %H:%M:%S')}")
-                        st.write(f"**Cantidad:** {item_to_show.cantidad}")
-                        st.write(f"**Precio Estimado (USD):** ${item_to_show.precio_estimado_usd:.2f}")
-                        
-                        alta_por_user = db.query(Usuario).get(item_to_show.dado_de_alta_por_id)
-                        st.write(f"**Dado de alta por:** {alta_por_user.nombre_usuario if alta_por_user else 'N/A'}")
-                        
-                        ubicacion_item_path = get_activo_full_path(db, item_to_show.ubicacion_id)
-                        st.write(f"**Ubicación:** {ubicacion_item_path}")
-
-                        if item_to_show.producto_asociado:
-                            st.write(f"**Producto Asociado:** {item_to_show.producto_asociado.nombre}")
-                    else:
-                        st.warning("Item no encontrado con el Número de Serie o Número de Item proporcionado.")
+                    if item_to_show.producto_asociado:
+                        st.write(f"**Producto Asociado:** {item_to_show.producto_asociado.nombre}")
                 else:
-                    st.info("Ingresa un número de serie o número de item para ver los detalles de un item.")
-
+                    st.warning("Item no encontrado con el Número de Serie o Número de Item proporcionado.")
             else:
-                st.info("No hay ítems registrados en el inventario o no coinciden con los filtros aplicados.")
-        finally:
-            db.close()
+                st.info("Ingresa un número de serie o número de item para ver los detalles de un item.")
+
+        else:
+            st.info("No hay ítems registrados en el inventario o no coinciden con los filtros aplicados.")
+
+        show_export_panel(db)
 
     with tab3:
-        st.header("Actualizar Item (En Desarrollo)")
-        st.info("La funcionalidad para actualizar ítems se implementará en una futura versión.")
+        st.header("Movimientos de Item")
+        show_movimientos_panel(get_page_db())
@@ -1,29 +1,195 @@
 # modules/ordenes.py
 
+import uuid
 import streamlit as st
+import pandas as pd
 from sqlalchemy.orm import Session
 from datetime import datetime
-from utils.database import get_db
+from utils.database import get_page_db
 from utils.ordenes_trabajo import (
-    create_orden_trabajo, get_ordenes_trabajo, update_orden_estado,
+    create_orden_trabajo, get_ordenes_listado, update_orden_estado,
     get_usuarios_por_rol, assign_orden_to_user, get_next_order_number,
-    get_activos, get_activo_full_path, get_activo_by_id,
-    find_activos_by_name_or_tag
+    get_activo_full_path, get_activo_by_id,
+    find_activos_by_name_or_tag, find_activos_by_tag_prefix
 )
+from utils.arbol_activos import get_arbol_activos, paths_for
+from utils.campanas import get_campaign_target_types, create_campaign
+from utils.planes_mantenimiento import UNIDADES, create_plan, get_planes, set_plan_habilitado
+from utils.reservas_stock import get_disponible
+from modules.componentes import CascadaUbicacion
 from models import Usuario, Activo, OrdenTrabajo, ItemOrden, Producto
 
 # Opciones de Criticidad
 CRITICIDAD_OPTIONS = ["Emergencial", "Urgente", "Alto", "Medio", "Bajo"]
 
+# Cascada de ubicación del formulario de órdenes (excluye los sitios de inventario)
+CASCADA_ORDENES = CascadaUbicacion(
+    selection_key='hierarchy_selection',
+    final_key='final_selected_activo_id',
+    level_prefix='level_',
+    widget_key="ubicacion_select_level_{level}_hierarchical",
+    label="Nivel {n} de Ubicación (Jerarquía)",
+    help="Selecciona un activo en el nivel {n} de la jerarquía.",
+    for_module='ordenes'
+)
+
+# Cascada del subárbol objetivo de una campaña preventiva
+CASCADA_CAMPANA = CascadaUbicacion(
+    selection_key='campana_hierarchy_selection',
+    final_key='campana_final_selected_activo_id',
+    level_prefix='campana_level_',
+    widget_key="campana_ubicacion_select_level_{level}",
+    label="Nivel {n} del subárbol",
+    help="Selecciona el activo raíz de la campaña en el nivel {n}.",
+    for_module='ordenes',
+    allow_partial=True
+)
+
+def show_tag_picker(db: Session):
+    """
+    Selector por tag: al escribir un tag (o su comienzo) y presionar Enter muestra las coincidencias
+    del índice de tags en memoria; un tag exacto se selecciona directamente.
+    """
+    tag_query = st.text_input("Buscar activo por tag", key="ordenes_tag_query",
+                              placeholder="Ej: P01-HSV-C042-M117",
+                              help="Escribe el tag completo o su comienzo y presiona Enter.")
+    if not tag_query:
+        st.session_state.ordenes_tag_applied = None
+        return
+
+    matches = find_activos_by_tag_prefix(db, tag_query, for_module='ordenes')
+    if not matches:
+        st.caption("No hay activos con ese tag.")
+        return
+
+    exact = [m for m in matches if m["nombre"].lower() == tag_query.strip().lower()]
+    if len(exact) == 1:
+        # Tag completo: se selecciona una sola vez por texto ingresado, sin pisar cambios posteriores
+        if st.session_state.get('ordenes_tag_applied') != tag_query:
+            st.session_state.ordenes_tag_applied = tag_query
+            CASCADA_ORDENES.select(db, exact[0]["id"])
+            st.rerun()
+        return
+
+    options_labels = ["--- Selecciona ---"] + [f"{m['nombre']} ({m['tipo']}) · {m['ruta']}" for m in matches]
+    options_ids = [None] + [m["id"] for m in matches]
+    selected_label = st.selectbox("Coincidencias", options_labels, key=f"ordenes_tag_match_{tag_query}")
+    selected_id = options_ids[options_labels.index(selected_label)]
+    if selected_id is not None and st.session_state.get('ordenes_tag_applied') != (tag_query, selected_id):
+        st.session_state.ordenes_tag_applied = (tag_query, selected_id)
+        CASCADA_ORDENES.select(db, selected_id)
+        st.rerun()
+
+def show_campana_tab(db: Session):
+    """
+    Campaña de mantenimiento preventivo: una orden por cada activo de un tipo dentro de un subárbol
+    (ej: todos los mineros de un contenedor), creada por lotes con barra de progreso.
+    """
+    st.header("Campaña de Mantenimiento Preventivo")
+    root_id = CASCADA_CAMPANA.show(db)
+    if not root_id:
+        st.info("Selecciona el subárbol (sitio, área, contenedor...) sobre el que se crea la campaña.")
+        return
+    st.write(f"Subárbol: **{get_activo_full_path(db, root_id)}**")
+
+    tipos = get_campaign_target_types(db, root_id)
+    if not tipos:
+        st.warning("El activo seleccionado no tiene descendientes.")
+        return
+    etiquetas = [f"{tipo} · {tipo_padre or 'sin padre'} ({cantidad})" for tipo, tipo_padre, cantidad in tipos]
+    seleccion = st.selectbox("Activos objetivo (tipo · tipo del padre)", etiquetas, key="campana_objetivo")
+    tipo, tipo_padre, cantidad = tipos[etiquetas.index(seleccion)]
+
+    titulo = st.text_input("Título de las órdenes", key="campana_titulo",
+                           help="Cada orden lleva además el tag de su activo (ej: 'Limpieza de filtros - P01-HSV-C042-M117').")
+    descripcion = st.text_area("Descripción", key="campana_descripcion")
+    criticidad = st.selectbox("Criticidad", CRITICIDAD_OPTIONS, index=CRITICIDAD_OPTIONS.index("Medio"), key="campana_criticidad")
+    fecha_limite = st.date_input("Fecha Límite (opcional)", value=None, key="campana_fecha_limite")
+
+    productos = {p.nombre: p.id for p in db.query(Producto).order_by(Producto.nombre)}
+    seleccion_productos = st.multiselect("Productos por orden (1 unidad de cada uno, opcional)", list(productos), key="campana_productos")
+
+    if st.button(f"Crear {cantidad} órdenes", key="campana_crear"):
+        if not titulo or not descripcion or not st.session_state.get('user_id'):
+            st.error("Por favor, completa el título y la descripción de la campaña.")
+            return
+        barra = st.progress(0.0, text="Creando órdenes...")
+        # Si falla a mitad, el reintento de la misma campaña (mismo subárbol, objetivo y título) usa la misma
+        # clave y solo crea las órdenes que faltan
+        intento = (root_id, tipo, tipo_padre, titulo)
+        pendiente = st.session_state.get('campana_pendiente')
+        clave = pendiente[1] if pendiente and pendiente[0] == intento else uuid.uuid4().hex
+        try:
+            resultado = create_campaign(
+                db, root_id, tipo, titulo, descripcion, criticidad,
+                datetime.combine(fecha_limite, datetime.min.time()) if fecha_limite else None,
+                st.session_state.get('user_id'), tipo_padre=tipo_padre,
+                items_orden=[{"producto_id": productos[nombre], "cantidad": 1} for nombre in seleccion_productos],
+                progreso=lambda creadas, total: barra.progress(creadas / total, text=f"{creadas} de {total} órdenes creadas"),
+                clave=clave
+            )
+            st.session_state.pop('campana_pendiente', None)
+            mensaje = f"Campaña creada: {resultado.ordenes} órdenes"
+            if resultado.ordenes:
+                mensaje += f" ({resultado.primer_numero} a {resultado.ultimo_numero})"
+            if resultado.omitidas:
+                mensaje += f"; {resultado.omitidas} activos ya tenían su orden del intento anterior"
+            st.success(mensaje + ".")
+        except Exception as e:
+            st.session_state['campana_pendiente'] = (intento, clave)
+            st.error(f"Error al crear la campaña: {e}. Puedes reintentarla: solo se crearán las órdenes que falten.")
+
+    with st.expander("🔁 Programar como plan recurrente"):
+        st.caption("El planificador genera la campaña en cada vencimiento (sin ítems de productos).")
+        col_intervalo, col_unidad = st.columns(2)
+        intervalo = col_intervalo.number_input("Cada", min_value=1, value=30, step=1, key="plan_intervalo")
+        unidad = col_unidad.selectbox("Unidad", UNIDADES, key="plan_unidad")
+        primer_vencimiento = st.date_input("Primer vencimiento", value=datetime.today(), key="plan_primer_vencimiento")
+        if st.button("Guardar plan", key="plan_guardar"):
+            if not titulo or not descripcion or not st.session_state.get('user_id'):
+                st.error("Por favor, completa el título y la descripción de la campaña.")
+            else:
+                plan = create_plan(db, titulo, titulo, descripcion, criticidad, root_id, int(intervalo), unidad,
+                                   st.session_state.get('user_id'), tipo_objetivo=tipo, tipo_padre=tipo_padre,
+                                   primer_vencimiento=datetime.combine(primer_vencimiento, datetime.min.time()))
+                st.success(f"Plan '{plan.nombre}' guardado; vence el {plan.proximo_vencimiento.strftime('%Y-%m-%d')}.")
+
+def show_planes_panel(db: Session):
+    """
+    Listado de los planes de mantenimiento recurrente, con pausa y reanudación.
+    """
+    st.subheader("Planes Recurrentes")
+    planes = get_planes(db)
+    if not planes:
+        st.info("No hay planes recurrentes.")
+        return
+    rutas = paths_for(db, [plan.activo_id for plan in planes])
+    st.dataframe(pd.DataFrame([{
+        "Plan": plan.nombre,
+        "Activo / Subárbol": rutas.get(plan.activo_id, ""),
+        "Objetivo": " · ".join(t for t in (plan.tipo_objetivo, plan.tipo_padre) if t) or "El activo",
+        "Frecuencia": f"Cada {plan.intervalo} {plan.unidad}",
+        "Próximo vencimiento": plan.proximo_vencimiento.strftime('%Y-%m-%d %H:%M'),
+        "Órdenes generadas": plan.ordenes_generadas,
+        "Estado": "Activo" if plan.habilitado else "Pausado",
+    } for plan in planes]), use_container_width=True, hide_index=True)
+
+    opciones = {f"{plan.nombre} (#{plan.id})": plan for plan in planes}
+    seleccion = st.selectbox("Plan", list(opciones), key="plan_seleccion")
+    plan = opciones[seleccion]
+    if st.button("Pausar" if plan.habilitado else "Reanudar", key="plan_alternar"):
+        set_plan_habilitado(db, plan.id, not plan.habilitado)
+        st.rerun()
+
 def show_ordenes_page():
     st.title("⚙️ Órdenes de Trabajo")
 
-    tab1, tab2 = st.tabs(["Crear Nueva Orden", "Ver Todas las Órdenes"])
+    tab1, tab2, tab3 = st.tabs(["Crear Nueva Orden", "Ver Todas las Órdenes", "Campaña Preventiva"])
 
     with tab1:
         st.header("Crear Nueva Orden de Trabajo")
 
-        db: Session = next(get_db())
+        db: Session = get_page_db()
         try:
             next_order_num = get_next_order_number(db)
             st.info(f"**Número de Orden:** `{next_order_num}` (Generado automáticamente)")
@@ -47,73 +213,21 @@ def show_ordenes_page():
             if 'selected_minero_id' in st.session_state: del st.session_state.selected_minero_id
             if 'minero_search_active' in st.session_state: del st.session_state.minero_search_active
 
-            # Asegurar que las variables de session_state para esta página estén inicializadas
-            if 'hierarchy_selection' not in st.session_state:
-                st.session_state.hierarchy_selection = {}
-            if 'final_selected_activo_id' not in st.session_state:
-                st.session_state.final_selected_activo_id = None
+            # --- SELECCIÓN DIRECTA POR TAG (atajo a la cascada) ---
+            show_tag_picker(db)
 
-            current_parent_id_for_loop = None # Rastrea el ID del padre para el nivel actual del selector
-            
             # --- SELECCIÓN JERÁRQUICA (Cascading Selectboxes) ---
-            level = 0
-            while True:
-                level_key = f'level_{level}'
-                
-                # <--- CAMBIO AQUÍ: Pasar 'ordenes' al get_activos
-                current_level_activos = get_activos(db, parent_id=current_parent_id_for_loop, for_module='ordenes')
-
-                if not current_level_activos:
-                    st.session_state.final_selected_activo_id = current_parent_id_for_loop
-                    break
-
-                options_labels = ["--- Selecciona ---"] + [f"{a.nombre} ({a.tipo})" for a in current_level_activos]
-                options_ids = [None] + [a.id for a in current_level_activos]
-
-                default_index = 0
-                if level_key in st.session_state.hierarchy_selection and st.session_state.hierarchy_selection[level_key] is not None:
-                    try:
-                        default_index = options_ids.index(st.session_state.hierarchy_selection[level_key])
-                    except ValueError:
-                        default_index = 0
-
-                selected_display_label = st.selectbox(
-                    f"Nivel {level + 1} de Ubicación (Jerarquía)",
-                    options=options_labels,
-                    index=default_index,
-                    key=f"ubicacion_select_level_{level}_hierarchical",
-                    help=f"Selecciona un activo en el nivel {level + 1} de la jerarquía."
-                )
-                
-                actual_selected_id = options_ids[options_labels.index(selected_display_label)] if selected_display_label != "--- Selecciona ---" else None
-
-                if actual_selected_id != st.session_state.hierarchy_selection.get(level_key):
-                    st.session_state.hierarchy_selection[level_key] = actual_selected_id
-                    keys_to_delete = [k for k in st.session_state.hierarchy_selection if int(k.split('_')[1]) > level]
-                    for k in keys_to_delete:
-                        del st.session_state.hierarchy_selection[k]
-                    
-                    st.session_state.final_selected_activo_id = actual_selected_id
-                    st.rerun()
-
-                if actual_selected_id is None:
-                    st.session_state.final_selected_activo_id = None
-                    break 
-                
-                current_parent_id_for_loop = actual_selected_id
-                level += 1
-            
-            # --- FIN LÓGICA DE SELECCIÓN DE UBICACIÓN ---
-
-            selected_activo_id = st.session_state.final_selected_activo_id
+            selected_activo_id = CASCADA_ORDENES.show(db)
 
             if selected_activo_id:
-                activo_seleccionado_obj = get_activo_by_id(db, selected_activo_id)
-                if activo_seleccionado_obj:
-                    if activo_seleccionado_obj.tipo == "Equipo":
-                        ubicacion_path = get_activo_full_path(db, activo_seleccionado_obj.parent_id) if activo_seleccionado_obj.parent_id else "N/A"
+                # Datos del activo desde el árbol en memoria (sin consulta en cada rerun)
+                arbol = get_arbol_activos(db)
+                if selected_activo_id in arbol:
+                    if arbol.tipo(selected_activo_id) == "Equipo":
+                        parent_id = arbol.parent_id(selected_activo_id)
+                        ubicacion_path = get_activo_full_path(db, parent_id) if parent_id else "N/A"
                         st.write(f"Ubicación: **{ubicacion_path}**")
-                        st.write(f"Activo Final: **{activo_seleccionado_obj.nombre}**")
+                        st.write(f"Activo Final: **{arbol.nombre(selected_activo_id)}**")
                     else:
                         full_path_display = get_activo_full_path(db, selected_activo_id)
                         st.write(f"Ubicación: **{full_path_display}**")
@@ -125,8 +239,17 @@ def show_ordenes_page():
 
 
             st.subheader("Items de la Orden (Opcional)")
-            st.info("La lógica para añadir ítems a la orden se implementará más adelante.")
-            items_para_orden = [] 
+            productos = {p.nombre: p.id for p in db.query(Producto).order_by(Producto.nombre)}
+            seleccion_productos = st.multiselect("Productos", list(productos), key="orden_productos")
+            disponibles = get_disponible(db, [productos[nombre] for nombre in seleccion_productos])
+            items_para_orden = []
+            for nombre in seleccion_productos:
+                producto_id = productos[nombre]
+                cantidad_item = st.number_input(f"Cantidad de {nombre} (disponible: {disponibles[producto_id]})",
+                                                min_value=1, value=1, step=1, key=f"orden_cantidad_{producto_id}")
+                items_para_orden.append({"producto_id": producto_id, "cantidad": cantidad_item})
+            reservar_stock = st.checkbox("Reservar stock de los productos", value=True, key="orden_reservar",
+                                         help="Compromete las unidades en inventario al crear la orden; si no alcanzan, la orden no se crea.")
 
             if st.button("Crear Orden de Trabajo"):
                 if not titulo or not descripcion or not criticidad or not selected_activo_id or not generado_por_id:
@@ -143,47 +266,41 @@ def show_ordenes_page():
                             ubicacion_id=selected_activo_id,
                             generado_por_id=generado_por_id,
                             asignado_a_id=None,
-                            items_orden=[]
+                            items_orden=items_para_orden,
+                            reservar_stock=reservar_stock
                         )
                         st.success(f"Orden de Trabajo '{nueva_orden.numero_orden}' creada con éxito!")
                         
-                        st.session_state.hierarchy_selection = {}
-                        st.session_state.final_selected_activo_id = None
+                        CASCADA_ORDENES.reset()
                         st.rerun() 
                     except Exception as e:
+                        db.rollback()
                         st.error(f"Error al crear la orden de trabajo: {e}")
 
         except Exception as e:
             st.error(f"Error al cargar la página de creación de órdenes: {e}")
-        finally:
-            db.close()
 
     with tab2:
         st.header("Órdenes de Trabajo Existentes")
-        db: Session = next(get_db())
-        try:
-            ordenes = get_ordenes_trabajo(db)
-            if ordenes:
-                st.write("Lista de todas las órdenes de trabajo:")
-                for orden in ordenes:
-                    st.markdown(f"**Orden #{orden.numero_orden} - {orden.titulo}**")
-                    st.write(f"  Estado: {orden.estado} | Criticidad: {orden.criticidad}")
-                    
-                    if orden.ubicacion_id:
-                        activo_orden = get_activo_by_id(db, orden.ubicacion_id)
-                        if activo_orden and activo_orden.tipo == "Equipo":
-                            ubicacion_path = get_activo_full_path(db, activo_orden.parent_id) if activo_orden.parent_id else "N/A"
-                            st.write(f"  Ubicación: **{ubicacion_path}**")
-                            st.write(f"  Activo Final: **{activo_orden.nombre}**")
-                        else:
-                            ubicacion_path = get_activo_full_path(db, orden.ubicacion_id)
-                            st.write(f"  Ubicación: **{ubicacion_path}**")
-                            st.write("  Activo Final: N/A (Ubicación de nivel superior)")
-                    
-                    st.write(f"  Generada por: {orden.generado_por.nombre_usuario if orden.generado_por else 'N/A'}")
-                    st.write(f"  Fecha Límite: {orden.fecha_limite.strftime('%Y-%m-%d') if orden.fecha_limite else 'N/A'}")
-                    st.markdown("---")
-            else:
-                st.info("No hay órdenes de trabajo registradas.")
-        finally:
-            db.close()
+        db: Session = get_page_db()
+        ordenes = get_ordenes_listado(db)
+        if ordenes:
+            st.write("Lista de todas las órdenes de trabajo:")
+            df_ordenes = pd.DataFrame([{
+                "Orden": orden["numero_orden"],
+                "Título": orden["titulo"],
+                "Estado": orden["estado"],
+                "Criticidad": orden["criticidad"],
+                "Ubicación": orden["ubicacion"],
+                "Activo Final": orden["activo_final"] or "N/A",
+                "Generada por": orden["generado_por"] or "N/A",
+                "Asignada a": orden["asignado_a"] or "N/A",
+                "Fecha Límite": orden["fecha_limite"].strftime('%Y-%m-%d') if orden["fecha_limite"] else "N/A"
+            } for orden in ordenes])
+            st.dataframe(df_ordenes, use_container_width=True, hide_index=True)
+        else:
+            st.info("No hay órdenes de trabajo registradas.")
+
+    with tab3:
+        show_campana_tab(get_page_db())
+        show_planes_panel(get_page_db())
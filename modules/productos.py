@@ -4,7 +4,7 @@ import streamlit as st
 import pandas as pd
 from sqlalchemy.orm import Session
 from datetime import datetime
-from utils.database import get_db
+from utils.database import get_page_db
 from models import Producto # Importamos el modelo Producto
 
 def show_productos_page():
@@ -15,7 +15,7 @@ def show_productos_page():
     with tab1:
         st.header("Dar de alta Nuevo Producto")
 
-        db: Session = next(get_db())
+        db: Session = get_page_db()
         try:
             nombre = st.text_input("Nombre del Producto", help="Nombre único del tipo de producto (ej: 'Minero Antminer S19 Pro', 'Cooler 120mm').")
             descripcion = st.text_area("Descripción del Producto", help="Descripción detallada del tipo de producto.")
@@ -43,15 +43,14 @@ def show_productos_page():
                             st.success(f"Producto '{new_product.nombre}' dado de alta exitosamente!")
                             st.rerun() # Recargar la página para limpiar el formulario
                     except Exception as e:
+                        db.rollback()
                         st.error(f"Error al dar de alta el producto: {e}")
         except Exception as e:
             st.error(f"Error al cargar la página de alta de productos: {e}")
-        finally:
-            db.close()
 
     with tab2:
         st.header("Productos Existentes")
-        db: Session = next(get_db())
+        db: Session = get_page_db()
         try:
             productos = db.query(Producto).order_by(Producto.nombre).all()
             if productos:
@@ -70,6 +69,4 @@ def show_productos_page():
             else:
                 st.info("No hay productos registrados. Por favor, da de alta algunos productos en la pestaña 'Dar de alta Producto'.")
         except Exception as e:
-            st.error(f"Error al cargar la lista de productos: {e}")
-        finally:
-            db.close()
\ No newline at end of file
+            st.error(f"Error al cargar la lista de productos: {e}")
\ No newline at end of file
@@ -0,0 +1,106 @@
+# scripts/bench_analitica_ordenes.py
+
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import date, timedelta
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from models import Base, HechoOrdenDiario
+from utils.analitica_ordenes import (
+    BUCKETS_RESOLUCION, get_throughput_por_dia, get_histograma_resolucion, get_resumen_vencimientos
+)
+
+CRITICIDADES = ["Emergencial", "Urgente", "Alto", "Medio", "Bajo"]
+
+# Objetivo por consulta de gráfico
+OBJETIVO_MS = 200
+
+def synthetic_facts(years: int, sites: int, seed: int = 11):
+    """
+    Una fila por (día, criticidad, sitio) durante 'years' años: el peor caso de la tabla de hechos.
+    """
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=365 * years)
+    for offset in range(365 * years):
+        dia = start + timedelta(days=offset)
+        for criticidad in CRITICIDADES:
+            for sitio_id in range(1, sites + 1):
+                cerradas = rng.randint(0, 8)
+                row = {
+                    "dia": dia, "criticidad": criticidad, "sitio_id": sitio_id,
+                    "creadas": rng.randint(0, 8), "cerradas": cerradas,
+                    "cerradas_vencidas": rng.randint(0, cerradas),
+                    "segundos_resolucion": cerradas * rng.uniform(3600, 86400 * 10),
+                }
+                row.update({column: 0 for column, _, _ in BUCKETS_RESOLUCION})
+                row[rng.choice(BUCKETS_RESOLUCION)[0]] = cerradas
+                yield row
+
+def best_time(func_, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func_()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide las consultas de analítica de órdenes sobre hechos diarios sintéticos (SQLite en memoria).")
+    parser.add_argument("--years", type=int, default=5, help="Años de historia.")
+    parser.add_argument("--sites", type=int, default=20, help="Cantidad de sitios (raíces de la jerarquía).")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición (se reporta la mejor).")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[HechoOrdenDiario.__table__])
+    db = sessionmaker(bind=engine)()
+    try:
+        start = time.perf_counter()
+        batch = []
+        total = 0
+        for row in synthetic_facts(args.years, args.sites):
+            batch.append(row)
+            if len(batch) == 10000:
+                db.execute(insert(HechoOrdenDiario), batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            db.execute(insert(HechoOrdenDiario), batch)
+            total += len(batch)
+        db.commit()
+        print(f"{total} filas de hechos cargadas en {time.perf_counter() - start:.1f} s")
+
+        hasta = date.today()
+        rangos = {"90 días": hasta - timedelta(days=90), "1 año": hasta - timedelta(days=365),
+                  f"{args.years} años": hasta - timedelta(days=365 * args.years)}
+        consultas = {
+            "creadas vs cerradas": lambda desde: get_throughput_por_dia(db, desde, hasta),
+            "creadas vs cerradas (Urgente)": lambda desde: get_throughput_por_dia(db, desde, hasta, criticidad="Urgente"),
+            "histograma resolución": lambda desde: get_histograma_resolucion(db, desde, hasta),
+            "vencidas por criticidad": lambda desde: get_resumen_vencimientos(db, desde, hasta, por="criticidad"),
+            "vencidas por sitio": lambda desde: get_resumen_vencimientos(db, desde, hasta, por="sitio"),
+        }
+
+        print(f"{'Consulta':<30}" + "".join(f"{nombre + ' (ms)':>18}" for nombre in rangos))
+        peor = 0.0
+        for nombre, consulta in consultas.items():
+            tiempos = [best_time(lambda: consulta(desde), args.repeat) * 1000 for desde in rangos.values()]
+            peor = max(peor, *tiempos)
+            print(f"{nombre:<30}" + "".join(f"{t:>18.1f}" for t in tiempos))
+        estado = "OK" if peor <= OBJETIVO_MS else "EXCEDIDO"
+        print(f"Peor consulta: {peor:.1f} ms (objetivo {OBJETIVO_MS} ms): {estado}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# scripts/bench_busqueda.py
+
+import os
+import sys
+import time
+import random
+import argparse
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from models import Activo
+from utils.busqueda import IndiceNgramas, get_search_index, search_activos
+
+def percentiles(times):
+    times = sorted(times)
+    return times[len(times) // 2] * 1000, times[int(len(times) * 0.95) - 1] * 1000
+
+def synthetic_rows(rows: int):
+    """
+    Filas (id, nombre, descripcion) con tags del estilo de la taxonomía (ej: W03-R12-M145).
+    """
+    for i in range(rows):
+        tag = f"{'WXYZ'[i % 4]}{i // 40000 % 100:02d}-R{i // 200 % 200:02d}-M{i % 200:03d}"
+        yield i + 1, tag, f"Minero {tag} del sector {'WXYZ'[i % 4]}"
+
+def sample_queries(names, count: int, seed: int = 7):
+    """
+    Fragmentos de nombres reales: tags completos, prefijos y subcadenas intermedias.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        name = rng.choice(names)
+        start = rng.randrange(0, max(1, len(name) - 3))
+        end = rng.randrange(min(len(name), start + 3), len(name) + 1)
+        queries.append(rng.choice([name, name[:end], name[start:end]]))
+    return queries
+
+def bench(label, search, queries):
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        times.append(time.perf_counter() - start)
+    p50, p95 = percentiles(times)
+    print(f"{label:<32}{p50:>10.2f}{p95:>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide la latencia de búsqueda de activos por nombre o tag.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Mide solo el índice en memoria sobre N filas sintéticas (sin base de datos).")
+    parser.add_argument("--queries", type=int, default=500, help="Cantidad de búsquedas a medir.")
+    parser.add_argument("--limit", type=int, default=20, help="Resultados por búsqueda.")
+    args = parser.parse_args()
+
+    print(f"{'Método':<32}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+
+    if args.synthetic:
+        start = time.perf_counter()
+        rows = list(synthetic_rows(args.synthetic))
+        indice = IndiceNgramas(rows)
+        print(f"Índice de {len(indice)} filas construido en {time.perf_counter() - start:.1f} s")
+        queries = sample_queries([row[1] for row in rows], args.queries)
+        bench("Índice de trigramas en memoria", lambda q: indice.search(q, args.limit), queries)
+        return
+
+    # Importado aquí: el modo sintético no necesita conexión a la base de datos
+    from utils.database import SessionLocal
+    db = SessionLocal()
+    try:
+        names = [row[0] for row in db.query(Activo.nombre).all()]
+        if not names:
+            print("No hay activos cargados. Ejecuta scripts/load_complex_assets.py primero.")
+            return
+        queries = sample_queries(names, args.queries)
+
+        # Enfoque anterior: ILIKE '%texto%' sin orden ni índice utilizable
+        bench("ILIKE '%texto%'", lambda q: db.query(Activo).filter(Activo.nombre.ilike(f'%{q}%')).limit(args.limit).all(), queries)
+
+        if db.get_bind().dialect.name != "postgresql":
+            start = time.perf_counter()
+            get_search_index(db, "activos")
+            print(f"(índice en memoria construido en {time.perf_counter() - start:.1f} s)")
+        bench("search_activos (con ranking)", lambda q: search_activos(db, q, args.limit), queries)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
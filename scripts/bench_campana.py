@@ -0,0 +1,87 @@
+# scripts/bench_campana.py
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+DEFAULT_TOPOLOGY = os.path.join(script_dir, 'topologias', 'hive.json')
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide una campaña preventiva sobre una base SQLite temporal y la compara con el alta orden por orden.")
+    parser.add_argument("--tipo", default="Equipo", help="Tipo de activo objetivo.")
+    parser.add_argument("--tipo-padre", default="Familia Minero", help="Tipo del padre de los activos objetivo ('' para no filtrar).")
+    parser.add_argument("--productos", type=int, default=2, help="Ítems (productos) por orden.")
+    parser.add_argument("--muestra", type=int, default=300, help="Órdenes creadas una a una para comparar.")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Órdenes por lote (por defecto CAMPANA_CHUNK_SIZE).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # La base temporal se fija antes de importar utils.database
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from models import Activo, ActivoClausura, Usuario, Producto
+        from utils.database import SessionLocal, engine, init_db
+        from utils.carga_masiva import BulkWriter
+        from utils.topologia import ACTIVO_COLUMNS, CLAUSURA_COLUMNS, load_topology, expand_topology, clausura_rows
+        from utils.campanas import CAMPANA_CHUNK_SIZE, get_campaign_targets, create_campaign
+        from utils.ordenes_trabajo import create_orden_trabajo
+        from utils.agregados import reconcile_agregados
+        from utils.analitica_ordenes import reconcile_hechos
+
+        init_db()
+        with engine.begin() as conn:
+            writer = BulkWriter(conn, [(Activo.__table__, ACTIVO_COLUMNS), (ActivoClausura.__table__, CLAUSURA_COLUMNS)])
+            for row in expand_topology(load_topology(DEFAULT_TOPOLOGY)):
+                writer.add(Activo.__table__, row[:6])
+                writer.extend(ActivoClausura.__table__, clausura_rows(row))
+            writer.flush()
+
+        db = SessionLocal()
+        try:
+            admin = db.query(Usuario).filter(Usuario.nombre_usuario == "admin").one()
+            productos = []
+            for i in range(args.productos):
+                producto = Producto(nombre=f"Filtro {i}", descripcion="Repuesto de campaña", precio_unitario=10.0 + i)
+                db.add(producto)
+                productos.append(producto)
+            db.commit()
+            items_orden = [{"producto_id": p.id, "cantidad": 1} for p in productos]
+
+            # La raíz con más activos objetivo
+            raices = [a.id for a in db.query(Activo).filter(Activo.parent_id == None)]
+            start = time.perf_counter()
+            objetivos = {root_id: len(get_campaign_targets(db, root_id, args.tipo, args.tipo_padre or None)) for root_id in raices}
+            root_id = max(objetivos, key=objetivos.get)
+            print(f"Expansión de objetivos de {len(raices)} raíces: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+            targets = get_campaign_targets(db, root_id, args.tipo, args.tipo_padre or None)
+            muestra = targets[:args.muestra]
+            start = time.perf_counter()
+            for activo_id in muestra:
+                create_orden_trabajo(db, "Limpieza", "Limpieza de filtros", "Pendiente", "Medio", None,
+                                     activo_id, admin.id, items_orden=items_orden)
+            una_a_una = (time.perf_counter() - start) / max(len(muestra), 1)
+            print(f"Alta orden por orden: {1 / una_a_una:,.0f} órdenes/s "
+                  f"(estimado para {len(targets)}: {una_a_una * len(targets):.1f} s)")
+
+            start = time.perf_counter()
+            resultado = create_campaign(db, root_id, args.tipo, "Limpieza de filtros", "Limpieza de filtros de la campaña",
+                                        "Medio", None, admin.id, tipo_padre=args.tipo_padre or None, items_orden=items_orden,
+                                        chunk_size=args.chunk_size or CAMPANA_CHUNK_SIZE)
+            elapsed = time.perf_counter() - start
+            print(f"Campaña: {resultado.ordenes} órdenes y {resultado.items} ítems en {elapsed:.2f} s "
+                  f"({resultado.ordenes / elapsed:,.0f} órdenes/s), números {resultado.primer_numero}-{resultado.ultimo_numero}")
+
+            print(f"Diferencias de agregados: {len(reconcile_agregados(db))}, de hechos diarios: {len(reconcile_hechos(db))}")
+        finally:
+            db.close()
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
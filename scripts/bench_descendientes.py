@@ -0,0 +1,68 @@
+# scripts/bench_descendientes.py
+
+import os
+import sys
+import time
+import argparse
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from models import Activo
+from utils.database import SessionLocal
+from utils.jerarquia import get_descendant_ids_from_clausura, get_descendant_ids_by_level
+
+def descendant_ids_per_node(db, parent_id):
+    """
+    Recorrido original: una consulta por nodo visitado.
+    """
+    descendants_ids = set()
+    queue = [parent_id]
+    while queue:
+        current_id = queue.pop(0)
+        if current_id not in descendants_ids:
+            descendants_ids.add(current_id)
+            children = db.query(Activo.id).filter(Activo.parent_id == current_id).all()
+            for child_id_tuple in children:
+                queue.append(child_id_tuple[0])
+    return list(descendants_ids)
+
+def time_call(func, db, activo_id, repeat):
+    best = None
+    result = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(db, activo_id)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(result)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara los métodos de obtención de descendientes por sector.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición (se reporta la mejor).")
+    parser.add_argument("--skip-per-node", action="store_true", help="Omite el recorrido original (una consulta por nodo).")
+    args = parser.parse_args()
+
+    methods = [("clausura", get_descendant_ids_from_clausura), ("por nivel", get_descendant_ids_by_level)]
+    if not args.skip_per_node:
+        methods.append(("por nodo", descendant_ids_per_node))
+
+    db = SessionLocal()
+    try:
+        sectors = db.query(Activo).filter(Activo.parent_id == None).order_by(Activo.nombre).all()
+        if not sectors:
+            print("No hay activos cargados. Ejecuta scripts/load_complex_assets.py primero.")
+            return
+
+        print(f"{'Sector':<15}{'Método':<12}{'Nodos':>10}{'Tiempo (ms)':>14}")
+        for sector in sectors:
+            for label, func in methods:
+                elapsed, count = time_call(func, db, sector.id, args.repeat)
+                print(f"{sector.nombre:<15}{label:<12}{count:>10}{elapsed * 1000:>14.2f}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# scripts/bench_exportacion.py
+
+import os
+import sys
+import time
+import random
+import resource
+import tempfile
+import argparse
+from datetime import datetime, timedelta
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, Activo, InventarioItem
+from utils.carga_masiva import BulkWriter
+from utils.topologia import ACTIVO_COLUMNS, load_topology, expand_topology
+from utils.exportacion import DEFAULT_CHUNK_SIZE, export_parquet
+
+DEFAULT_TOPOLOGY = os.path.join(script_dir, 'topologias', 'hive.json')
+ITEM_COLUMNS = ["id", "numero_item", "tipo_item", "numero_serie", "descripcion_breve", "descripcion_detallada",
+                "estado_funcionamiento", "fecha_alta", "cantidad", "precio_estimado_usd", "dado_de_alta_por_id", "ubicacion_id"]
+
+def load_synthetic(engine, items: int, seed: int = 3):
+    """
+    Jerarquía de la topología por defecto y 'items' ítems de inventario repartidos en 5 años.
+    """
+    rng = random.Random(seed)
+    Base.metadata.create_all(engine, tables=[Activo.__table__, InventarioItem.__table__])
+    with engine.begin() as conn:
+        writer = BulkWriter(conn, [(Activo.__table__, ACTIVO_COLUMNS), (InventarioItem.__table__, ITEM_COLUMNS)])
+        activo_ids = []
+        for row in expand_topology(load_topology(DEFAULT_TOPOLOGY)):
+            writer.add(Activo.__table__, row[:6])
+            activo_ids.append(row[0])
+        inicio = datetime(2021, 1, 1)
+        for i in range(items):
+            writer.add(InventarioItem.__table__, (
+                i + 1, str(200000 + i), rng.choice(["Repuesto", "Herramienta", "Instrumento"]), f"SN-{i:08d}",
+                f"Ítem {i}", "Sintético", rng.choice(["Funcionando", "No Funcionando"]),
+                inicio + timedelta(minutes=i * 5 * 525600 // max(items, 1)), rng.randint(1, 20),
+                round(rng.uniform(1, 500), 2), 1, rng.choice(activo_ids)
+            ))
+        writer.flush()
+    return len(activo_ids)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide la exportación a Parquet sobre una base SQLite sintética.")
+    parser.add_argument("--items", type=int, default=1000000, help="Ítems de inventario sintéticos.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Filas por lote leído.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        start = time.perf_counter()
+        activos = load_synthetic(engine, args.items)
+        print(f"Base sintética: {activos} activos y {args.items} ítems en {time.perf_counter() - start:.1f} s")
+
+        db = sessionmaker(bind=engine)()
+        try:
+            rss_antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            start = time.perf_counter()
+            resumen = export_parquet(db, os.path.join(tmp, "export"), ["inventario_items", "activos"], args.chunk_size)
+            elapsed = time.perf_counter() - start
+            rss_despues = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        finally:
+            db.close()
+
+        total = sum(filas for filas, _ in resumen.values())
+        size = sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, files in os.walk(os.path.join(tmp, "export")) for name in files)
+        print(f"Exportadas {total} filas en {sum(a for _, a in resumen.values())} archivos ({size / 1e6:.1f} MB) "
+              f"en {elapsed:.1f} s ({total / elapsed:,.0f} filas/s)")
+        print(f"Memoria máxima del proceso: {rss_antes / 1024:.0f} MB antes, {rss_despues / 1024:.0f} MB después "
+              f"(lotes de {args.chunk_size} filas)")
+
+if __name__ == "__main__":
+    main()
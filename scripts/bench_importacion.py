@@ -0,0 +1,94 @@
+# scripts/bench_importacion.py
+
+import os
+import sys
+import csv
+import time
+import random
+import tempfile
+import argparse
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+DEFAULT_TOPOLOGY = os.path.join(script_dir, 'topologias', 'hive.json')
+
+def write_synthetic_csv(path: str, rows: int, tags: list, error_rate: float, seed: int = 9):
+    """
+    CSV de 'rows' ítems sobre los tags indicados, con una fracción 'error_rate' de filas inválidas
+    (serie repetida, ubicación inexistente o estado inválido).
+    """
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["numero_serie", "tipo_item", "descripcion_breve", "estado_funcionamiento", "ubicacion", "cantidad", "precio_estimado_usd"])
+        for i in range(rows):
+            row = [f"BULK-{i:08d}", "Minero", f"Minero del envío {i // 2000}", rng.choice(["Funcionando", "No Funcionando"]),
+                   rng.choice(tags), 1, f"{rng.uniform(100, 3000):.2f}"]
+            if rng.random() < error_rate:
+                falla = rng.randrange(3)
+                if falla == 0 and i:
+                    row[0] = f"BULK-{i - 1:08d}"
+                elif falla == 1:
+                    row[4] = "NO-EXISTE"
+                else:
+                    row[3] = "Roto"
+            writer.writerow(row)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide la importación masiva de inventario sobre una base SQLite temporal.")
+    parser.add_argument("--rows", type=int, default=100000, help="Filas del CSV sintético.")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="Fracción de filas inválidas.")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Filas por lote (por defecto IMPORT_CHUNK_SIZE).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # La base temporal se fija antes de importar utils.database
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from models import Activo, ActivoClausura, Usuario
+        from utils.database import SessionLocal, engine, init_db
+        from utils.carga_masiva import BulkWriter
+        from utils.topologia import ACTIVO_COLUMNS, CLAUSURA_COLUMNS, load_topology, expand_topology, clausura_rows
+        from utils.importacion_inventario import IMPORT_CHUNK_SIZE, import_inventory_items
+
+        init_db()
+        with engine.begin() as conn:
+            writer = BulkWriter(conn, [(Activo.__table__, ACTIVO_COLUMNS), (ActivoClausura.__table__, CLAUSURA_COLUMNS)])
+            for row in expand_topology(load_topology(DEFAULT_TOPOLOGY)):
+                writer.add(Activo.__table__, row[:6])
+                writer.extend(ActivoClausura.__table__, clausura_rows(row))
+            writer.flush()
+
+        db = SessionLocal()
+        try:
+            centros = [a.id for a in db.query(Activo).filter(Activo.parent_id == None, Activo.tipo.in_(["Centro de Almacenamiento", "Centro de Pruebas"]))]
+            from utils.arbol_activos import get_arbol_activos
+            arbol = get_arbol_activos(db)
+            tags = [arbol.path(a.id) for a in db.query(Activo).filter(Activo.parent_id.in_(centros))]
+            if not tags:
+                print("La topología no tiene estantes de inventario.")
+                return
+            csv_path = os.path.join(tmp, "envio.csv")
+            write_synthetic_csv(csv_path, args.rows, tags, args.error_rate)
+            admin = db.query(Usuario).filter(Usuario.nombre_usuario == "admin").one()
+
+            start = time.perf_counter()
+            with open(csv_path, "rb") as f:
+                resultado = import_inventory_items(db, f, csv_path, admin.id, os.path.join(tmp, "errores.csv"),
+                                                   args.chunk_size or IMPORT_CHUNK_SIZE)
+            elapsed = time.perf_counter() - start
+            print(f"{resultado.filas} filas en {elapsed:.2f} s: {resultado.filas / elapsed:,.0f} filas/s "
+                  f"({resultado.importadas} importadas, {resultado.errores} errores)")
+
+            from utils.agregados import reconcile_agregados
+            from utils.movimientos_inventario import reconcile_stock
+            print(f"Diferencias de agregados tras la importación: {len(reconcile_agregados(db))}, "
+                  f"de existencias: {len(reconcile_stock(db))}")
+        finally:
+            db.close()
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# scripts/bench_login.py
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, Usuario
+from utils.auth import (
+    LOGIN_WORKERS, authenticate, get_password_hash, get_user_by_username, verify_password,
+    issue_session_token, validate_session_token
+)
+
+PASSWORD = "turno-2024"
+
+def percentiles(times):
+    times = sorted(times)
+    return times[len(times) // 2] * 1000, times[int(len(times) * 0.95) - 1] * 1000
+
+def create_users(Session, count: int):
+    password_hash = get_password_hash(PASSWORD)
+    db = Session()
+    try:
+        db.add_all([Usuario(nombre_usuario=f"operador{i:03d}", password_hash=password_hash, rol="tecnico")
+                    for i in range(count)])
+        db.commit()
+    finally:
+        db.close()
+
+def login_inline(Session, username):
+    # Comportamiento anterior: bcrypt en el hilo de la sesión de Streamlit
+    db = Session()
+    try:
+        user = get_user_by_username(db, username)
+        return user if user and verify_password(PASSWORD, user.password_hash) else None
+    finally:
+        db.close()
+
+def login_pool(Session, username):
+    db = Session()
+    try:
+        return authenticate(db, username, PASSWORD)
+    finally:
+        db.close()
+
+def probe_latency(stop: threading.Event, samples: list):
+    """
+    Otra sesión haciendo trabajo liviano durante la ráfaga: mide cuánto se atrasa un sleep de 10 ms.
+    """
+    while not stop.is_set():
+        start = time.perf_counter()
+        time.sleep(0.01)
+        samples.append(time.perf_counter() - start - 0.01)
+
+def burst(login, Session, users: int):
+    """
+    'users' logins simultáneos (uno por hilo, como sesiones de Streamlit). Retorna (duración, latencias, demoras de la sonda).
+    """
+    latencies = [None] * users
+    probe_samples = []
+    stop = threading.Event()
+    probe = threading.Thread(target=probe_latency, args=(stop, probe_samples))
+    probe.start()
+
+    def run(i):
+        start = time.perf_counter()
+        if login(Session, f"operador{i:03d}") is None:
+            raise RuntimeError("Login fallido")
+        latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as sessions:
+        list(sessions.map(run, range(users)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    probe.join()
+    return elapsed, latencies, probe_samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el rendimiento del login con N usuarios simultáneos.")
+    parser.add_argument("--users", type=int, default=50, help="Logins simultáneos.")
+    parser.add_argument("--tokens", type=int, default=10000, help="Validaciones de token a medir.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'login.db')}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine, tables=[Usuario.__table__])
+        Session = sessionmaker(bind=engine)
+        create_users(Session, args.users)
+
+        print(f"{args.users} logins simultáneos (pool de login: {LOGIN_WORKERS} hilos, {os.cpu_count()} CPU)")
+        print(f"{'Modo':<12}{'Total (s)':>11}{'Logins/s':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'Sonda p95 (ms)':>16}")
+        for name, login in (("inline", login_inline), ("pool", login_pool)):
+            elapsed, latencies, probe = burst(login, Session, args.users)
+            p50, p95 = percentiles(latencies)
+            probe_p95 = percentiles(probe)[1] if probe else 0.0
+            print(f"{name:<12}{elapsed:>11.2f}{args.users / elapsed:>10.1f}{p50:>10.0f}{p95:>10.0f}{probe_p95:>16.1f}")
+
+        db = Session()
+        user = db.query(Usuario).first()
+        token = issue_session_token(user)
+        start = time.perf_counter()
+        for _ in range(args.tokens):
+            db.expire_all()
+            validate_session_token(db, token)
+        per_token = (time.perf_counter() - start) / args.tokens
+        db.close()
+        print(f"Recarga con token firmado: {per_token * 1e6:.1f} µs por validación (sin bcrypt; una consulta por clave primaria)")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
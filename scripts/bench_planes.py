@@ -0,0 +1,107 @@
+# scripts/bench_planes.py
+
+import os
+import sys
+import time
+import random
+import tempfile
+import argparse
+from datetime import datetime, timedelta
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+DEFAULT_TOPOLOGY = os.path.join(script_dir, 'topologias', 'hive.json')
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el planificador de mantenimiento con muchos planes activos sobre una base SQLite temporal.")
+    parser.add_argument("--planes", type=int, default=100000, help="Planes habilitados.")
+    parser.add_argument("--horizonte-dias", type=int, default=90, help="Los vencimientos se reparten en este rango de días.")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # La base temporal se fija antes de importar utils.database
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from sqlalchemy import select, insert, text
+        from models import Activo, ActivoClausura, Usuario, PlanMantenimiento, OrdenTrabajo
+        from utils.database import SessionLocal, engine, init_db
+        from utils.carga_masiva import BulkWriter
+        from utils.topologia import ACTIVO_COLUMNS, CLAUSURA_COLUMNS, load_topology, expand_topology, clausura_rows
+        from utils.planes_mantenimiento import get_due_plans, run_due_plans
+        from utils.agregados import reconcile_agregados
+        from utils.analitica_ordenes import reconcile_hechos
+
+        init_db()
+        with engine.begin() as conn:
+            writer = BulkWriter(conn, [(Activo.__table__, ACTIVO_COLUMNS), (ActivoClausura.__table__, CLAUSURA_COLUMNS)])
+            for row in expand_topology(load_topology(DEFAULT_TOPOLOGY)):
+                writer.add(Activo.__table__, row[:6])
+                writer.extend(ActivoClausura.__table__, clausura_rows(row))
+            writer.flush()
+
+        rng = random.Random(args.seed)
+        inicio = datetime(2026, 1, 1)
+        db = SessionLocal()
+        try:
+            admin = db.query(Usuario).filter(Usuario.nombre_usuario == "admin").one()
+            equipos = [row[0] for row in db.query(Activo.id).filter(Activo.tipo == "Equipo")]
+            start = time.perf_counter()
+            # INSERT de SQLAlchemy (no insert_rows): las fechas quedan con el mismo formato que al crear planes desde la app
+            db.execute(insert(PlanMantenimiento), [
+                dict(nombre=f"Plan {i}", titulo="Mantenimiento preventivo", descripcion="Revisión periódica",
+                     criticidad=rng.choice(["Medio", "Bajo"]), activo_id=rng.choice(equipos),
+                     intervalo=rng.choice([7, 14, 30, 90]), unidad="dias",
+                     proximo_vencimiento=inicio + timedelta(seconds=rng.randrange(args.horizonte_dias * 86400)),
+                     ordenes_generadas=0, habilitado=True, creado_por_id=admin.id, fecha_creacion=inicio)
+                for i in range(args.planes)
+            ])
+            db.commit()
+            print(f"{args.planes} planes sobre {len(equipos)} equipos cargados en {time.perf_counter() - start:.1f} s")
+
+            plan = db.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM planes_mantenimiento WHERE habilitado = 1 AND proximo_vencimiento <= :ahora "
+                "ORDER BY proximo_vencimiento LIMIT 500"), {"ahora": inicio}).all()
+            print("Plan de consulta de vencidos: " + " | ".join(row[-1] for row in plan))
+
+            # Pasada sin planes vencidos: solo una lectura del índice
+            mejores = []
+            for _ in range(20):
+                t = time.perf_counter()
+                run_due_plans(db, ahora=inicio - timedelta(seconds=1))
+                mejores.append(time.perf_counter() - t)
+            print(f"Pasada sin vencidos: {min(mejores) * 1000:.2f} ms")
+
+            # Un día de vencimientos: consulta indexada frente a recorrer todos los planes
+            ahora = inicio + timedelta(days=1)
+            t = time.perf_counter()
+            vencidos = get_due_plans(db, ahora, limit=args.planes)
+            indexada = time.perf_counter() - t
+            db.expire_all()
+            t = time.perf_counter()
+            recorrido = [p for p in db.execute(select(PlanMantenimiento)).scalars() if p.habilitado and p.proximo_vencimiento <= ahora]
+            completo = time.perf_counter() - t
+            print(f"Vencidos en el primer día: {len(vencidos)}; consulta indexada {indexada * 1000:.1f} ms, "
+                  f"recorrido de todos los planes {completo * 1000:.1f} ms ({len(recorrido)} encontrados)")
+            db.expire_all()
+
+            # La primera pasada incluye la carga del árbol de activos en memoria (una vez por proceso)
+            for dia, nombre in ((1, "primer"), (2, "segundo")):
+                t = time.perf_counter()
+                resultado = run_due_plans(db, ahora=inicio + timedelta(days=dia))
+                elapsed = time.perf_counter() - t
+                print(f"Pasada del {nombre} día: {resultado.planes} planes, {resultado.ordenes} órdenes en {elapsed:.2f} s "
+                      f"({resultado.ordenes / elapsed:,.0f} órdenes/s)")
+
+            repetida = run_due_plans(db, ahora=inicio + timedelta(days=2))
+            ordenes = db.query(OrdenTrabajo.id).count()
+            print(f"Pasada repetida del mismo día: {repetida.ordenes} órdenes (total en la base: {ordenes})")
+            print(f"Diferencias de agregados: {len(reconcile_agregados(db))}, de hechos diarios: {len(reconcile_hechos(db))}")
+        finally:
+            db.close()
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# scripts/bench_stock.py
+
+import os
+import sys
+import time
+import random
+import tempfile
+import argparse
+from datetime import datetime, timedelta
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide las existencias a una fecha (punto de control + movimientos) frente a recorrer todo el libro, sobre una base SQLite temporal.")
+    parser.add_argument("--items", type=int, default=20000, help="Ítems dados de alta el primer día.")
+    parser.add_argument("--dias", type=int, default=365, help="Días simulados.")
+    parser.add_argument("--movimientos-dia", type=int, default=2000, help="Traslados y consumos por día.")
+    parser.add_argument("--checkpoint-cada", type=int, default=7, help="Días entre puntos de control.")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # La base temporal se fija antes de importar utils.database
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from sqlalchemy import select, update
+        from models import Usuario, Producto, InventarioItem, MovimientoInventario
+        from utils.database import SessionLocal, engine, init_db
+        from utils.carga_masiva import insert_rows
+        from utils.ordenes_trabajo import create_activo
+        from utils.movimientos_inventario import (
+            Movimiento, record_movimientos, create_stock_checkpoint, get_stock_at, reconcile_stock
+        )
+
+        init_db()
+        rng = random.Random(args.seed)
+        inicio = datetime(2026, 1, 1)
+        db = SessionLocal()
+        try:
+            admin = db.query(Usuario).filter(Usuario.nombre_usuario == "admin").one()
+            estantes = []
+            for c in range(2):
+                centro = create_activo(db, f"BC{c:02d}", "Centro de Almacenamiento")
+                estantes.extend(create_activo(db, f"BC{c:02d}-E{e:02d}", "Estante", parent_id=centro.id).id for e in range(20))
+            productos = []
+            for i in range(20):
+                producto = Producto(nombre=f"Repuesto {i}", descripcion="Repuesto de prueba", precio_unitario=5.0 + i)
+                db.add(producto)
+                productos.append(producto)
+            db.commit()
+            producto_ids = [p.id for p in productos] + [None]
+
+            # Estado de cada ítem en memoria: [ubicacion_id, cantidad, producto_id]
+            start = time.perf_counter()
+            estado = [[rng.choice(estantes), rng.randint(1, 50), rng.choice(producto_ids)] for _ in range(args.items)]
+            insert_rows(db.connection(), InventarioItem.__table__,
+                        ("numero_item", "tipo_item", "numero_serie", "descripcion_breve", "descripcion_detallada",
+                         "estado_funcionamiento", "fecha_alta", "cantidad", "precio_estimado_usd", "dado_de_alta_por_id",
+                         "ubicacion_id", "producto_asociado_id"),
+                        [(f"B{i}", "Repuesto", f"BS-{i:08d}", "Repuesto", "Repuesto de prueba", "Funcionando", inicio,
+                          cantidad, 1.0, admin.id, ubicacion_id, producto_id)
+                         for i, (ubicacion_id, cantidad, producto_id) in enumerate(estado)])
+            ids = list(db.execute(select(InventarioItem.id).order_by(InventarioItem.id)).scalars())
+            record_movimientos(db, [Movimiento("alta", item_id, producto_id, None, ubicacion_id, cantidad, None, admin.id)
+                                    for item_id, (ubicacion_id, cantidad, producto_id) in zip(ids, estado)], fecha=inicio)
+            db.commit()
+
+            checkpoints = 0
+            tiempos_checkpoint = []
+            for dia in range(args.dias):
+                fecha = inicio + timedelta(days=dia, hours=12)
+                movimientos = []
+                for _ in range(args.movimientos_dia):
+                    pos = rng.randrange(args.items)
+                    ubicacion_id, cantidad, producto_id = estado[pos]
+                    if rng.random() < 0.7 or cantidad == 0:
+                        destino = rng.choice(estantes)
+                        if destino != ubicacion_id:
+                            movimientos.append(Movimiento("traslado", ids[pos], producto_id, ubicacion_id, destino, cantidad, None, admin.id))
+                            estado[pos][0] = destino
+                    else:
+                        usadas = rng.randint(1, cantidad)
+                        movimientos.append(Movimiento("consumo", ids[pos], producto_id, ubicacion_id, None, usadas, None, admin.id))
+                        estado[pos][1] -= usadas
+                record_movimientos(db, movimientos, fecha=fecha)
+                db.commit()
+                if (dia + 1) % args.checkpoint_cada == 0:
+                    t = time.perf_counter()
+                    create_stock_checkpoint(db, fecha=inicio + timedelta(days=dia + 1))
+                    tiempos_checkpoint.append(time.perf_counter() - t)
+                    checkpoints += 1
+            total = db.query(MovimientoInventario.id).count()
+            print(f"Libro: {total} movimientos y {checkpoints} puntos de control en {time.perf_counter() - start:.1f} s "
+                  f"(punto de control: {1000 * sum(tiempos_checkpoint) / max(len(tiempos_checkpoint), 1):.0f} ms en promedio)")
+
+            # Las filas de los ítems quedan con su estado final, como lo dejarían las funciones de inventario_db
+            db.execute(update(InventarioItem), [dict(id=item_id, ubicacion_id=u, cantidad=c) for item_id, (u, c, _) in zip(ids, estado)])
+            db.commit()
+
+            for offset in (args.dias // 4, args.dias // 2, args.dias - 3):
+                fecha = inicio + timedelta(days=offset, hours=18)
+                t = time.perf_counter()
+                con_checkpoint = get_stock_at(db, fecha)
+                rapido = time.perf_counter() - t
+                t = time.perf_counter()
+                completo = get_stock_at(db, fecha, usar_checkpoint=False)
+                lento = time.perf_counter() - t
+                print(f"Stock al {fecha:%Y-%m-%d}: punto de control + movimientos {rapido * 1000:.1f} ms, "
+                      f"libro completo {lento * 1000:.1f} ms ({len(con_checkpoint)} filas, "
+                      f"{'iguales' if con_checkpoint == completo else 'DISTINTOS'})")
+
+            t = time.perf_counter()
+            subarbol = get_stock_at(db, inicio + timedelta(days=args.dias - 3, hours=18), ubicacion_id=estantes[0])
+            print(f"Stock de un estante a una fecha: {(time.perf_counter() - t) * 1000:.1f} ms ({len(subarbol)} filas)")
+            print(f"Diferencias de existencias: {len(reconcile_stock(db))}")
+        finally:
+            db.close()
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
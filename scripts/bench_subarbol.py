@@ -0,0 +1,71 @@
+# scripts/bench_subarbol.py
+
+import os
+import sys
+import time
+import argparse
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import func
+from models import Activo, InventarioItem
+from utils.database import SessionLocal
+from utils.jerarquia import get_descendant_ids_by_level, path_prefix_condition
+
+def count_items_bfs_in(db, activo):
+    """
+    Enfoque anterior: recorrido de la jerarquía y lista IN (...) con todos los IDs.
+    """
+    descendant_ids = get_descendant_ids_by_level(db, activo.id)
+    return db.query(func.count(InventarioItem.id)).filter(InventarioItem.ubicacion_id.in_(descendant_ids)).scalar()
+
+def count_items_path(db, activo):
+    """
+    Ruta materializada: un único rango indexado sobre activos.path.
+    """
+    subtree_ids = db.query(Activo.id).filter(path_prefix_condition(db, activo.path))
+    return db.query(func.count(InventarioItem.id)).filter(InventarioItem.ubicacion_id.in_(subtree_ids.scalar_subquery())).scalar()
+
+def best_time(func_, db, activo, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func_(db, activo)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el filtro por subárbol BFS + IN contra la ruta materializada.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición (se reporta la mejor).")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        # Sectores y sus áreas: los subárboles más grandes, donde la diferencia es mayor
+        roots = db.query(Activo).filter(Activo.parent_id == None).order_by(Activo.nombre).all()
+        areas = db.query(Activo).filter(Activo.parent_id.in_([r.id for r in roots])).order_by(Activo.id).all()
+        targets = roots + areas
+        if not targets:
+            print("No hay activos cargados. Ejecuta scripts/load_complex_assets.py primero.")
+            return
+        if any(activo.path is None for activo in targets):
+            print("Hay activos sin ruta materializada. Ejecuta scripts/migrate_activos_path.py primero.")
+            return
+
+        print(f"{'Ubicación':<20}{'Items':>8}{'BFS + IN (ms)':>16}{'path (ms)':>12}")
+        for activo in targets:
+            bfs_time, bfs_count = best_time(count_items_bfs_in, db, activo, args.repeat)
+            path_time, path_count = best_time(count_items_path, db, activo, args.repeat)
+            if bfs_count != path_count:
+                print(f"Advertencia: resultados distintos para {activo.path} ({bfs_count} vs {path_count})")
+            print(f"{activo.path:<20}{path_count:>8}{bfs_time * 1000:>16.2f}{path_time * 1000:>12.2f}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
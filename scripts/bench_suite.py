@@ -0,0 +1,302 @@
+# scripts/bench_suite.py
+
+import os
+import sys
+import json
+import time
+import random
+import platform
+import tempfile
+import argparse
+import statistics
+import subprocess
+from datetime import date, datetime, timedelta
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+DEFAULT_TOPOLOGY = os.path.join(script_dir, 'topologias', 'hive.json')
+
+# Regresión: la mediana nueva supera a la base en más de este porcentaje y de DEFAULT_MIN_DELTA_MS
+DEFAULT_THRESHOLD = 0.20
+DEFAULT_MIN_DELTA_MS = 1.0
+
+ESTADOS_ABIERTOS = ["Pendiente", "En Progreso"]
+ESTADOS_CERRADOS = ["Completada", "Cancelada"]
+CRITICIDADES = ["Emergencial", "Urgente", "Alto", "Medio", "Bajo"]
+ESTADOS_ITEM = ["Funcionando", "No Funcionando"]
+
+def generate_dataset(db, engine, scale: int, items: int, ordenes: int, seed: int) -> dict:
+    """
+    Carga datos sintéticos reproducibles (misma semilla, mismos datos) en una base vacía:
+    la topología de load_complex_assets.py a la escala indicada, 'items' ítems repartidos en los
+    estantes de inventario y 'ordenes' órdenes sobre los equipos, con una parte ya cerrada.
+    Los agregados, hechos diarios y el libro de movimientos se construyen al final con sus recálculos.
+    Retorna los tiempos de carga en segundos.
+    """
+    from sqlalchemy import select, update
+    from models import Activo, ActivoClausura, Usuario, InventarioItem, OrdenTrabajo
+    from utils.carga_masiva import BulkWriter, insert_rows, sync_id_sequence
+    from utils.topologia import ACTIVO_COLUMNS, CLAUSURA_COLUMNS, load_topology, expand_topology, clausura_rows
+    from utils.secuencias import reserve_block
+    from utils.ordenes_trabajo import FilaOrden, insert_ordenes
+    from utils.agregados import reconcile_agregados
+    from utils.analitica_ordenes import rebuild_hechos
+    from utils.movimientos_inventario import sync_stock
+
+    rng = random.Random(seed)
+    tiempos = {}
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        writer = BulkWriter(conn, [(Activo.__table__, ACTIVO_COLUMNS), (ActivoClausura.__table__, CLAUSURA_COLUMNS)])
+        for row in expand_topology(load_topology(DEFAULT_TOPOLOGY), scale=scale):
+            writer.add(Activo.__table__, row[:6])
+            writer.extend(ActivoClausura.__table__, clausura_rows(row))
+        writer.flush()
+        sync_id_sequence(conn, Activo.__table__)
+    tiempos["activos_s"] = time.perf_counter() - start
+
+    admin_id = db.execute(select(Usuario.id).where(Usuario.nombre_usuario == "admin")).scalar()
+    estantes = list(db.execute(select(Activo.id).where(Activo.tipo == "Estante").order_by(Activo.id)).scalars())
+    equipos = list(db.execute(select(Activo.id).where(Activo.tipo == "Equipo").order_by(Activo.id)).scalars())
+    ahora = datetime.utcnow().replace(microsecond=0)
+
+    start = time.perf_counter()
+    numeros = reserve_block(db, "numero_item", items) if items else []
+    insert_rows(db.connection(), InventarioItem.__table__,
+                ("numero_item", "tipo_item", "numero_serie", "descripcion_breve", "descripcion_detallada",
+                 "estado_funcionamiento", "fecha_alta", "cantidad", "precio_estimado_usd", "dado_de_alta_por_id", "ubicacion_id"),
+                [(str(numero), rng.choice(["Minero", "Cooler", "Fuente"]), f"BS-{i:09d}", f"Ítem de prueba {i}",
+                  f"Ítem de prueba número {i}", rng.choice(ESTADOS_ITEM), ahora - timedelta(minutes=rng.randrange(180 * 1440)),
+                  rng.randint(1, 5), round(rng.uniform(10, 3000), 2), admin_id, rng.choice(estantes))
+                 for i, numero in enumerate(numeros)])
+    db.commit()
+    tiempos["items_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    numeros = reserve_block(db, "numero_orden", ordenes) if ordenes else []
+    filas = []
+    for numero in numeros:
+        creada = ahora - timedelta(minutes=rng.randrange(90 * 1440))
+        filas.append(FilaOrden(str(numero), f"Orden {numero}", "Orden de prueba", rng.choice(ESTADOS_ABIERTOS),
+                               rng.choice(CRITICIDADES), creada, creada, creada + timedelta(days=rng.randint(1, 15)),
+                               rng.choice(equipos), admin_id, None))
+    for start_chunk in range(0, len(filas), 5000):
+        insert_ordenes(db, filas[start_chunk:start_chunk + 5000])
+        db.commit()
+    # Un tercio de las órdenes queda cerrado, con fecha de cierre para la analítica
+    cerradas = [dict(id=orden_id, estado=rng.choice(ESTADOS_CERRADOS), fecha_cierre=creada + timedelta(hours=rng.randint(1, 24 * 20)))
+                for orden_id, creada in db.execute(select(OrdenTrabajo.id, OrdenTrabajo.fecha_creacion).order_by(OrdenTrabajo.id))
+                if rng.random() < 1 / 3]
+    if cerradas:
+        db.execute(update(OrdenTrabajo), cerradas)
+    db.commit()
+    tiempos["ordenes_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reconcile_agregados(db, fix=True)
+    rebuild_hechos(db)
+    sync_stock(db)
+    tiempos["derivados_s"] = time.perf_counter() - start
+    return tiempos
+
+def hot_functions(db, seed: int) -> dict:
+    """
+    Funciones de utils/ medidas, con entradas fijas elegidas de forma reproducible.
+    Retorna {caso: función sin argumentos}.
+    """
+    from sqlalchemy import select, func
+    from models import Activo
+    from utils.jerarquia import get_descendant_ids_from_clausura
+    from utils.ordenes_trabajo import (
+        get_all_descendant_activo_ids, get_activo_full_path, get_ordenes_trabajo, get_next_order_number,
+        find_activos_by_name_or_tag, children_of
+    )
+    from utils.inventario_db import get_inventory_items, get_inventory_items_page
+    from utils.busqueda import search_inventory_items
+    from utils.reports import (
+        get_inventario_stats, get_ordenes_by_status_count, get_inventario_by_tipo, get_inventario_by_ubicacion, get_ordenes_by_dia
+    )
+    from utils.analitica_ordenes import get_throughput_por_dia, get_histograma_resolucion, get_resumen_vencimientos
+    from utils.movimientos_inventario import get_stock_at
+
+    rng = random.Random(seed)
+    raices = list(db.execute(select(Activo.id).where(Activo.parent_id.is_(None)).order_by(Activo.id)).scalars())
+    sitio = max(raices, key=lambda activo_id: len(get_descendant_ids_from_clausura(db, activo_id)))
+    contenedor = db.execute(select(Activo.id).where(Activo.tipo == "Contenedor").order_by(Activo.id)).scalars().first() or sitio
+    equipos = list(db.execute(select(Activo.id).where(Activo.tipo == "Equipo").order_by(Activo.id)).scalars())
+    muestra = rng.sample(equipos, min(100, len(equipos)))
+    nombre_contenedor = db.execute(select(Activo.nombre).where(Activo.id == contenedor)).scalar()
+    almacen = children_of(db, parent_id=None, for_module="inventario")
+    hoy = datetime.utcnow().date()
+    desde = hoy - timedelta(days=90)
+
+    return {
+        "get_all_descendant_activo_ids/sitio": lambda: get_all_descendant_activo_ids(db, sitio),
+        "get_all_descendant_activo_ids/contenedor": lambda: get_all_descendant_activo_ids(db, contenedor),
+        "get_activo_full_path/x100": lambda: [get_activo_full_path(db, activo_id) for activo_id in muestra],
+        "get_inventory_items/todos": lambda: get_inventory_items(db),
+        "get_inventory_items/sitio": lambda: get_inventory_items(db, location_id_filter=almacen.ids[0]) if almacen.ids else [],
+        "get_inventory_items_page/primera": lambda: get_inventory_items_page(db),
+        "search_inventory_items": lambda: search_inventory_items(db, "prueba 123"),
+        "get_ordenes_trabajo/todas": lambda: get_ordenes_trabajo(db),
+        "get_ordenes_trabajo/pendientes_sitio": lambda: get_ordenes_trabajo(db, estado="Pendiente", ubicacion_id_filter=sitio),
+        "get_next_order_number": lambda: get_next_order_number(db),
+        "find_activos_by_name_or_tag/tag": lambda: find_activos_by_name_or_tag(db, nombre_contenedor),
+        "find_activos_by_name_or_tag/parcial": lambda: find_activos_by_name_or_tag(db, "M11"),
+        "informes/get_inventario_stats": lambda: get_inventario_stats(db),
+        "informes/get_ordenes_by_status_count": lambda: get_ordenes_by_status_count(db),
+        "informes/get_inventario_by_tipo": lambda: get_inventario_by_tipo(db),
+        "informes/get_inventario_by_ubicacion": lambda: get_inventario_by_ubicacion(db, list(almacen.ids)),
+        "informes/get_ordenes_by_dia": lambda: get_ordenes_by_dia(db),
+        "informes/get_throughput_por_dia": lambda: get_throughput_por_dia(db, desde, hoy),
+        "informes/get_histograma_resolucion": lambda: get_histograma_resolucion(db, desde, hoy),
+        "informes/get_resumen_vencimientos": lambda: get_resumen_vencimientos(db, desde, hoy, por="sitio"),
+        "informes/get_stock_at": lambda: get_stock_at(db, datetime.utcnow() - timedelta(days=30)),
+    }
+
+def measure(db, fn, repeat: int) -> dict:
+    """
+    Primera llamada (incluye las cachés en memoria que se construyen al usarla) y 'repeat' llamadas
+    posteriores, cada una con la sesión expirada para no reutilizar objetos ya cargados.
+    """
+    start = time.perf_counter()
+    fn()
+    primera = time.perf_counter() - start
+    tiempos = []
+    for _ in range(repeat):
+        db.expire_all()
+        start = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - start)
+    return {
+        "primera_ms": primera * 1000,
+        "min_ms": min(tiempos) * 1000,
+        "mediana_ms": statistics.median(tiempos) * 1000,
+        "max_ms": max(tiempos) * 1000,
+    }
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def run_suite(args) -> dict:
+    import sqlalchemy
+    from models import Activo
+    from utils.database import SessionLocal, engine, init_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if db.query(Activo.id).first() is not None:
+            raise SystemExit("La base de datos no está vacía; usa una base nueva para el benchmark.")
+        carga = generate_dataset(db, engine, args.scale, args.items, args.ordenes, args.seed)
+        print(f"Datos cargados: {db.query(Activo.id).count()} activos, {args.items} ítems, {args.ordenes} órdenes "
+              f"({sum(carga.values()):.1f} s)")
+
+        casos = {}
+        for nombre, fn in hot_functions(db, args.seed).items():
+            if args.filtro and args.filtro not in nombre:
+                continue
+            casos[nombre] = measure(db, fn, args.repeat)
+            print(f"  {nombre:<48}{casos[nombre]['mediana_ms']:>10.2f} ms (primera {casos[nombre]['primera_ms']:.2f} ms)")
+        return {
+            "meta": {
+                "fecha": datetime.utcnow().isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "dialecto": engine.dialect.name,
+                "escala": args.scale, "items": args.items, "ordenes": args.ordenes, "seed": args.seed, "repeat": args.repeat,
+                "python": platform.python_version(), "sqlalchemy": sqlalchemy.__version__,
+                "plataforma": platform.platform(), "cpus": os.cpu_count(),
+            },
+            "carga_s": carga,
+            "casos": casos,
+        }
+    finally:
+        db.close()
+        engine.dispose()
+
+def compare(base: dict, nuevo: dict, threshold: float = DEFAULT_THRESHOLD, min_delta_ms: float = DEFAULT_MIN_DELTA_MS) -> list[str]:
+    """
+    Compara las medianas de dos resultados e imprime la tabla. Retorna los casos que empeoraron más de
+    'threshold' (fracción) y más de 'min_delta_ms' (para no marcar ruido en funciones de microsegundos).
+    """
+    for clave in ("dialecto", "escala", "items", "ordenes", "seed"):
+        if base["meta"].get(clave) != nuevo["meta"].get(clave):
+            print(f"Aviso: '{clave}' distinto ({base['meta'].get(clave)} frente a {nuevo['meta'].get(clave)}); "
+                  "los tiempos no son comparables.")
+
+    regresiones = []
+    print(f"{'Caso':<48}{'Base (ms)':>12}{'Nuevo (ms)':>12}{'Cambio':>10}")
+    for nombre in sorted(set(base["casos"]) | set(nuevo["casos"])):
+        a = base["casos"].get(nombre, {}).get("mediana_ms")
+        b = nuevo["casos"].get(nombre, {}).get("mediana_ms")
+        if a is None or b is None:
+            print(f"{nombre:<48}{'-' if a is None else f'{a:.2f}':>12}{'-' if b is None else f'{b:.2f}':>12}{'':>10}")
+            continue
+        cambio = (b - a) / a if a else 0.0
+        marca = ""
+        if cambio > threshold and b - a > min_delta_ms:
+            regresiones.append(nombre)
+            marca = "  REGRESIÓN"
+        elif cambio < -threshold and a - b > min_delta_ms:
+            marca = "  mejora"
+        print(f"{nombre:<48}{a:>12.2f}{b:>12.2f}{cambio:>+10.0%}{marca}")
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reproducible de las funciones más usadas de utils/ sobre datos sintéticos, "
+                                                 "con resultados en JSON y comparación contra una ejecución anterior.")
+    parser.add_argument("--database-url", help="Base vacía a usar (SQLite o PostgreSQL local); por defecto, una SQLite temporal.")
+    parser.add_argument("--scale", type=int, default=1, help="Escala de la topología de load_complex_assets.py (1, 10, 100...).")
+    parser.add_argument("--items", type=int, default=50000, help="Ítems de inventario sintéticos.")
+    parser.add_argument("--ordenes", type=int, default=20000, help="Órdenes de trabajo sintéticas.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por caso (se guarda la mediana, mínimo y máximo).")
+    parser.add_argument("--filtro", help="Solo los casos cuyo nombre contiene este texto.")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados.")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior contra el que comparar esta.")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NUEVO"), help="Solo compara dos JSON ya guardados.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Empeoramiento tolerado (0.2 = 20%%).")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS, help="Diferencia mínima para marcar una regresión.")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            nuevo = json.load(f)
+    else:
+        tmp = None
+        if args.database_url:
+            os.environ["DATABASE_URL"] = args.database_url
+        else:
+            tmp = tempfile.TemporaryDirectory()
+            os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+        try:
+            nuevo = run_suite(args) # La base se fija antes de importar utils.database
+        finally:
+            if tmp:
+                tmp.cleanup()
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(nuevo, f, indent=2, ensure_ascii=False)
+            print(f"Resultados guardados en {args.output}")
+        if not args.baseline:
+            return
+        with open(args.baseline, encoding="utf-8") as f:
+            base = json.load(f)
+
+    regresiones = compare(base, nuevo, args.threshold, args.min_delta_ms)
+    if regresiones:
+        print(f"{len(regresiones)} regresión(es) por encima del {args.threshold:.0%}: {', '.join(regresiones)}")
+        sys.exit(1)
+    print("Sin regresiones.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# scripts/checkpoint_stock.py
+
+import os
+import sys
+import time
+import argparse
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from utils.database import SessionLocal, create_tables
+from utils.movimientos_inventario import STOCK_CHECKPOINT_CADA, create_stock_checkpoint, maybe_checkpoint, reconcile_stock
+
+def main():
+    parser = argparse.ArgumentParser(description="Crea un punto de control de existencias (para cron) y, opcionalmente, verifica el libro de movimientos.")
+    parser.add_argument("--forzar", action="store_true", help="Crea el punto de control aunque haya pocos movimientos nuevos.")
+    parser.add_argument("--cada", type=int, default=STOCK_CHECKPOINT_CADA, help="Movimientos nuevos mínimos para crear uno.")
+    parser.add_argument("--verificar", action="store_true", help="Compara las existencias con el libro y con los ítems.")
+    parser.add_argument("--fix", action="store_true", help="Con --verificar, reescribe las existencias desde el libro si hay diferencias.")
+    parser.add_argument("--max-diffs", type=int, default=20, help="Cantidad máxima de diferencias a mostrar.")
+    args = parser.parse_args()
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        checkpoint = create_stock_checkpoint(db) if args.forzar else maybe_checkpoint(db, args.cada)
+        if checkpoint:
+            print(f"Punto de control {checkpoint.id} hasta el movimiento {checkpoint.hasta_movimiento_id} "
+                  f"({time.perf_counter() - start:.2f} s).")
+        else:
+            print(f"Menos de {args.cada} movimientos desde el último punto de control; no se crea otro.")
+
+        if args.verificar:
+            differences = reconcile_stock(db, fix=args.fix)
+            if not differences:
+                print("Existencias correctas.")
+                return
+            print(f"{len(differences)} diferencia(s):")
+            for origen, clave, guardado, esperado in differences[:args.max_diffs]:
+                print(f"  {origen} {clave}: guardado {guardado} | esperado {esperado}")
+            if not args.fix:
+                sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
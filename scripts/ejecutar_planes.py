@@ -0,0 +1,37 @@
+# scripts/ejecutar_planes.py
+
+import os
+import sys
+import time
+import argparse
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from utils.database import SessionLocal
+from utils.planes_mantenimiento import PLANES_LOTE, PLANES_TICK_SEGUNDOS, run_due_plans
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera las órdenes de los planes de mantenimiento vencidos (para cron o como servicio con --loop).")
+    parser.add_argument("--loop", action="store_true", help="Repite la pasada cada --intervalo segundos en lugar de salir.")
+    parser.add_argument("--intervalo", type=int, default=PLANES_TICK_SEGUNDOS, help="Segundos entre pasadas con --loop.")
+    parser.add_argument("--lote", type=int, default=PLANES_LOTE, help="Planes leídos por consulta.")
+    args = parser.parse_args()
+
+    while True:
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            resultado = run_due_plans(db, limit=args.lote)
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} planes: {resultado.planes}, órdenes: {resultado.ordenes}, "
+                  f"errores: {resultado.errores} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        finally:
+            db.close()
+        if not args.loop:
+            break
+        time.sleep(args.intervalo)
+
+if __name__ == "__main__":
+    main()
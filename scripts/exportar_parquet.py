@@ -0,0 +1,40 @@
+# scripts/exportar_parquet.py
+
+import os
+import sys
+import time
+import argparse
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from utils.database import SessionLocal
+from utils.exportacion import DEFAULT_CHUNK_SIZE, ENTIDADES, export_parquet, zip_exportacion
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta inventario, órdenes y activos a Parquet particionado por sitio y mes.")
+    parser.add_argument("destino", help="Carpeta de destino (se crea si no existe).")
+    parser.add_argument("--entidades", nargs="+", choices=ENTIDADES, help="Entidades a exportar (todas por defecto).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Filas por lote leído de la base de datos.")
+    parser.add_argument("--zip", action="store_true", help="Empaqueta además la exportación en destino.zip.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        def progreso(entidad, filas):
+            print(f"{entidad}: {filas} filas ({time.perf_counter() - start:.1f} s)")
+        resumen = export_parquet(db, args.destino, args.entidades, args.chunk_size, progreso)
+        total = sum(filas for filas, _ in resumen.values())
+        elapsed = time.perf_counter() - start
+        print(f"Exportadas {total} filas en {sum(archivos for _, archivos in resumen.values())} archivos "
+              f"en {elapsed:.1f} s ({total / elapsed if elapsed else 0:,.0f} filas/s)")
+        if args.zip:
+            print(f"Archivo: {zip_exportacion(args.destino, args.destino.rstrip('/') + '.zip')}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
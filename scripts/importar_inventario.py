@@ -0,0 +1,45 @@
+# scripts/importar_inventario.py
+
+import os
+import sys
+import time
+import argparse
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from models import Usuario
+from utils.database import SessionLocal
+from utils.importacion_inventario import IMPORT_CHUNK_SIZE, import_inventory_items
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa ítems de inventario desde un CSV o XLSX.")
+    parser.add_argument("archivo", help="Archivo CSV o XLSX con cabecera (numero_serie, tipo_item, descripcion_breve, "
+                                        "estado_funcionamiento, ubicacion y opcionalmente descripcion_detallada, cantidad, precio_estimado_usd).")
+    parser.add_argument("--usuario", default="admin", help="Usuario que da de alta los ítems.")
+    parser.add_argument("--reporte", help="CSV de errores por fila (por defecto, <archivo>.errores.csv).")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Filas por lote (y por transacción).")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        usuario = db.query(Usuario).filter(Usuario.nombre_usuario == args.usuario).first()
+        if not usuario:
+            print(f"No existe el usuario '{args.usuario}'.")
+            return
+        reporte = args.reporte or f"{args.archivo}.errores.csv"
+        start = time.perf_counter()
+        def progreso(filas, importadas):
+            print(f"{filas} filas leídas, {importadas} importadas ({time.perf_counter() - start:.1f} s)")
+        with open(args.archivo, "rb") as f:
+            resultado = import_inventory_items(db, f, args.archivo, usuario.id, reporte, args.chunk_size, progreso)
+        elapsed = time.perf_counter() - start
+        print(f"Importados {resultado.importadas} de {resultado.filas} ítems en {elapsed:.1f} s "
+              f"({resultado.filas / elapsed if elapsed else 0:,.0f} filas/s). Errores: {resultado.errores} (ver {resultado.reporte})")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
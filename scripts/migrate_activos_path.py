@@ -0,0 +1,49 @@
+# scripts/migrate_activos_path.py
+
+import os
+import sys
+import time
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import inspect, text
+from models import Activo
+from utils.database import SessionLocal, engine
+from utils.jerarquia import rebuild_activo_paths
+
+def add_path_column():
+    """
+    Añade la columna activos.path y su índice si todavía no existen (bases creadas antes del cambio).
+    """
+    columns = [column["name"] for column in inspect(engine).get_columns("activos")]
+    with engine.begin() as conn:
+        if "path" not in columns:
+            conn.execute(text("ALTER TABLE activos ADD COLUMN path VARCHAR"))
+            print("Columna activos.path añadida.")
+        else:
+            print("La columna activos.path ya existe.")
+
+    for index in Activo.__table__.indexes:
+        if index.name == "ix_activos_path":
+            index.create(bind=engine, checkfirst=True)
+            print("Índice ix_activos_path verificado.")
+
+def main():
+    add_path_column()
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        total = rebuild_activo_paths(db)
+        elapsed = time.perf_counter() - start
+        print(f"Rutas materializadas asignadas a {total} activos en {elapsed:.2f} s")
+    except Exception as e:
+        db.rollback()
+        print(f"Error al rellenar la columna path: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# scripts/migrate_ordenes_campana.py
+
+import os
+import sys
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import inspect, text
+from models import OrdenTrabajo
+from utils.database import engine
+
+def add_campana_column():
+    """
+    Añade la columna ordenes_trabajo.campana y el índice (campana, ubicacion_id) si todavía
+    no existen (bases creadas antes de que las campañas pudieran reintentarse).
+    """
+    columns = [column["name"] for column in inspect(engine).get_columns("ordenes_trabajo")]
+    with engine.begin() as conn:
+        if "campana" not in columns:
+            conn.execute(text("ALTER TABLE ordenes_trabajo ADD COLUMN campana VARCHAR"))
+            print("Columna ordenes_trabajo.campana añadida.")
+        else:
+            print("La columna ordenes_trabajo.campana ya existe.")
+
+    for index in OrdenTrabajo.__table__.indexes:
+        if index.name == "ix_ordenes_trabajo_campana_ubicacion":
+            index.create(bind=engine, checkfirst=True)
+            print("Índice ix_ordenes_trabajo_campana_ubicacion verificado.")
+
+if __name__ == "__main__":
+    add_campana_column()
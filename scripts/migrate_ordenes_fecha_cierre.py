@@ -0,0 +1,59 @@
+# scripts/migrate_ordenes_fecha_cierre.py
+
+import os
+import sys
+import time
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import inspect, text, update
+from models import OrdenTrabajo
+from utils.database import SessionLocal, engine
+from utils.analitica_ordenes import ESTADOS_CERRADOS, rebuild_hechos
+
+def add_fecha_cierre_column():
+    """
+    Añade la columna ordenes_trabajo.fecha_cierre y el índice (estado, fecha_creacion)
+    si todavía no existen (bases creadas antes de la analítica de órdenes).
+    """
+    columns = [column["name"] for column in inspect(engine).get_columns("ordenes_trabajo")]
+    with engine.begin() as conn:
+        if "fecha_cierre" not in columns:
+            conn.execute(text("ALTER TABLE ordenes_trabajo ADD COLUMN fecha_cierre TIMESTAMP"))
+            print("Columna ordenes_trabajo.fecha_cierre añadida.")
+        else:
+            print("La columna ordenes_trabajo.fecha_cierre ya existe.")
+
+    for index in OrdenTrabajo.__table__.indexes:
+        if index.name == "ix_ordenes_trabajo_estado_fecha_creacion":
+            index.create(bind=engine, checkfirst=True)
+            print("Índice ix_ordenes_trabajo_estado_fecha_creacion verificado.")
+
+def main():
+    add_fecha_cierre_column()
+    db = SessionLocal()
+    try:
+        # Las órdenes ya cerradas toman como fecha de cierre su última actualización
+        result = db.execute(
+            update(OrdenTrabajo)
+            .where(OrdenTrabajo.estado.in_(ESTADOS_CERRADOS), OrdenTrabajo.fecha_cierre.is_(None))
+            .values(fecha_cierre=OrdenTrabajo.fecha_actualizacion)
+        )
+        db.commit()
+        print(f"Fecha de cierre asignada a {result.rowcount} órdenes cerradas.")
+
+        start = time.perf_counter()
+        total = rebuild_hechos(db)
+        elapsed = time.perf_counter() - start
+        print(f"Hechos diarios de órdenes reconstruidos: {total} filas en {elapsed:.2f} s")
+    except Exception as e:
+        db.rollback()
+        print(f"Error al migrar la fecha de cierre de las órdenes: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
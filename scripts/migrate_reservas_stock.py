@@ -0,0 +1,32 @@
+# scripts/migrate_reservas_stock.py
+
+import os
+import sys
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import inspect, text
+from utils.database import engine
+
+# (tabla, columna) añadidas para las reservas de stock de las órdenes
+COLUMNAS = (("inventario", "reservado"), ("items_orden", "cantidad_reservada"))
+
+def add_reserva_columns():
+    """
+    Añade inventario.reservado e items_orden.cantidad_reservada (en 0) si todavía no existen
+    (bases creadas antes de las reservas de stock).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column in COLUMNAS:
+            if column in [c["name"] for c in inspector.get_columns(table)]:
+                print(f"La columna {table}.{column} ya existe.")
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"))
+            print(f"Columna {table}.{column} añadida.")
+
+if __name__ == "__main__":
+    add_reserva_columns()
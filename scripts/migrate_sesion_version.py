@@ -0,0 +1,29 @@
+# scripts/migrate_sesion_version.py
+
+import os
+import sys
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import inspect, text
+from utils.database import engine
+
+def add_sesion_version_column():
+    """
+    Añade usuarios.sesion_version (en 0) si todavía no existe (bases creadas antes de los tokens
+    de sesión revocables). Los tokens emitidos antes no llevan versión y dejan de valer: cada usuario
+    vuelve a iniciar sesión una vez.
+    """
+    columnas = [c["name"] for c in inspect(engine).get_columns("usuarios")]
+    if "sesion_version" in columnas:
+        print("La columna usuarios.sesion_version ya existe.")
+        return
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE usuarios ADD COLUMN sesion_version INTEGER NOT NULL DEFAULT 0"))
+    print("Columna usuarios.sesion_version añadida.")
+
+if __name__ == "__main__":
+    add_sesion_version_column()
@@ -0,0 +1,30 @@
+# scripts/rebuild_activo_clausura.py
+
+import os
+import sys
+import time
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from utils.database import SessionLocal, create_tables
+from utils.jerarquia import rebuild_activo_clausura
+
+def main():
+    create_tables()
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        total = rebuild_activo_clausura(db)
+        elapsed = time.perf_counter() - start
+        print(f"Tabla de clausura reconstruida: {total} filas en {elapsed:.2f} s")
+    except Exception as e:
+        db.rollback()
+        print(f"Error al reconstruir la tabla de clausura: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
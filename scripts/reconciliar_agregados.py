@@ -0,0 +1,45 @@
+# scripts/reconciliar_agregados.py
+
+import os
+import sys
+import time
+import argparse
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from utils.database import SessionLocal, create_tables
+from utils.agregados import reconcile_agregados
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica los agregados de informes contra un recálculo completo.")
+    parser.add_argument("--fix", action="store_true", help="Reescribe los agregados con el recálculo si hay diferencias.")
+    parser.add_argument("--max-diffs", type=int, default=20, help="Cantidad máxima de diferencias a mostrar.")
+    args = parser.parse_args()
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        differences = reconcile_agregados(db, fix=args.fix)
+        elapsed = time.perf_counter() - start
+
+        if not differences:
+            print(f"Agregados correctos ({elapsed:.2f} s).")
+            return
+
+        print(f"{len(differences)} diferencia(s) ({elapsed:.2f} s):")
+        for (metrica, dimension, clave), stored, expected in differences[:args.max_diffs]:
+            print(f"  {metrica}/{dimension}/{clave}: guardado {stored} | recalculado {expected}")
+        if args.fix:
+            print("Agregados reescritos con el recálculo.")
+        else:
+            print("Ejecuta con --fix para corregirlos.")
+            sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
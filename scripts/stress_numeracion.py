@@ -0,0 +1,84 @@
+# scripts/stress_numeracion.py
+
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from models import Activo, OrdenTrabajo
+from utils.auth import get_user_by_username
+from utils.database import SessionLocal, init_db
+from utils.ordenes_trabajo import create_orden_trabajo, create_activo
+
+def main():
+    """
+    Crea órdenes desde muchos hilos a la vez y verifica que no haya números repetidos ni errores.
+    """
+    parser = argparse.ArgumentParser(description="Prueba de concurrencia de la numeración de órdenes.")
+    parser.add_argument("--threads", type=int, default=32, help="Hilos concurrentes.")
+    parser.add_argument("--orders-per-thread", type=int, default=10, help="Órdenes creadas por cada hilo.")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        admin = get_user_by_username(db, "admin")
+        ubicacion = db.query(Activo).first() or create_activo(db, "Stress", "Ubicación Principal")
+        admin_id, ubicacion_id = admin.id, ubicacion.id
+    finally:
+        db.close()
+
+    barrier = threading.Barrier(args.threads)
+
+    def worker(thread_index):
+        numeros = []
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            for i in range(args.orders_per_thread):
+                orden = create_orden_trabajo(
+                    db=session,
+                    titulo=f"Stress {thread_index}-{i}",
+                    descripcion="Prueba de concurrencia de numeración",
+                    estado="Pendiente",
+                    criticidad="Bajo",
+                    fecha_limite=None,
+                    ubicacion_id=ubicacion_id,
+                    generado_por_id=admin_id
+                )
+                numeros.append(orden.numero_orden)
+        finally:
+            session.close()
+        return numeros
+
+    start = time.perf_counter()
+    errores = []
+    numeros = []
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        futures = [executor.submit(worker, i) for i in range(args.threads)]
+        for future in futures:
+            try:
+                numeros.extend(future.result())
+            except Exception as e:
+                errores.append(e)
+    elapsed = time.perf_counter() - start
+
+    esperadas = args.threads * args.orders_per_thread
+    duplicados = len(numeros) - len(set(numeros))
+    print(f"Órdenes creadas: {len(numeros)}/{esperadas} en {elapsed:.2f} s ({len(numeros) / elapsed:.0f} órdenes/s)")
+    print(f"Números duplicados: {duplicados} | Errores: {len(errores)}")
+    for e in errores[:5]:
+        print(f"  Error: {e}")
+    if duplicados or errores or len(numeros) != esperadas:
+        sys.exit(1)
+    print("OK: numeración única sin reintentos.")
+
+if __name__ == "__main__":
+    main()
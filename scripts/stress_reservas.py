@@ -0,0 +1,211 @@
+# scripts/stress_reservas.py
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+def main():
+    """
+    Reserva el mismo producto desde muchos hilos a la vez, mientras otros hilos consumen y dan de baja
+    ítems de ese producto por el libro de movimientos, y verifica que el disponible nunca sea negativo,
+    que lo reservado coincida exactamente con las reservas confirmadas y que las existencias cuadren con el libro.
+    """
+    parser = argparse.ArgumentParser(description="Prueba de concurrencia de las reservas de stock.")
+    parser.add_argument("--database-url", help="Base de datos a usar (por defecto, una SQLite temporal). En PostgreSQL "
+                                               "se crean productos e ítems de prueba nuevos.")
+    parser.add_argument("--threads", type=int, default=64, help="Hilos concurrentes.")
+    parser.add_argument("--intentos", type=int, default=50, help="Reservas intentadas por cada hilo.")
+    parser.add_argument("--stock", type=int, default=2000, help="Unidades del producto disputado.")
+    parser.add_argument("--lineas", type=int, default=2, help="Productos por reserva (el disputado más otros con stock de sobra).")
+    parser.add_argument("--liberar", type=float, default=0.2, help="Fracción de reservas confirmadas que se liberan después.")
+    parser.add_argument("--consumidores", type=int, default=4, help="Hilos que consumen y dan de baja unidades del producto disputado.")
+    parser.add_argument("--bajas", type=int, default=20, help="Ítems pequeños (5 unidades) del producto disputado que se dan de baja.")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp.name, 'stress.db')}"
+
+    # La base se fija antes de importar utils.database
+    from models import Producto, Inventario
+    from utils.auth import get_user_by_username
+    from utils.database import SessionLocal, init_db, engine
+    from utils.ordenes_trabajo import create_activo
+    from utils.inventario_db import create_inventory_item, consume_inventory_item, retire_inventory_item
+    from utils.reservas_stock import reserve_stock, release_stock, reconcile_reservas
+    from utils.movimientos_inventario import reconcile_stock
+
+    init_db()
+    marca = f"{int(time.time())}"
+    db = SessionLocal()
+    try:
+        admin = get_user_by_username(db, "admin")
+        centro = create_activo(db, f"STRESS-{marca}", "Centro de Almacenamiento")
+        estante = create_activo(db, f"STRESS-{marca}-E00", "Estante", parent_id=centro.id)
+        productos = []
+        for i in range(max(args.lineas, 1)):
+            producto = Producto(nombre=f"Stress reserva {marca}-{i}", descripcion="Prueba de concurrencia", precio_unitario=1.0)
+            db.add(producto)
+            productos.append(producto)
+        db.commit()
+        # El stock entra por el libro de movimientos, como un alta normal
+        for i, producto in enumerate(productos):
+            cantidad = args.stock if i == 0 else args.stock * args.threads * args.intentos
+            item = create_inventory_item(db, "Fuente", f"STRESS-{marca}-{i}", "Stock de prueba", "Stock de prueba", "Funcionando",
+                                         cantidad, admin.id, estante.id, producto_asociado_id=producto.id)
+            if i == 0:
+                principal_id = item.id
+        # Ítems pequeños del producto disputado para las bajas concurrentes
+        para_baja = [create_inventory_item(db, "Fuente", f"STRESS-{marca}-B{b}", "Stock de prueba", "Stock de prueba", "Funcionando",
+                                           5, admin.id, estante.id, producto_asociado_id=productos[0].id).id
+                     for b in range(args.bajas)]
+        stock_inicial = args.stock + 5 * args.bajas
+        producto_ids = [p.id for p in productos]
+        admin_id = admin.id
+    finally:
+        db.close()
+    disputado = producto_ids[0]
+
+    barrier = threading.Barrier(args.threads + args.consumidores + 2) # Hilos, consumidores, monitor y el principal
+    terminado = threading.Event()
+    minimo = {"disponible": stock_inicial, "muestras": 0}
+    bajas_lock = threading.Lock()
+
+    def monitor():
+        # Lee el disponible mientras los hilos reservan; nunca debe ser negativo
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            while not terminado.is_set():
+                cantidad, reservado = session.query(Inventario.cantidad, Inventario.reservado).filter(Inventario.producto_id == disputado).one()
+                minimo["disponible"] = min(minimo["disponible"], cantidad - reservado)
+                minimo["muestras"] += 1
+                session.rollback() # Nueva instantánea en la próxima lectura
+                time.sleep(0.002)
+        finally:
+            session.close()
+
+    def worker(thread_index):
+        rng = random.Random(thread_index)
+        confirmadas = liberadas = rechazadas = 0
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            for _ in range(args.intentos):
+                cantidades = {producto_id: 1 for producto_id in producto_ids}
+                faltantes = reserve_stock(session, cantidades)
+                if faltantes:
+                    session.rollback()
+                    rechazadas += 1
+                    continue
+                session.commit()
+                confirmadas += 1
+                if rng.random() < args.liberar:
+                    release_stock(session, cantidades)
+                    session.commit()
+                    liberadas += 1
+        finally:
+            session.close()
+        return confirmadas, liberadas, rechazadas
+
+    def consumer(thread_index):
+        # Consume unidades del ítem principal (sin orden) y da de baja ítems pequeños: ambos deben
+        # rechazarse (ValueError) cuando las unidades que saldrían están reservadas
+        rng = random.Random(10000 + thread_index)
+        consumidas = retiradas = rechazadas = 0
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            for _ in range(args.intentos):
+                item_id = None
+                if rng.random() < 0.2:
+                    with bajas_lock:
+                        item_id = para_baja.pop() if para_baja else None
+                try:
+                    if item_id is not None:
+                        retire_inventory_item(session, item_id, admin_id)
+                        retiradas += 5
+                    else:
+                        consume_inventory_item(session, principal_id, 1, usuario_id=admin_id)
+                        consumidas += 1
+                except ValueError:
+                    session.rollback()
+                    rechazadas += 1
+        finally:
+            session.close()
+        return consumidas, retiradas, rechazadas
+
+    vigilante = threading.Thread(target=monitor)
+    vigilante.start()
+    errores = []
+    totales = [0, 0, 0]
+    salidas = [0, 0, 0]
+    with ThreadPoolExecutor(max_workers=args.threads + args.consumidores) as executor:
+        futures = [executor.submit(worker, i) for i in range(args.threads)]
+        futures_salida = [executor.submit(consumer, i) for i in range(args.consumidores)]
+        start = time.perf_counter()
+        barrier.wait()
+        for future_list, acumulado in ((futures, totales), (futures_salida, salidas)):
+            for future in future_list:
+                try:
+                    for i, value in enumerate(future.result()):
+                        acumulado[i] += value
+                except Exception as e:
+                    errores.append(e)
+        elapsed = time.perf_counter() - start
+    terminado.set()
+    vigilante.join()
+
+    confirmadas, liberadas, rechazadas = totales
+    consumidas, retiradas, salidas_rechazadas = salidas
+    db = SessionLocal()
+    try:
+        finales = {p: (c, r) for p, c, r in db.query(Inventario.producto_id, Inventario.cantidad, Inventario.reservado)
+                   .filter(Inventario.producto_id.in_(producto_ids))}
+        # Las reservas de prueba no pertenecen a ninguna orden: se liberan para dejar la base reconciliada
+        release_stock(db, {p: r for p, (_, r) in finales.items()})
+        db.commit()
+        pendientes = reconcile_reservas(db)
+        diferencias_stock = reconcile_stock(db)
+    finally:
+        db.close()
+        engine.dispose()
+        if tmp:
+            tmp.cleanup()
+
+    intentos = args.threads * args.intentos
+    print(f"{engine.dialect.name}: {intentos} reservas de {len(producto_ids)} línea(s) desde {args.threads} hilos en {elapsed:.2f} s "
+          f"({intentos / elapsed:,.0f} intentos/s, {confirmadas / elapsed:,.0f} confirmadas/s)")
+    print(f"Confirmadas: {confirmadas} | liberadas: {liberadas} | rechazadas por falta de stock: {rechazadas} | errores: {len(errores)}")
+    print(f"Salidas por el libro: {consumidas} consumidas | {retiradas} dadas de baja | {salidas_rechazadas} rechazadas "
+          f"| diferencias de existencias: {len(diferencias_stock)}")
+    for e in errores[:5]:
+        print(f"  Error: {e}")
+
+    esperado = confirmadas - liberadas
+    cantidad, reservado = finales[disputado]
+    print(f"Producto disputado: cantidad {cantidad}, reservado {reservado} (esperado {esperado}), "
+          f"disponible mínimo observado {minimo['disponible']} en {minimo['muestras']} lecturas")
+    ok = (not errores and minimo["disponible"] >= 0 and cantidad - reservado >= 0 and not pendientes and not diferencias_stock
+          and all(r == esperado for _, r in finales.values()) and confirmadas + rechazadas == intentos
+          and cantidad == stock_inicial - consumidas - retiradas)
+    if not ok:
+        print("HAY ERRORES: el stock reservado o las existencias no coinciden, o el disponible fue negativo.")
+        sys.exit(1)
+    print("OK: el disponible nunca fue negativo y lo reservado y las existencias coinciden con las reservas y el libro.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+# scripts/verificar_backends.py
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+import subprocess
+from datetime import date, datetime, timedelta
+
+# Añade la raíz del proyecto al path para poder importar 'models' y 'utils'
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+CRITICIDADES = ["Emergencial", "Urgente", "Alto", "Medio", "Bajo"]
+ESTADOS_ITEM = ["Funcionando", "No Funcionando", "En Reparación"]
+
+def load_scenario(db, scale: int, seed: int = 5):
+    """
+    Carga el mismo escenario en cualquier motor usando solo las funciones de utils/ (como lo haría la UI):
+    jerarquía de sitios, órdenes (algunas con stock reservado) con cambios de estado e ítems de inventario con traslados, consumos y bajas.
+    """
+    from models import Usuario, Producto
+    from utils.ordenes_trabajo import create_activo, create_orden_trabajo, update_orden_estado
+    from utils.inventario_db import create_inventory_item, move_inventory_item, consume_inventory_item, retire_inventory_item
+
+    rng = random.Random(seed)
+    admin = db.query(Usuario).filter(Usuario.nombre_usuario == "admin").one()
+
+    equipos = []
+    for s in range(3):
+        sitio = create_activo(db, f"S{s:02d}", "Sitio", f"Sitio de producción {s}")
+        for a in range(3):
+            area = create_activo(db, f"S{s:02d}-A{a:02d}", "Área", parent_id=sitio.id)
+            for e in range(5):
+                equipos.append(create_activo(db, f"S{s:02d}-A{a:02d}-EQ{e:02d}", "Equipo", f"Equipo {e} del área {a}", parent_id=area.id))
+
+    estantes = []
+    for c, tipo in enumerate(["Centro de Almacenamiento", "Centro de Pruebas"]):
+        centro = create_activo(db, f"C{c:02d}", tipo)
+        for e in range(4):
+            estantes.append(create_activo(db, f"C{c:02d}-E{e:02d}", "Estante", parent_id=centro.id))
+
+    productos = []
+    for p in range(3):
+        producto = Producto(nombre=f"Repuesto {p}", descripcion=f"Repuesto de prueba {p}", precio_unitario=10.0 * (p + 1))
+        db.add(producto)
+        productos.append(producto)
+    db.commit()
+    for p, producto in enumerate(productos):
+        create_inventory_item(db, "Repuesto", f"SN-R{p}", f"Stock de {producto.nombre}", f"Stock de {producto.nombre}",
+                              "Funcionando", scale // 4, admin.id, estantes[p].id, producto_asociado_id=producto.id)
+
+    ordenes = []
+    for i in range(scale):
+        fecha_limite = datetime.utcnow() + timedelta(days=rng.randint(-5, 10))
+        items_orden = [{"producto_id": rng.choice(productos).id, "cantidad": rng.randint(1, 3)}] if i % 3 == 0 else []
+        try:
+            orden = create_orden_trabajo(
+                db, f"Orden {i}", f"Revisión {i}", "Pendiente", rng.choice(CRITICIDADES),
+                fecha_limite, rng.choice(equipos).id, admin.id, items_orden=items_orden, reservar_stock=True
+            )
+        except ValueError: # Sin stock para reservar: la orden se crea sin ítems
+            orden = create_orden_trabajo(
+                db, f"Orden {i}", f"Revisión {i}", "Pendiente", rng.choice(CRITICIDADES),
+                fecha_limite, rng.choice(equipos).id, admin.id
+            )
+        ordenes.append(orden)
+    for orden in rng.sample(ordenes, scale // 2):
+        update_orden_estado(db, orden.id, rng.choice(["En Progreso", "Completada", "Cancelada"]))
+    for orden in rng.sample(ordenes, scale // 10):
+        update_orden_estado(db, orden.id, "Pendiente")
+
+    items = []
+    for i in range(scale * 2):
+        items.append(create_inventory_item(
+            db, rng.choice(["Repuesto", "Herramienta", "Instrumento"]), f"SN-{i:05d}", f"Ítem {i} de prueba",
+            f"Ítem de prueba número {i}", rng.choice(ESTADOS_ITEM), rng.randint(1, 20), admin.id, rng.choice(estantes).id,
+            precio_estimado_usd=round(rng.uniform(1, 500), 2)
+        ))
+    for item in rng.sample(items, scale // 5):
+        move_inventory_item(db, item.id, rng.choice(estantes).id)
+    for item in rng.sample(items, scale // 5):
+        consume_inventory_item(db, item.id, rng.randint(1, item.cantidad), rng.choice(ordenes).id, admin.id)
+    for item in rng.sample(items, scale // 20):
+        if item.cantidad:
+            retire_inventory_item(db, item.id, admin.id)
+
+def check_import_conflict(db) -> list:
+    """
+    Importa un CSV de dos lotes simulando que otro usuario registra una serie del primero entre la
+    consulta de existentes y la inserción. Lo correcto: el primer lote se descarta y se reporta (sin
+    excepción) y el segundo se importa. Retorna [importadas, errores].
+    """
+    import io
+    import utils.importacion_inventario as importacion
+    from models import Usuario
+
+    admin = db.query(Usuario).filter(Usuario.nombre_usuario == "admin").one()
+    archivo = io.BytesIO(("numero_serie,tipo_item,descripcion_breve,estado_funcionamiento,ubicacion\n" + "".join(
+        f"SN-IMP-{i},Repuesto,Importado {i},Funcionando,C00-E00\n" for i in range(4)
+    )).encode("utf-8"))
+    insert_rows = importacion.insert_rows
+    simulada = []
+
+    def insert_con_alta_simultanea(conn, table, columns, rows):
+        if not simulada:
+            # La serie llega a la base por otra vía justo antes del INSERT del lote
+            simulada.append(rows[0].numero_serie)
+            insert_rows(conn, table, columns, [rows[0]._replace(numero_item=f"{rows[0].numero_item}-X")])
+        return insert_rows(conn, table, columns, rows)
+
+    importacion.insert_rows = insert_con_alta_simultanea
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            resultado = importacion.import_inventory_items(db, archivo, "conflicto.csv", admin.id,
+                                                           os.path.join(tmp, "errores.csv"), chunk_size=2)
+    finally:
+        importacion.insert_rows = insert_rows
+    return [resultado.importadas, resultado.errores]
+
+def _normalize(value):
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    return value
+
+def page_loads(db):
+    """
+    Lecturas de cada página, como las hace la UI. Retorna {página: función que devuelve resultados comparables}.
+    """
+    from utils.ordenes_trabajo import children_of, get_ordenes_listado, get_usuarios_por_rol, find_activos_by_tag_prefix
+    from utils.inventario_db import get_inventory_items_page
+    from utils.busqueda import search_activos, search_inventory_items
+    from utils.reports import (
+        get_inventario_stats, get_ordenes_by_status_count, get_inventario_by_tipo,
+        get_inventario_by_ubicacion, get_ordenes_by_dia
+    )
+    from utils.analitica_ordenes import get_throughput_por_dia, get_histograma_resolucion, get_resumen_vencimientos
+    from utils.valoracion import get_valoracion
+
+    hoy = datetime.utcnow().date()
+    desde = hoy - timedelta(days=90)
+
+    def ordenes():
+        return {
+            "niveles": children_of(db, None, "ordenes").labels,
+            "usuarios": [u.nombre_usuario for u in get_usuarios_por_rol(db)],
+            "listado": [{k: v for k, v in o.items() if k != "id"} for o in get_ordenes_listado(db)],
+            "tags": [m["ruta"] for m in find_activos_by_tag_prefix(db, "S01-A0")],
+        }
+
+    def inventario():
+        items, _ = get_inventory_items_page(db)
+        sitios = children_of(db, None, "inventario")
+        return {
+            "sitios": sitios.labels,
+            "pagina": [(i.numero_item, i.numero_serie, i.cantidad) for i in items],
+            "busqueda": sorted(i.numero_serie for i in search_inventory_items(db, "SN-0001", limit=1000)),
+            "activos": sorted(a.nombre for a in search_activos(db, "EQ03", limit=1000)),
+        }
+
+    def informes():
+        sitios = children_of(db, None, "inventario")
+        valoracion = get_valoracion(db)
+        return {
+            "stats": get_inventario_stats(db),
+            "por_estado": get_ordenes_by_status_count(db),
+            "por_tipo": [tuple(r) for r in get_inventario_by_tipo(db)],
+            "por_sitio": get_inventario_by_ubicacion(db, list(sitios.ids)),
+            "por_dia": [tuple(r) for r in get_ordenes_by_dia(db)],
+            "throughput": [tuple(r) for r in get_throughput_por_dia(db, desde, hoy)],
+            "histograma": get_histograma_resolucion(db, desde, hoy),
+            "vencimientos": [r[:4] for r in get_resumen_vencimientos(db, desde, hoy)],
+            "valoracion": [valoracion.subtree(activo_id) for activo_id in sitios.ids],
+        }
+
+    return {"ordenes": ordenes, "inventario": inventario, "informes": informes}
+
+def run_backend(url: str, scale: int, repeat: int) -> dict:
+    """
+    Ejecuta el escenario en un motor (en este proceso) y retorna resultados, reconciliaciones y tiempos.
+    """
+    os.environ["DATABASE_URL"] = url
+    from utils.database import SessionLocal, init_db
+    from utils.agregados import reconcile_agregados
+    from utils.analitica_ordenes import reconcile_hechos
+    from utils.movimientos_inventario import reconcile_stock
+    from utils.reservas_stock import reconcile_reservas
+    from utils.secuencias import peek_next
+    from models import Activo
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if db.query(Activo.id).first() is not None:
+            raise SystemExit(f"La base de datos {url} no está vacía; usa una base nueva para la verificación.")
+        start = time.perf_counter()
+        load_scenario(db, scale)
+        carga = time.perf_counter() - start
+
+        resultados = {}
+        tiempos = {}
+        for pagina, load in page_loads(db).items():
+            resultados[pagina] = _normalize(load())
+            mejores = []
+            for _ in range(repeat):
+                db.expire_all()
+                start = time.perf_counter()
+                load()
+                mejores.append(time.perf_counter() - start)
+            tiempos[pagina] = min(mejores) * 1000
+
+        resultados["importacion_conflicto"] = check_import_conflict(db)
+        resultados["secuencias"] = [peek_next(db, "numero_orden"), peek_next(db, "numero_item")]
+        resultados["diferencias_agregados"] = len(reconcile_agregados(db))
+        resultados["diferencias_hechos"] = len(reconcile_hechos(db))
+        resultados["diferencias_stock"] = len(reconcile_stock(db))
+        resultados["diferencias_reservas"] = len(reconcile_reservas(db))
+        return {"dialecto": db.get_bind().dialect.name, "carga_s": carga, "tiempos_ms": tiempos, "resultados": resultados}
+    finally:
+        db.close()
+
+def _diff(a, b, path=""):
+    if isinstance(a, dict) and isinstance(b, dict):
+        for key in sorted(set(a) | set(b)):
+            yield from _diff(a.get(key), b.get(key), f"{path}/{key}")
+    elif a != b:
+        yield path, a, b
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecuta la capa utils/ contra SQLite y PostgreSQL y compara los resultados y tiempos de carga de cada página.")
+    parser.add_argument("--postgres-url", default=os.environ.get("VERIFICAR_POSTGRES_URL"),
+                        help="URL de una base PostgreSQL vacía (se omite PostgreSQL si no se indica).")
+    parser.add_argument("--scale", type=int, default=200, help="Órdenes del escenario (se crean el doble de ítems).")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por página (se reporta la mejor).")
+    parser.add_argument("--run-backend", help=argparse.SUPPRESS) # Uso interno: un motor por subproceso
+    args = parser.parse_args()
+
+    if args.run_backend:
+        print(json.dumps(run_backend(args.run_backend, args.scale, args.repeat), default=str))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {"sqlite": f"sqlite:///{os.path.join(tmp, 'verificacion.db')}"}
+        if args.postgres_url:
+            backends["postgresql"] = args.postgres_url
+        else:
+            print("PostgreSQL omitido (indica --postgres-url o VERIFICAR_POSTGRES_URL).")
+
+        # Cada motor en su propio proceso: los índices y árboles en memoria son por proceso
+        reportes = {}
+        for name, url in backends.items():
+            salida = subprocess.run(
+                [sys.executable, __file__, "--run-backend", url, "--scale", str(args.scale), "--repeat", str(args.repeat)],
+                capture_output=True, text=True
+            )
+            if salida.returncode != 0:
+                print(f"[{name}] falló:\n{salida.stderr}")
+                sys.exit(1)
+            reportes[name] = json.loads(salida.stdout.strip().splitlines()[-1])
+
+    paginas = list(next(iter(reportes.values()))["tiempos_ms"])
+    print(f"{'Motor':<12}{'Carga (s)':>11}" + "".join(f"{p + ' (ms)':>18}" for p in paginas))
+    for name, reporte in reportes.items():
+        print(f"{name:<12}{reporte['carga_s']:>11.1f}" + "".join(f"{reporte['tiempos_ms'][p]:>18.1f}" for p in paginas))
+
+    ok = True
+    for name, reporte in reportes.items():
+        for clave in ("diferencias_agregados", "diferencias_hechos", "diferencias_stock", "diferencias_reservas"):
+            if reporte["resultados"][clave]:
+                print(f"[{name}] {clave}: {reporte['resultados'][clave]}")
+                ok = False
+        if reporte["resultados"]["importacion_conflicto"] != [2, 2]:
+            print(f"[{name}] importación con alta simultánea: {reporte['resultados']['importacion_conflicto']} "
+                  "(esperado [2 importadas, 2 errores])")
+            ok = False
+    if len(reportes) == 2:
+        diferencias = list(_diff(reportes["sqlite"]["resultados"], reportes["postgresql"]["resultados"]))
+        for path, a, b in diferencias[:20]:
+            print(f"Diferencia en {path}:\n  sqlite:     {a}\n  postgresql: {b}")
+        ok = ok and not diferencias
+    print("Resultado: " + ("OK, los motores son consistentes." if ok else "HAY DIFERENCIAS."))
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
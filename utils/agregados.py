@@ -0,0 +1,326 @@
+# utils/agregados.py
+
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, delete, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import Agregado, Activo, InventarioItem, OrdenTrabajo
+from utils.arbol_activos import get_arbol_activos
+
+METRICA_INVENTARIO = "inventario"
+METRICA_ORDENES = "ordenes"
+
+DIMENSION_TOTAL = "total"
+CLAVE_TOTAL = "*"
+
+# Diferencia de valor tolerada al reconciliar (sumas en coma flotante)
+TOLERANCIA_VALOR = 0.005
+
+def _clave(valor) -> str:
+    return str(valor) if valor is not None else "sin valor"
+
+def _day_key(fecha) -> str:
+    return fecha.date().isoformat() if fecha is not None else "sin fecha"
+
+def _sql_day_key(dia) -> str:
+    # date() de SQL: objeto date en PostgreSQL, texto 'YYYY-MM-DD' en SQLite
+    return str(dia)[:10] if dia is not None else "sin fecha"
+
+def ubicacion_ancestors(db: Session, activo_id: int) -> list[int]:
+    """
+    IDs desde la raíz hasta la ubicación, para sumar en todos los subárboles que la contienen.
+    Usa el árbol en memoria y, si la ubicación es posterior a la instantánea, su ruta materializada.
+    """
+    chain = get_arbol_activos(db).ancestor_ids(activo_id)
+    if chain:
+        return chain
+    path = db.execute(select(Activo.path).where(Activo.id == activo_id)).scalar()
+    if path:
+        return [int(part) for part in path.strip("/").split("/")]
+    return [activo_id]
+
+def _item_keys(db: Session, item: InventarioItem):
+    yield METRICA_INVENTARIO, DIMENSION_TOTAL, CLAVE_TOTAL
+    yield METRICA_INVENTARIO, "estado", _clave(item.estado_funcionamiento)
+    yield METRICA_INVENTARIO, "tipo_item", _clave(item.tipo_item)
+    yield METRICA_INVENTARIO, "dia", _day_key(item.fecha_alta)
+    for ancestor_id in ubicacion_ancestors(db, item.ubicacion_id):
+        yield METRICA_INVENTARIO, "ubicacion", str(ancestor_id)
+
+def _orden_keys(db: Session, orden: OrdenTrabajo, estado: str):
+    yield METRICA_ORDENES, DIMENSION_TOTAL, CLAVE_TOTAL
+    yield METRICA_ORDENES, "estado", _clave(estado)
+    yield METRICA_ORDENES, "dia", _day_key(orden.fecha_creacion)
+    for ancestor_id in ubicacion_ancestors(db, orden.ubicacion_id):
+        yield METRICA_ORDENES, "ubicacion", str(ancestor_id)
+
+def upsert_increment(db: Session, model, keys: dict, increments: dict):
+    """
+    Suma 'increments' {columna: delta} a la fila de 'model' con la clave primaria 'keys',
+    creándola si no existe. En PostgreSQL y SQLite es un único INSERT ... ON CONFLICT DO UPDATE;
+    en otros motores, UPDATE y luego INSERT si no había fila. No hace commit.
+    """
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(table).values(**keys, **increments)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in keys],
+            set_={name: table.c[name] + stmt.excluded[name] for name in increments}
+        )
+        db.execute(stmt)
+        return
+
+    result = db.execute(
+        update(table)
+        .where(*[table.c[name] == value for name, value in keys.items()])
+        .values({name: table.c[name] + delta for name, delta in increments.items()})
+    )
+    if result.rowcount == 0:
+        db.execute(insert(table).values(**keys, **increments))
+
+def upsert_increments(db: Session, model, key_names: tuple, rows: list[dict]):
+    """
+    Como upsert_increment para muchas filas {clave..., incremento...} con las mismas columnas:
+    en PostgreSQL y SQLite, una sola sentencia compilada una vez y ejecutada en lote (executemany).
+    Las filas se aplican en el orden recibido. No hace commit.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        for row in rows:
+            upsert_increment(db, model, {name: row[name] for name in key_names},
+                             {name: value for name, value in row.items() if name not in key_names})
+        return
+
+    dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c[name] for name in key_names],
+        set_={name: table.c[name] + stmt.excluded[name] for name in rows[0] if name not in key_names}
+    )
+    db.execute(stmt, rows)
+
+def _apply_deltas(db: Session, deltas: dict):
+    """
+    Suma los deltas {(metrica, dimension, clave): (registros, unidades, valor)} dentro de la
+    transacción del llamador (no hace commit). Las claves se actualizan siempre en el mismo orden
+    para que dos transacciones concurrentes no se bloqueen mutuamente.
+    """
+    upsert_increments(db, Agregado, ("metrica", "dimension", "clave"), [
+        dict(metrica=metrica, dimension=dimension, clave=clave, registros=registros, unidades=unidades, valor=valor)
+        for (metrica, dimension, clave), (registros, unidades, valor) in sorted(deltas.items())
+    ])
+
+def record_inventory_item(db: Session, item: InventarioItem):
+    """
+    Suma un ítem de inventario recién creado a los agregados. No hace commit.
+    """
+    unidades = item.cantidad or 0
+    valor = (item.precio_estimado_usd or 0.0) * unidades
+    _apply_deltas(db, {key: (1, unidades, valor) for key in _item_keys(db, item)})
+
+def record_inventory_items(db: Session, items):
+    """
+    Suma un lote de ítems nuevos (ej: una importación) con un solo upsert por clave afectada,
+    no uno por ítem; los ancestros se resuelven una vez por ubicación distinta.
+    Acepta cualquier objeto con los atributos de InventarioItem. No hace commit.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    por_ubicacion = defaultdict(lambda: [0, 0, 0.0])
+
+    def add(acc, unidades, valor):
+        acc[0] += 1
+        acc[1] += unidades
+        acc[2] += valor
+
+    for item in items:
+        unidades = item.cantidad or 0
+        valor = (item.precio_estimado_usd or 0.0) * unidades
+        add(deltas[(METRICA_INVENTARIO, DIMENSION_TOTAL, CLAVE_TOTAL)], unidades, valor)
+        add(deltas[(METRICA_INVENTARIO, "estado", _clave(item.estado_funcionamiento))], unidades, valor)
+        add(deltas[(METRICA_INVENTARIO, "tipo_item", _clave(item.tipo_item))], unidades, valor)
+        add(deltas[(METRICA_INVENTARIO, "dia", _day_key(item.fecha_alta))], unidades, valor)
+        add(por_ubicacion[item.ubicacion_id], unidades, valor)
+
+    for ubicacion_id, (registros, unidades, valor) in por_ubicacion.items():
+        for ancestor_id in ubicacion_ancestors(db, ubicacion_id):
+            acc = deltas[(METRICA_INVENTARIO, "ubicacion", str(ancestor_id))]
+            acc[0] += registros
+            acc[1] += unidades
+            acc[2] += valor
+    _apply_deltas(db, {key: tuple(delta) for key, delta in deltas.items()})
+
+def record_inventory_item_move(db: Session, item: InventarioItem, old_ubicacion_id: int):
+    """
+    Traslada un ítem de los subárboles de su ubicación anterior a los de la nueva
+    (los ancestros comunes no cambian). No hace commit.
+    """
+    unidades = item.cantidad or 0
+    valor = (item.precio_estimado_usd or 0.0) * unidades
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    for sign, ubicacion_id in ((-1, old_ubicacion_id), (1, item.ubicacion_id)):
+        for ancestor_id in ubicacion_ancestors(db, ubicacion_id):
+            delta = deltas[(METRICA_INVENTARIO, "ubicacion", str(ancestor_id))]
+            delta[0] += sign
+            delta[1] += sign * unidades
+            delta[2] += sign * valor
+    _apply_deltas(db, {key: tuple(delta) for key, delta in deltas.items() if delta[0] != 0})
+
+def record_inventory_item_cantidad(db: Session, item: InventarioItem, old_cantidad: int):
+    """
+    Ajusta unidades y valor de un ítem cuya cantidad cambió (consumo o baja); el ítem sigue contando
+    como registro. No hace commit.
+    """
+    unidades = (item.cantidad or 0) - (old_cantidad or 0)
+    if unidades == 0:
+        return
+    valor = (item.precio_estimado_usd or 0.0) * unidades
+    _apply_deltas(db, {key: (0, unidades, valor) for key in _item_keys(db, item)})
+
+def record_orden(db: Session, orden: OrdenTrabajo):
+    """
+    Suma una orden recién creada a los agregados. No hace commit.
+    """
+    _apply_deltas(db, {key: (1, 0, 0.0) for key in _orden_keys(db, orden, orden.estado)})
+
+def record_ordenes(db: Session, ordenes):
+    """
+    Suma un lote de órdenes nuevas (ej: una campaña) con un solo upsert por clave afectada;
+    los ancestros se resuelven una vez por ubicación distinta.
+    Acepta cualquier objeto con los atributos de OrdenTrabajo. No hace commit.
+    """
+    deltas = defaultdict(int)
+    por_ubicacion = defaultdict(int)
+    for orden in ordenes:
+        deltas[(METRICA_ORDENES, DIMENSION_TOTAL, CLAVE_TOTAL)] += 1
+        deltas[(METRICA_ORDENES, "estado", _clave(orden.estado))] += 1
+        deltas[(METRICA_ORDENES, "dia", _day_key(orden.fecha_creacion))] += 1
+        por_ubicacion[orden.ubicacion_id] += 1
+    for ubicacion_id, registros in por_ubicacion.items():
+        for ancestor_id in ubicacion_ancestors(db, ubicacion_id):
+            deltas[(METRICA_ORDENES, "ubicacion", str(ancestor_id))] += registros
+    _apply_deltas(db, {key: (registros, 0, 0.0) for key, registros in deltas.items()})
+
+def record_orden_estado_change(db: Session, old_estado: str, new_estado: str):
+    """
+    Mueve una orden de un estado a otro en los agregados. No hace commit.
+    """
+    if old_estado == new_estado:
+        return
+    _apply_deltas(db, {
+        (METRICA_ORDENES, "estado", _clave(old_estado)): (-1, 0, 0.0),
+        (METRICA_ORDENES, "estado", _clave(new_estado)): (1, 0, 0.0),
+    })
+
+# --- LECTURA (una fila por valor mostrado) ---
+
+def get_agregado(db: Session, metrica: str, dimension: str = DIMENSION_TOTAL, clave: str = CLAVE_TOTAL):
+    """
+    Retorna (registros, unidades, valor) de una clave, o ceros si aún no tiene filas.
+    """
+    row = db.execute(
+        select(Agregado.registros, Agregado.unidades, Agregado.valor)
+        .where(Agregado.metrica == metrica, Agregado.dimension == dimension, Agregado.clave == clave)
+    ).first()
+    return tuple(row) if row else (0, 0, 0.0)
+
+def get_agregados(db: Session, metrica: str, dimension: str, claves: list = None, desde: str = None):
+    """
+    Retorna las filas (clave, registros, unidades, valor) de una dimensión, opcionalmente solo algunas claves
+    o las claves >= 'desde' (rango sobre la clave primaria; las claves de 'dia' son fechas ISO).
+    """
+    query = (select(Agregado.clave, Agregado.registros, Agregado.unidades, Agregado.valor)
+             .where(Agregado.metrica == metrica, Agregado.dimension == dimension, Agregado.registros != 0))
+    if claves is not None:
+        query = query.where(Agregado.clave.in_([str(clave) for clave in claves]))
+    if desde is not None:
+        query = query.where(Agregado.clave >= desde)
+    return db.execute(query.order_by(Agregado.clave)).all()
+
+# --- RECÁLCULO COMPLETO Y RECONCILIACIÓN ---
+
+def compute_agregados(db: Session) -> dict:
+    """
+    Recalcula todos los agregados desde las tablas de origen con GROUP BY.
+    Los subárboles se obtienen agrupando por ubicación y propagando a los ancestros en memoria.
+    Retorna {(metrica, dimension, clave): (registros, unidades, valor)}.
+    """
+    totals = defaultdict(lambda: [0, 0, 0.0])
+
+    def add(key, registros, unidades, valor):
+        acc = totals[key]
+        acc[0] += registros
+        acc[1] += unidades or 0
+        acc[2] += valor or 0.0
+
+    unidades = func.coalesce(func.sum(InventarioItem.cantidad), 0)
+    valor = func.coalesce(func.sum(func.coalesce(InventarioItem.precio_estimado_usd, 0.0) * InventarioItem.cantidad), 0.0)
+    for column, dimension in ((InventarioItem.estado_funcionamiento, "estado"), (InventarioItem.tipo_item, "tipo_item")):
+        for clave, registros, u, v in db.query(column, func.count(InventarioItem.id), unidades, valor).group_by(column):
+            add((METRICA_INVENTARIO, dimension, _clave(clave)), registros, u, v)
+            if dimension == "estado":
+                add((METRICA_INVENTARIO, DIMENSION_TOTAL, CLAVE_TOTAL), registros, u, v)
+
+    dia_alta = func.date(InventarioItem.fecha_alta)
+    for dia, registros, u, v in db.query(dia_alta, func.count(InventarioItem.id), unidades, valor).group_by(dia_alta):
+        add((METRICA_INVENTARIO, "dia", _sql_day_key(dia)), registros, u, v)
+
+    for ubicacion_id, registros, u, v in db.query(InventarioItem.ubicacion_id, func.count(InventarioItem.id), unidades, valor).group_by(InventarioItem.ubicacion_id):
+        for ancestor_id in ubicacion_ancestors(db, ubicacion_id):
+            add((METRICA_INVENTARIO, "ubicacion", str(ancestor_id)), registros, u, v)
+
+    for estado, registros in db.query(OrdenTrabajo.estado, func.count(OrdenTrabajo.id)).group_by(OrdenTrabajo.estado):
+        add((METRICA_ORDENES, "estado", _clave(estado)), registros, 0, 0.0)
+        add((METRICA_ORDENES, DIMENSION_TOTAL, CLAVE_TOTAL), registros, 0, 0.0)
+
+    dia_creacion = func.date(OrdenTrabajo.fecha_creacion)
+    for dia, registros in db.query(dia_creacion, func.count(OrdenTrabajo.id)).group_by(dia_creacion):
+        add((METRICA_ORDENES, "dia", _sql_day_key(dia)), registros, 0, 0.0)
+
+    for ubicacion_id, registros in db.query(OrdenTrabajo.ubicacion_id, func.count(OrdenTrabajo.id)).group_by(OrdenTrabajo.ubicacion_id):
+        for ancestor_id in ubicacion_ancestors(db, ubicacion_id):
+            add((METRICA_ORDENES, "ubicacion", str(ancestor_id)), registros, 0, 0.0)
+
+    return {key: tuple(acc) for key, acc in totals.items()}
+
+def reconcile_agregados(db: Session, fix: bool = False) -> list[tuple]:
+    """
+    Compara los agregados guardados contra un recálculo completo.
+    Retorna las diferencias como (clave, guardado, recalculado); con fix=True reescribe la tabla
+    con el recálculo (y hace commit).
+    """
+    expected = compute_agregados(db)
+    stored = {
+        (row.metrica, row.dimension, row.clave): (row.registros, row.unidades, row.valor)
+        for row in db.query(Agregado)
+    }
+
+    differences = []
+    for key in sorted(set(expected) | set(stored)):
+        exp = expected.get(key, (0, 0, 0.0))
+        got = stored.get(key, (0, 0, 0.0))
+        if exp[0] != got[0] or exp[1] != got[1] or abs(exp[2] - got[2]) > TOLERANCIA_VALOR:
+            differences.append((key, got, exp))
+
+    if fix and differences:
+        db.execute(delete(Agregado))
+        db.execute(insert(Agregado), [
+            dict(metrica=m, dimension=d, clave=c, registros=r, unidades=u, valor=v)
+            for (m, d, c), (r, u, v) in expected.items()
+        ])
+        db.commit()
+    return differences
+
+def sync_agregados(db: Session):
+    """
+    Construye los agregados si la tabla está vacía pero ya hay datos (bases anteriores a los agregados).
+    """
+    if db.query(Agregado.metrica).first() is not None:
+        return
+    if db.query(InventarioItem.id).first() is None and db.query(OrdenTrabajo.id).first() is None:
+        return
+    reconcile_agregados(db, fix=True)
@@ -0,0 +1,207 @@
+# utils/analitica_ordenes.py
+
+from datetime import date, datetime
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from sqlalchemy import func, delete, insert
+from models import HechoOrdenDiario, OrdenTrabajo
+from utils.agregados import upsert_increment, upsert_increments, ubicacion_ancestors
+
+# Estados de una orden; los cerrados fijan fecha_cierre y cuentan como resolución
+ESTADOS_ORDEN = ["Pendiente", "En Progreso", "Completada", "Cancelada"]
+ESTADOS_CERRADOS = ("Completada", "Cancelada")
+
+# Intervalos del histograma de tiempo de resolución: (columna, etiqueta, límite superior en días)
+BUCKETS_RESOLUCION = [
+    ("resolucion_1d", "< 1 día", 1),
+    ("resolucion_3d", "1-3 días", 3),
+    ("resolucion_7d", "3-7 días", 7),
+    ("resolucion_30d", "7-30 días", 30),
+    ("resolucion_mas", "30+ días", None),
+]
+
+SIN_SITIO = 0
+
+def is_closed(estado: str) -> bool:
+    return estado in ESTADOS_CERRADOS
+
+def _sitio_id(db: Session, ubicacion_id: int) -> int:
+    chain = ubicacion_ancestors(db, ubicacion_id)
+    return chain[0] if chain else SIN_SITIO
+
+def _resolution_bucket(segundos: float) -> str:
+    dias = segundos / 86400
+    for column, _, limite in BUCKETS_RESOLUCION:
+        if limite is None or dias < limite:
+            return column
+    return BUCKETS_RESOLUCION[-1][0]
+
+def _closing_increments(orden: OrdenTrabajo, sign: int) -> dict:
+    segundos = max((orden.fecha_cierre - orden.fecha_creacion).total_seconds(), 0.0)
+    vencida = orden.fecha_limite is not None and orden.fecha_cierre > orden.fecha_limite
+    return {
+        "cerradas": sign,
+        "cerradas_vencidas": sign if vencida else 0,
+        "segundos_resolucion": sign * segundos,
+        _resolution_bucket(segundos): sign,
+    }
+
+def _fact_keys(db: Session, orden: OrdenTrabajo, fecha: datetime) -> dict:
+    return dict(dia=fecha.date(), criticidad=orden.criticidad, sitio_id=_sitio_id(db, orden.ubicacion_id))
+
+def record_orden_creada(db: Session, orden: OrdenTrabajo):
+    """
+    Suma una orden recién creada a los hechos de su día de creación. No hace commit.
+    """
+    upsert_increment(db, HechoOrdenDiario, _fact_keys(db, orden, orden.fecha_creacion), {"creadas": 1})
+
+def record_ordenes_creadas(db: Session, ordenes):
+    """
+    Suma un lote de órdenes recién creadas (ej: una campaña) con un upsert por (día, criticidad, sitio).
+    Acepta cualquier objeto con los atributos de OrdenTrabajo. No hace commit.
+    """
+    sitios = {}
+    creadas = defaultdict(int)
+    for orden in ordenes:
+        if orden.ubicacion_id not in sitios:
+            sitios[orden.ubicacion_id] = _sitio_id(db, orden.ubicacion_id)
+        creadas[(orden.fecha_creacion.date(), orden.criticidad, sitios[orden.ubicacion_id])] += 1
+    upsert_increments(db, HechoOrdenDiario, ("dia", "criticidad", "sitio_id"), [
+        dict(dia=dia, criticidad=criticidad, sitio_id=sitio_id, creadas=cantidad)
+        for (dia, criticidad, sitio_id), cantidad in sorted(creadas.items())
+    ])
+
+def record_orden_estado(db: Session, orden: OrdenTrabajo, old_estado: str, new_estado: str, cuando: datetime = None):
+    """
+    Actualiza fecha_cierre y los hechos diarios cuando una orden se cierra o se reabre.
+    Debe llamarse antes de hacer commit del cambio de estado. No hace commit.
+    """
+    if is_closed(old_estado) == is_closed(new_estado):
+        return
+    if is_closed(new_estado):
+        orden.fecha_cierre = cuando or datetime.utcnow()
+        upsert_increment(db, HechoOrdenDiario, _fact_keys(db, orden, orden.fecha_cierre), _closing_increments(orden, 1))
+    elif orden.fecha_cierre is not None:
+        # Reapertura: se descuenta el cierre del día en que se había registrado
+        upsert_increment(db, HechoOrdenDiario, _fact_keys(db, orden, orden.fecha_cierre), _closing_increments(orden, -1))
+        orden.fecha_cierre = None
+
+# --- CONSULTAS (solo sobre la tabla de hechos) ---
+
+def _facts_query(db: Session, columns, desde: date, hasta: date, criticidad: str = None, sitio_id: int = None):
+    query = db.query(*columns).filter(HechoOrdenDiario.dia >= desde, HechoOrdenDiario.dia <= hasta)
+    if criticidad:
+        query = query.filter(HechoOrdenDiario.criticidad == criticidad)
+    if sitio_id is not None:
+        query = query.filter(HechoOrdenDiario.sitio_id == sitio_id)
+    return query
+
+def get_throughput_por_dia(db: Session, desde: date, hasta: date, criticidad: str = None, sitio_id: int = None):
+    """
+    Órdenes creadas y cerradas por día en el rango [desde, hasta]. Retorna [(dia, creadas, cerradas)].
+    """
+    return _facts_query(
+        db, (HechoOrdenDiario.dia, func.sum(HechoOrdenDiario.creadas), func.sum(HechoOrdenDiario.cerradas)),
+        desde, hasta, criticidad, sitio_id
+    ).group_by(HechoOrdenDiario.dia).order_by(HechoOrdenDiario.dia).all()
+
+def get_histograma_resolucion(db: Session, desde: date, hasta: date, criticidad: str = None, sitio_id: int = None):
+    """
+    Histograma del tiempo de creación a cierre de las órdenes cerradas en el rango. Retorna [(etiqueta, cantidad)].
+    """
+    columns = [func.coalesce(func.sum(getattr(HechoOrdenDiario, column)), 0) for column, _, _ in BUCKETS_RESOLUCION]
+    row = _facts_query(db, columns, desde, hasta, criticidad, sitio_id).one()
+    return [(label, int(cantidad)) for (_, label, _), cantidad in zip(BUCKETS_RESOLUCION, row)]
+
+def get_resumen_vencimientos(db: Session, desde: date, hasta: date, por: str = "criticidad"):
+    """
+    Por criticidad o por sitio ('por'): creadas, cerradas, cerradas vencidas y horas promedio de resolución
+    en el rango. Retorna [(clave, creadas, cerradas, vencidas, horas_promedio)].
+    """
+    group_column = HechoOrdenDiario.criticidad if por == "criticidad" else HechoOrdenDiario.sitio_id
+    rows = _facts_query(db, (
+        group_column,
+        func.sum(HechoOrdenDiario.creadas),
+        func.sum(HechoOrdenDiario.cerradas),
+        func.sum(HechoOrdenDiario.cerradas_vencidas),
+        func.sum(HechoOrdenDiario.segundos_resolucion),
+    ), desde, hasta).group_by(group_column).order_by(group_column).all()
+    return [
+        (clave, int(creadas or 0), int(cerradas or 0), int(vencidas or 0),
+         (segundos / cerradas / 3600) if cerradas else None)
+        for clave, creadas, cerradas, vencidas, segundos in rows
+    ]
+
+def get_backlog_abierto(db: Session, antes_de: datetime = None):
+    """
+    Órdenes abiertas por estado creadas antes de 'antes_de' (todas si es None).
+    Usa el índice (estado, fecha_creacion) sin leer las filas de las órdenes.
+    """
+    query = db.query(OrdenTrabajo.estado, func.count()).filter(OrdenTrabajo.estado.notin_(ESTADOS_CERRADOS))
+    if antes_de is not None:
+        query = query.filter(OrdenTrabajo.fecha_creacion < antes_de)
+    return query.group_by(OrdenTrabajo.estado).all()
+
+# --- RECÁLCULO COMPLETO ---
+
+def compute_hechos(db: Session) -> dict:
+    """
+    Recalcula los hechos diarios desde las órdenes. Retorna {(dia, criticidad, sitio_id): {columna: valor}}.
+    """
+    hechos = defaultdict(lambda: defaultdict(float))
+    sitios = {}
+    query = db.query(OrdenTrabajo.fecha_creacion, OrdenTrabajo.fecha_cierre, OrdenTrabajo.fecha_limite,
+                     OrdenTrabajo.criticidad, OrdenTrabajo.ubicacion_id)
+    for orden in query.yield_per(10000):
+        if orden.ubicacion_id not in sitios:
+            sitios[orden.ubicacion_id] = _sitio_id(db, orden.ubicacion_id)
+        sitio_id = sitios[orden.ubicacion_id]
+        hechos[(orden.fecha_creacion.date(), orden.criticidad, sitio_id)]["creadas"] += 1
+        if orden.fecha_cierre is not None:
+            for column, delta in _closing_increments(orden, 1).items():
+                hechos[(orden.fecha_cierre.date(), orden.criticidad, sitio_id)][column] += delta
+    return hechos
+
+def rebuild_hechos(db: Session) -> int:
+    """
+    Reescribe la tabla de hechos con un recálculo completo (hace commit). Retorna la cantidad de filas.
+    """
+    hechos = compute_hechos(db)
+    db.execute(delete(HechoOrdenDiario))
+    if hechos:
+        db.execute(insert(HechoOrdenDiario), [
+            {"dia": dia, "criticidad": criticidad, "sitio_id": sitio_id, **_fact_defaults(), **values}
+            for (dia, criticidad, sitio_id), values in hechos.items()
+        ])
+    db.commit()
+    return len(hechos)
+
+def _fact_defaults() -> dict:
+    defaults = {"creadas": 0, "cerradas": 0, "cerradas_vencidas": 0, "segundos_resolucion": 0.0}
+    defaults.update({column: 0 for column, _, _ in BUCKETS_RESOLUCION})
+    return defaults
+
+def reconcile_hechos(db: Session) -> list[tuple]:
+    """
+    Compara la tabla de hechos contra un recálculo completo. Retorna [(clave, guardado, recalculado)].
+    """
+    expected = {key: {**_fact_defaults(), **values} for key, values in compute_hechos(db).items()}
+    stored = {}
+    for row in db.query(HechoOrdenDiario):
+        stored[(row.dia, row.criticidad, row.sitio_id)] = {column: getattr(row, column) for column in _fact_defaults()}
+
+    differences = []
+    for key in sorted(set(expected) | set(stored), key=str):
+        exp = expected.get(key, _fact_defaults())
+        got = stored.get(key, _fact_defaults())
+        if any(abs((exp[column] or 0) - (got[column] or 0)) > 0.5 for column in exp):
+            differences.append((key, got, exp))
+    return differences
+
+def sync_hechos(db: Session):
+    """
+    Construye los hechos si la tabla está vacía pero ya hay órdenes (bases anteriores a la analítica).
+    """
+    if db.query(HechoOrdenDiario.dia).first() is not None or db.query(OrdenTrabajo.id).first() is None:
+        return
+    rebuild_hechos(db)
@@ -0,0 +1,164 @@
+# utils/arbol_activos.py
+
+import sys
+import threading
+from array import array
+from sqlalchemy.orm import Session
+from models import Activo
+
+PATH_SEPARATOR = " > "
+
+class ArbolActivos:
+    """
+    Instantánea de solo lectura de la jerarquía de activos.
+    Guarda id, padre, nombre y tipo en arreglos compactos indexados por posición
+    y memoriza las rutas completas a medida que se resuelven.
+    """
+
+    def __init__(self, rows):
+        self._index = {}
+        self._ids = array('q')
+        self._parent = array('q')
+        self.nombres = []
+        self.tipos = []
+
+        parent_ids = []
+        for activo_id, parent_id, nombre, tipo in rows:
+            self._index[activo_id] = len(self._ids)
+            self._ids.append(activo_id)
+            parent_ids.append(parent_id)
+            self.nombres.append(nombre)
+            self.tipos.append(sys.intern(tipo) if tipo else tipo)
+
+        for parent_id in parent_ids:
+            self._parent.append(self._index.get(parent_id, -1) if parent_id is not None else -1)
+
+        self.max_id = max(self._ids) if self._ids else 0
+        self._paths = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, activo_id):
+        return activo_id in self._index
+
+    def parent_id(self, activo_id: int):
+        """
+        Retorna el ID del padre del activo, o None si es raíz o no existe.
+        """
+        pos = self._index.get(activo_id)
+        if pos is None or self._parent[pos] == -1:
+            return None
+        return self._ids[self._parent[pos]]
+
+    def nombre(self, activo_id: int):
+        pos = self._index.get(activo_id)
+        return self.nombres[pos] if pos is not None else None
+
+    def tipo(self, activo_id: int):
+        pos = self._index.get(activo_id)
+        return self.tipos[pos] if pos is not None else None
+
+    def ancestor_ids(self, activo_id: int) -> list[int]:
+        """
+        Retorna los IDs desde la raíz hasta el propio activo (inclusive), o [] si no existe.
+        """
+        pos = self._index.get(activo_id)
+        chain = []
+        while pos is not None and pos != -1 and len(chain) <= len(self._ids):
+            chain.append(self._ids[pos])
+            pos = self._parent[pos]
+        return chain[::-1]
+
+    def id_arrays(self):
+        """
+        Retorna (ids, posiciones de los padres) como arreglos compactos paralelos (-1 = raíz).
+        Son de solo lectura: la instantánea se comparte entre sesiones.
+        """
+        return self._ids, self._parent
+
+    def items(self):
+        """
+        Recorre (id, nombre, tipo) de todos los activos de la instantánea.
+        """
+        return zip(self._ids, self.nombres, self.tipos)
+
+    def path(self, activo_id: int):
+        """
+        Retorna la ruta completa del activo (ej: HSY > W > W03), o None si no existe.
+        Sube por los padres solo hasta el primer ancestro con ruta ya memorizada.
+        """
+        pos = self._index.get(activo_id)
+        if pos is None:
+            return None
+        return self._path_at(pos)
+
+    def paths_for(self, activo_ids) -> dict:
+        """
+        Resuelve en lote las rutas de varios activos. Retorna {id: ruta}; omite los IDs inexistentes.
+        """
+        paths = {}
+        for activo_id in activo_ids:
+            pos = self._index.get(activo_id)
+            if pos is not None:
+                paths[activo_id] = self._path_at(pos)
+        return paths
+
+    def _path_at(self, pos: int) -> str:
+        cached = self._paths.get(pos)
+        if cached is not None:
+            return cached
+
+        pending = []
+        prefix = None
+        while pos != -1 and len(pending) <= len(self._ids):
+            prefix = self._paths.get(pos)
+            if prefix is not None:
+                break
+            pending.append(pos)
+            pos = self._parent[pos]
+
+        for p in reversed(pending):
+            prefix = self.nombres[p] if prefix is None else f"{prefix}{PATH_SEPARATOR}{self.nombres[p]}"
+            self._paths[p] = prefix
+        return prefix
+
+
+# Instantánea compartida por todas las sesiones del proceso
+_arbol = None
+_arbol_lock = threading.Lock()
+
+def get_arbol_activos(db: Session) -> ArbolActivos:
+    """
+    Obtiene la instantánea del árbol de activos del proceso, cargándola con una sola consulta si no existe.
+    """
+    global _arbol
+    arbol = _arbol
+    if arbol is None:
+        with _arbol_lock:
+            if _arbol is None:
+                rows = db.query(Activo.id, Activo.parent_id, Activo.nombre, Activo.tipo).all()
+                _arbol = ArbolActivos(rows)
+            arbol = _arbol
+    return arbol
+
+def invalidate_arbol_activos():
+    """
+    Descarta la instantánea actual; la siguiente lectura la vuelve a cargar.
+    """
+    global _arbol
+    with _arbol_lock:
+        _arbol = None
+
+def paths_for(db: Session, activo_ids) -> dict:
+    """
+    Resuelve en lote las rutas completas de varios activos usando la instantánea del proceso.
+    Si falta algún ID posterior a la instantánea (creado en otro proceso), la recarga una vez.
+    """
+    activo_ids = [activo_id for activo_id in set(activo_ids) if activo_id is not None]
+    arbol = get_arbol_activos(db)
+    paths = arbol.paths_for(activo_ids)
+    if any(activo_id not in paths and activo_id > arbol.max_id for activo_id in activo_ids):
+        invalidate_arbol_activos()
+        paths = get_arbol_activos(db).paths_for(activo_ids)
+    return paths
@@ -1,5 +1,15 @@
 # utils/auth.py
 
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
 # Comentar o eliminar esta línea si ya se importa en database.py y se accede globalmente
@@ -19,3 +29,137 @@ def get_user_by_username(db: Session, username: str):
     return db.query(Usuario).filter(Usuario.nombre_usuario == username).first()
 
 # La función create_admin_user fue movida a utils/database.py
+
+# --- SERVICIO DE LOGIN ---
+
+# Verificaciones bcrypt simultáneas como máximo (el resto espera en cola sin ocupar CPU)
+LOGIN_WORKERS = int(os.environ.get("LOGIN_WORKERS", str(min(4, os.cpu_count() or 1))))
+LOGIN_TIMEOUT = float(os.environ.get("LOGIN_TIMEOUT", "30"))
+
+# Vigencia del token de sesión y clave de firma. Sin SESSION_SECRET la clave es aleatoria por proceso:
+# los tokens dejan de valer al reiniciar y no sirven entre réplicas.
+# El token viaja en la URL (?sesion=), así que puede quedar en el historial del navegador, en enlaces
+# copiados o en logs de proxies. Por eso vence pronto y se renueva mientras la sesión se usa (ver
+# renew_session_token), y deja de valer al cerrar sesión (ver usuarios.sesion_version) o si el usuario se desactiva.
+SESSION_TOKEN_TTL = int(os.environ.get("SESSION_TOKEN_TTL", str(30 * 60)))
+SESSION_SECRET = os.environ.get("SESSION_SECRET", "").encode() or secrets.token_bytes(32)
+
+_login_executor = None
+_login_executor_lock = threading.Lock()
+_dummy_hash = None
+
+def _get_login_executor() -> ThreadPoolExecutor:
+    global _login_executor
+    if _login_executor is None:
+        with _login_executor_lock:
+            if _login_executor is None:
+                _login_executor = ThreadPoolExecutor(max_workers=LOGIN_WORKERS, thread_name_prefix="login")
+    return _login_executor
+
+def _get_dummy_hash() -> str:
+    # Hash de referencia para usuarios inexistentes: la respuesta tarda lo mismo que con uno real
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = get_password_hash(secrets.token_hex(16))
+    return _dummy_hash
+
+def authenticate(db: Session, username: str, password: str):
+    """
+    Busca el usuario en el hilo del llamador (la sesión de base de datos no se comparte entre hilos)
+    y verifica la contraseña en el pool acotado de login. Retorna el usuario o None.
+    Lanza concurrent.futures.TimeoutError si la verificación no termina en LOGIN_TIMEOUT segundos.
+    """
+    user = get_user_by_username(db, username)
+    if user is not None and user.is_activo is False:
+        user = None # Desactivado: se verifica igual contra el hash de referencia (mismo tiempo de respuesta)
+    password_hash = user.password_hash if user else _get_dummy_hash()
+    future = _get_login_executor().submit(verify_password, password or "", password_hash)
+    try:
+        verified = future.result(timeout=LOGIN_TIMEOUT)
+    except FuturesTimeoutError:
+        future.cancel() # Si sigue en cola, no ocupa el pool cuando ya nadie espera la respuesta
+        raise
+    if verified and user:
+        return user
+    return None
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SESSION_SECRET, payload.encode(), hashlib.sha256).digest())
+
+def issue_session_token(user: Usuario, ttl: int = None) -> str:
+    """
+    Token firmado (HMAC-SHA256) con el ID del usuario, la versión de sus tokens y el vencimiento.
+    """
+    payload = _b64encode(json.dumps({
+        "uid": user.id, "ver": user.sesion_version or 0,
+        "exp": int(time.time()) + (ttl or SESSION_TOKEN_TTL),
+    }, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+def _decode_session_token(token: str):
+    # Firma y vencimiento, sin consultas. Retorna el contenido del token o None.
+    if not token or token.count(".") != 1:
+        return None
+    payload, signature = token.split(".")
+    # Se comparan bytes: compare_digest rechaza str con caracteres no ASCII (enlaces alterados)
+    if not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+        return None
+    try:
+        data = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("exp", 0) < time.time():
+        return None
+    return data
+
+def _session_user(db: Session, data: dict):
+    # El usuario del token si sigue activo y no revocó sus tokens desde que se emitió
+    user = db.get(Usuario, data.get("uid"))
+    if user is None or user.is_activo is False or (user.sesion_version or 0) != data.get("ver"):
+        return None
+    return user
+
+def _sesion(user: Usuario) -> dict:
+    return {"user_id": user.id, "username": user.nombre_usuario, "user_role": user.rol}
+
+def validate_session_token(db: Session, token: str):
+    """
+    Valida firma y vencimiento (sin bcrypt) y, con una consulta por clave primaria, que el usuario siga
+    activo y no haya cerrado sesión desde que se emitió el token.
+    Retorna {'user_id', 'username', 'user_role'} con los datos actuales del usuario, o None.
+    """
+    data = _decode_session_token(token)
+    user = _session_user(db, data) if data else None
+    return _sesion(user) if user else None
+
+def renew_session_token(db: Session, token: str) -> tuple:
+    """
+    Renovación deslizante en cada rerun: mientras al token le quede más de la mitad de su vigencia se
+    conserva sin consultas; en la segunda mitad se emite uno nuevo si el usuario sigue activo y no revocó
+    sus tokens. Una sesión sin uso durante SESSION_TOKEN_TTL vence.
+    Retorna (token, sesion): el token vigente (None si venció o fue revocado) y, si se consultó al usuario,
+    sus datos actuales como validate_session_token (None si no hizo falta consultar).
+    """
+    data = _decode_session_token(token)
+    if data is None:
+        return None, None
+    if data["exp"] - time.time() > SESSION_TOKEN_TTL / 2:
+        return token, None
+    user = _session_user(db, data)
+    if user is None:
+        return None, None
+    return issue_session_token(user), _sesion(user)
+
+def revoke_session_tokens(db: Session, user_id: int):
+    """
+    Invalida todos los tokens de sesión emitidos para el usuario (en todos sus navegadores) y hace commit.
+    """
+    db.execute(update(Usuario).where(Usuario.id == user_id)
+               .values(sesion_version=Usuario.sesion_version + 1).execution_options(synchronize_session=False))
+    db.commit()
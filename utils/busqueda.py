@@ -0,0 +1,285 @@
+# utils/busqueda.py
+
+import time
+import threading
+from bisect import bisect_left, bisect_right
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, case, func
+from models import Activo, InventarioItem
+
+# Entidad -> (modelo, columnas buscables en orden de relevancia)
+CAMPOS_BUSQUEDA = {
+    "activos": (Activo, (Activo.nombre, Activo.descripcion)),
+    "inventario": (InventarioItem, (InventarioItem.numero_item, InventarioItem.numero_serie, InventarioItem.descripcion_breve)),
+}
+
+NGRAM_SIZE = 3
+DEFAULT_SEARCH_LIMIT = 20
+# Segundos antes de reconstruir el índice en memoria (recoge altas hechas desde otros procesos)
+INDICE_TTL_SEGUNDOS = 300
+# Por encima de esta cantidad de coincidencias, el filtro del listado usa ILIKE en lugar de IN (...)
+MAX_IDS_FILTRO = 5000
+
+def _uses_trigram_indexes(db) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+def _like_pattern(texto: str) -> str:
+    escaped = texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def _ngrams(texto: str):
+    return {texto[i:i + NGRAM_SIZE] for i in range(len(texto) - NGRAM_SIZE + 1)}
+
+def _rank(campos, texto: str):
+    """
+    Clave de orden de un documento para 'texto' (ya en minúsculas), o None si no coincide:
+    coincidencia exacta < prefijo < contenida; a igualdad, el campo más relevante y el texto más corto primero.
+    """
+    best = None
+    for field_pos, valor in enumerate(campos):
+        pos = valor.find(texto)
+        if pos == -1:
+            continue
+        kind = 0 if len(valor) == len(texto) else (1 if pos == 0 else 2)
+        key = (kind, field_pos, len(valor))
+        if best is None or key < best:
+            best = key
+    return best
+
+class IndiceNgramas:
+    """
+    Índice invertido de trigramas en memoria (respaldo de pg_trgm para SQLite y otros motores).
+    Cada trigrama apunta a un arreglo ordenado de posiciones de documento; una búsqueda intersecta
+    los arreglos de los trigramas del texto y verifica la subcadena solo en los candidatos.
+    Los documentos se numeran por largo del primer campo y cada campo tiene además una lista ordenada
+    para resolver exactas y prefijos con bisect, así que una búsqueda con límite recorre los niveles
+    de relevancia en orden y se detiene al completarlo, aunque el texto aparezca en miles de filas.
+    """
+
+    def __init__(self, rows):
+        docs = [(row[0], tuple((valor or "").lower() for valor in row[1:])) for row in rows]
+        docs.sort(key=lambda doc: len(doc[1][0]) if doc[1] else 0)
+
+        self._ids = np.array([doc_id for doc_id, _ in docs], dtype=np.int64)
+        self._textos = [campos for _, campos in docs]
+        num_fields = len(self._textos[0]) if self._textos else 0
+        self._lengths = [np.array([len(campos[f]) for campos in self._textos], dtype=np.int32) for f in range(num_fields)]
+
+        # Por campo: valores ordenados y posiciones de sus documentos (búsqueda de exactas y prefijos)
+        self._sorted_values = []
+        self._sorted_positions = []
+        for f in range(num_fields):
+            order = sorted(range(len(self._textos)), key=lambda pos: self._textos[pos][f])
+            self._sorted_values.append([self._textos[pos][f] for pos in order])
+            self._sorted_positions.append(np.array(order, dtype=np.int32))
+
+        postings = {}
+        for pos, campos in enumerate(self._textos):
+            grams = set()
+            for valor in campos:
+                grams |= _ngrams(valor)
+            for gram in grams:
+                postings.setdefault(gram, []).append(pos)
+        self._postings = {gram: np.array(positions, dtype=np.int32) for gram, positions in postings.items()}
+
+        # Altas posteriores a la construcción (se recorren linealmente hasta la próxima reconstrucción)
+        self._extra = []
+        self.creado = time.monotonic()
+
+    def __len__(self):
+        return len(self._ids) + len(self._extra)
+
+    def add(self, doc_id: int, *campos):
+        self._extra.append((doc_id, tuple((valor or "").lower() for valor in campos)))
+
+    def _candidates(self, texto: str):
+        grams = _ngrams(texto)
+        if not grams:
+            # Textos más cortos que un trigrama: se revisan todos los documentos
+            return np.arange(len(self._ids), dtype=np.int32)
+        lists = []
+        for gram in grams:
+            positions = self._postings.get(gram)
+            if positions is None:
+                return np.empty(0, dtype=np.int32)
+            lists.append(positions)
+        lists.sort(key=len)
+        result = lists[0]
+        for positions in lists[1:]:
+            result = np.intersect1d(result, positions, assume_unique=True)
+            if not len(result):
+                break
+        return result
+
+    def _prefix_positions(self, field_pos: int, texto: str, exact: bool):
+        values = self._sorted_values[field_pos]
+        lo = bisect_left(values, texto)
+        hi = bisect_right(values, texto) if exact else bisect_left(values, texto + "\uffff")
+        if exact:
+            positions = self._sorted_positions[field_pos][lo:hi]
+        else:
+            positions = self._sorted_positions[field_pos][bisect_right(values, texto, lo, hi):hi]
+            positions = positions[np.argsort(self._lengths[field_pos][positions], kind="stable")]
+        return positions
+
+    def _ranked_positions(self, texto: str):
+        """
+        Genera las posiciones que coinciden con 'texto', de la más a la menos relevante (puede repetirlas).
+        """
+        num_fields = len(self._sorted_values)
+        for field_pos in range(num_fields):
+            yield from self._prefix_positions(field_pos, texto, exact=True).tolist()
+        for field_pos in range(num_fields):
+            yield from self._prefix_positions(field_pos, texto, exact=False).tolist()
+
+        candidates = self._candidates(texto)
+        # Los candidatos están en orden de largo del primer campo: no hace falta ordenarlos
+        for pos in candidates.tolist():
+            valor = self._textos[pos][0]
+            if valor.find(texto) > 0:
+                yield pos
+        for field_pos in range(1, num_fields):
+            lengths = self._lengths[field_pos][candidates]
+            for pos in candidates[np.argsort(lengths, kind="stable")].tolist():
+                if self._textos[pos][field_pos].find(texto) > 0:
+                    yield pos
+
+    def search(self, texto: str, limit: int = None) -> list[int]:
+        """
+        Retorna los IDs que contienen 'texto' en alguno de sus campos, del más al menos relevante.
+        """
+        texto = (texto or "").strip().lower()
+        if not texto:
+            return []
+
+        # Altas recientes: pocas, se puntúan aparte y se intercalan por clave de relevancia
+        extra = sorted((key, doc_id) for doc_id, campos in self._extra
+                       if (key := _rank(campos, texto)) is not None)
+
+        results = []
+        seen = set()
+        needed = None if limit is None else limit + len(extra)
+        for pos in self._ranked_positions(texto):
+            if pos in seen:
+                continue
+            seen.add(pos)
+            results.append(pos)
+            if needed is not None and len(results) >= needed:
+                break
+
+        ranked = [(_rank(self._textos[pos], texto), int(self._ids[pos])) for pos in results]
+        if extra:
+            ranked = sorted(ranked + extra, key=lambda item: item[0])
+        ids = [doc_id for _, doc_id in ranked]
+        return ids if limit is None else ids[:limit]
+
+
+# Índices compartidos por todas las sesiones del proceso, uno por entidad
+_indices = {}
+_indices_lock = threading.Lock()
+
+def get_search_index(db: Session, entidad: str) -> IndiceNgramas:
+    """
+    Obtiene el índice en memoria de la entidad, construyéndolo con una sola consulta
+    si no existe o si superó INDICE_TTL_SEGUNDOS.
+    """
+    indice = _indices.get(entidad)
+    if indice is None or time.monotonic() - indice.creado > INDICE_TTL_SEGUNDOS:
+        with _indices_lock:
+            indice = _indices.get(entidad)
+            if indice is None or time.monotonic() - indice.creado > INDICE_TTL_SEGUNDOS:
+                model, columns = CAMPOS_BUSQUEDA[entidad]
+                indice = IndiceNgramas(db.query(model.id, *columns).yield_per(50000))
+                _indices[entidad] = indice
+    return indice
+
+def register_in_search_index(entidad: str, doc_id: int, *campos):
+    """
+    Agrega un alta al índice en memoria de la entidad, si ya está construido.
+    """
+    indice = _indices.get(entidad)
+    if indice is not None:
+        indice.add(doc_id, *campos)
+
+def invalidate_search_index(entidad: str = None):
+    """
+    Descarta el índice de una entidad (o todos); la siguiente búsqueda lo reconstruye.
+    """
+    with _indices_lock:
+        if entidad is None:
+            _indices.clear()
+        else:
+            _indices.pop(entidad, None)
+
+def _match_condition(columns, texto: str):
+    pattern = _like_pattern(texto)
+    return or_(*[column.ilike(pattern, escape="\\") for column in columns])
+
+def _rank_order(columns, texto: str):
+    texto = texto.lower()
+    kind = case(
+        *[(func.lower(column) == texto, 0) for column in columns],
+        *[(func.lower(column).startswith(texto, autoescape=True), 1) for column in columns],
+        else_=2
+    )
+    similarity = func.greatest(*[func.similarity(column, texto) for column in columns])
+    return [kind, similarity.desc()]
+
+def search_condition(db: Session, entidad: str, texto: str):
+    """
+    Condición SQL "contiene 'texto' en alguno de los campos buscables", para combinar con otros filtros.
+    En PostgreSQL es un ILIKE servido por los índices de trigramas; en otros motores usa los IDs
+    del índice en memoria (o ILIKE si coinciden demasiados).
+    """
+    model, columns = CAMPOS_BUSQUEDA[entidad]
+    texto = texto.strip()
+    if _uses_trigram_indexes(db):
+        return _match_condition(columns, texto)
+    ids = get_search_index(db, entidad).search(texto)
+    if len(ids) > MAX_IDS_FILTRO:
+        return _match_condition(columns, texto)
+    return model.id.in_(ids)
+
+def _search(db: Session, entidad: str, texto: str, limit: int, filters=()):
+    model, columns = CAMPOS_BUSQUEDA[entidad]
+    texto = (texto or "").strip()
+    if not texto:
+        return []
+
+    if _uses_trigram_indexes(db):
+        return (db.query(model)
+                .filter(_match_condition(columns, texto), *filters)
+                .order_by(*_rank_order(columns, texto), model.id)
+                .limit(limit).all())
+
+    ranked_ids = get_search_index(db, entidad).search(texto, None if filters else limit)
+    results = []
+    # Con filtros adicionales se consultan los candidatos por bloques, en orden de relevancia
+    block_size = max(limit * 5, 100)
+    for start in range(0, len(ranked_ids), block_size):
+        block = ranked_ids[start:start + block_size]
+        found = {obj.id: obj for obj in db.query(model).filter(model.id.in_(block), *filters)}
+        results.extend(found[doc_id] for doc_id in block if doc_id in found)
+        if len(results) >= limit:
+            break
+    return results[:limit]
+
+def search_activos(db: Session, texto: str, limit: int = DEFAULT_SEARCH_LIMIT,
+                   parent_id: int = None, activo_type: str = None) -> list[Activo]:
+    """
+    Busca activos cuyo nombre o descripción contenga el texto (ej: un tag como W03-R12-M145),
+    ordenados por relevancia. Opcionalmente filtra por padre y/o tipo.
+    """
+    filters = []
+    if parent_id is not None:
+        filters.append(Activo.parent_id == parent_id)
+    if activo_type:
+        filters.append(Activo.tipo == activo_type)
+    return _search(db, "activos", texto, limit, filters)
+
+def search_inventory_items(db: Session, texto: str, limit: int = DEFAULT_SEARCH_LIMIT) -> list[InventarioItem]:
+    """
+    Busca ítems de inventario por número de item, número de serie o descripción breve, ordenados por relevancia.
+    """
+    return _search(db, "inventario", texto, limit)
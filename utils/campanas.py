@@ -0,0 +1,104 @@
+# utils/campanas.py
+
+import uuid
+from datetime import datetime
+from collections import namedtuple
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session, aliased
+from models import Activo, OrdenTrabajo
+from utils.secuencias import reserve_block
+from utils.jerarquia import subtree_condition
+from utils.arbol_activos import get_arbol_activos
+from utils.ordenes_trabajo import FilaOrden, resolve_items_orden, insert_ordenes
+
+# Órdenes insertadas por transacción (sus ítems van en la misma)
+CAMPANA_CHUNK_SIZE = 2000
+
+# 'omitidas': activos que ya tenían su orden de esta campaña (reintento); 'clave': la clave de la campaña
+ResultadoCampana = namedtuple("ResultadoCampana", ["ordenes", "items", "primer_numero", "ultimo_numero", "omitidas", "clave"])
+
+def get_campaign_target_types(db: Session, root_id: int) -> list[tuple]:
+    """
+    Tipos de activo del subárbol de 'root_id' con el tipo de su padre (ej: ('Equipo', 'Familia Minero')),
+    para elegir el objetivo de una campaña. Retorna [(tipo, tipo_padre, cantidad)] con una sola consulta.
+    """
+    padre = aliased(Activo)
+    query = (select(Activo.tipo, padre.tipo, func.count())
+             .select_from(Activo).outerjoin(padre, Activo.parent_id == padre.id)
+             .where(subtree_condition(db, Activo.id, root_id), Activo.id != root_id)
+             .group_by(Activo.tipo, padre.tipo).order_by(Activo.tipo, padre.tipo))
+    return [tuple(row) for row in db.execute(query).all()]
+
+def get_campaign_targets(db: Session, root_id: int, tipo: str, tipo_padre: str = None) -> list[int]:
+    """
+    IDs de los activos del subárbol de 'root_id' con el tipo indicado (y, opcionalmente, cuyo padre
+    tenga 'tipo_padre'), en una sola consulta sobre la ruta materializada.
+    """
+    padre = aliased(Activo)
+    query = (select(Activo.id).select_from(Activo).outerjoin(padre, Activo.parent_id == padre.id)
+             .where(subtree_condition(db, Activo.id, root_id), Activo.tipo == tipo))
+    if tipo_padre:
+        query = query.where(padre.tipo == tipo_padre)
+    return list(db.execute(query.order_by(Activo.id)).scalars())
+
+def create_campaign(
+    db: Session,
+    root_id: int,
+    tipo: str,
+    titulo: str,
+    descripcion: str,
+    criticidad: str,
+    fecha_limite: datetime,
+    generado_por_id: int,
+    tipo_padre: str = None,
+    asignado_a_id: int = None,
+    items_orden: list = None,
+    chunk_size: int = CAMPANA_CHUNK_SIZE,
+    progreso=None,
+    clave: str = None
+) -> ResultadoCampana:
+    """
+    Crea una orden "Pendiente" por cada activo del subárbol de 'root_id' con el tipo indicado
+    (ej: limpieza de filtros de todos los mineros de un contenedor). El título de cada orden
+    lleva el tag del activo. Los ítems de 'items_orden' se añaden a todas las órdenes.
+    Los números de orden se reservan en un solo bloque y las órdenes se insertan por lotes de
+    'chunk_size' con insert_ordenes, un commit por lote.
+    Cada orden guarda la 'clave' de la campaña (una nueva si no se indica). Si un lote falla, los anteriores
+    quedan confirmados: reintentar con la misma clave crea solo las órdenes que faltan, sin duplicar.
+    Dos ejecuciones simultáneas con la misma clave sí podrían duplicar; el llamador las serializa
+    (ej: el planificador toma el período antes de crear la campaña).
+    'progreso' (opcional) recibe (creadas, total) después de cada lote.
+    """
+    clave = clave or uuid.uuid4().hex
+    items = resolve_items_orden(db, items_orden or [])
+    targets = get_campaign_targets(db, root_id, tipo, tipo_padre)
+    con_orden = set(db.execute(
+        select(OrdenTrabajo.ubicacion_id).where(OrdenTrabajo.campana == clave)
+    ).scalars()) if targets else set()
+    pendientes = [activo_id for activo_id in targets if activo_id not in con_orden]
+    omitidas, targets = len(targets) - len(pendientes), pendientes
+    if not targets:
+        return ResultadoCampana(0, 0, None, None, omitidas, clave)
+    arbol = get_arbol_activos(db) # Tags para los títulos, sin otra consulta
+
+    numeros = reserve_block(db, "numero_orden", len(targets))
+    db.commit() # Los números quedan reservados aunque falle un lote posterior
+    ahora = datetime.utcnow()
+    creadas = total_items = 0
+    for start in range(0, len(targets), chunk_size):
+        ordenes = [
+            FilaOrden(str(numero), f"{titulo} - {arbol.nombre(activo_id) or activo_id}", descripcion, "Pendiente",
+                      criticidad, ahora, ahora, fecha_limite, activo_id, generado_por_id, asignado_a_id, clave)
+            for numero, activo_id in zip(numeros[start:start + chunk_size], targets[start:start + chunk_size])
+        ]
+        try:
+            total_items += insert_ordenes(db, ordenes, items)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        creadas += len(ordenes)
+        if progreso:
+            progreso(creadas, len(targets))
+
+    return ResultadoCampana(creadas, total_items, numeros[0], numeros[-1], omitidas, clave)
@@ -0,0 +1,101 @@
+# utils/carga_masiva.py
+
+import csv
+import io
+from sqlalchemy import exc, func, select, text
+
+# Filas acumuladas antes de volcar un lote a la base de datos
+DEFAULT_CHUNK_SIZE = 10000
+
+# Marcador de NULL para COPY en formato CSV (distingue NULL de cadena vacía)
+COPY_NULL_MARKER = "\\N"
+
+def insert_rows(conn, table, columns, rows) -> int:
+    """
+    Inserta una lista de tuplas (en el orden de 'columns') en 'table' con la vía más rápida del motor:
+    COPY ... FROM STDIN en PostgreSQL (psycopg2) y executemany en el resto.
+    Usa la transacción abierta en 'conn' (Connection de SQLAlchemy); no hace commit.
+    Los errores del driver se lanzan como las excepciones de SQLAlchemy (IntegrityError, etc.),
+    igual que con conn.execute.
+    """
+    if not rows:
+        return 0
+
+    column_list = ", ".join(columns)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if conn.dialect.name == "postgresql" and hasattr(cursor, "copy_expert"):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow([COPY_NULL_MARKER if value is None else value for value in row])
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY {table.name} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL_MARKER}')",
+                buffer
+            )
+        elif conn.dialect.paramstyle in ("qmark", "format", "pyformat"):
+            placeholder = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+            placeholders = ", ".join([placeholder] * len(columns))
+            cursor.executemany(f"INSERT INTO {table.name} ({column_list}) VALUES ({placeholders})", rows)
+        else:
+            conn.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+    except conn.dialect.dbapi.Error as e:
+        raise exc.DBAPIError.instance(None, None, e, conn.dialect.dbapi.Error, dialect=conn.dialect) from e
+    finally:
+        cursor.close()
+    return len(rows)
+
+def next_free_id(conn, table) -> int:
+    """
+    Retorna el primer ID libre de la tabla (MAX(id) + 1) para asignar IDs desde el cliente.
+    """
+    max_id = conn.execute(select(func.max(table.c.id))).scalar()
+    return (max_id or 0) + 1
+
+def sync_id_sequence(conn, table):
+    """
+    Tras insertar IDs asignados por el cliente, alinea la secuencia SERIAL de PostgreSQL con MAX(id).
+    En SQLite no hace falta: el siguiente rowid ya es MAX(id) + 1.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+        f"COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+    ))
+
+
+class BulkWriter:
+    """
+    Acumula filas de varias tablas y las vuelca por lotes con insert_rows.
+    Las tablas se vuelcan siempre en el orden en que se declararon, de modo que
+    las filas padre (ej: activos) llegan antes que las que las referencian (ej: clausura).
+    """
+
+    def __init__(self, conn, tables, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        # tables: lista de (Table, [columnas])
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self._tables = tables
+        self._buffers = {table.name: [] for table, _ in tables}
+        self._pending = 0
+        self.counts = {table.name: 0 for table, _ in tables}
+
+    def add(self, table, row):
+        self._buffers[table.name].append(row)
+        self._pending += 1
+        if self._pending >= self.chunk_size:
+            self.flush()
+
+    def extend(self, table, rows):
+        for row in rows:
+            self.add(table, row)
+
+    def flush(self):
+        for table, columns in self._tables:
+            buffer = self._buffers[table.name]
+            if buffer:
+                self.counts[table.name] += insert_rows(self.conn, table, columns, buffer)
+                self._buffers[table.name] = []
+        self._pending = 0
@@ -0,0 +1,215 @@
+# utils/exportacion.py
+
+import os
+import re
+import shutil
+import zipfile
+from datetime import datetime
+from collections import OrderedDict, namedtuple
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select, Integer, Float, DateTime
+from sqlalchemy.orm import Session
+from models import InventarioItem, OrdenTrabajo, ItemOrden, Activo
+from utils.arbol_activos import get_arbol_activos
+
+# Carpeta de las exportaciones en el servidor (una subcarpeta y un .zip por exportación)
+EXPORT_DIR = os.environ.get("EXPORT_DIR", "exportaciones")
+# Exportaciones anteriores que se conservan en EXPORT_DIR
+EXPORT_KEEP = int(os.environ.get("EXPORT_KEEP", "5"))
+
+# Filas leídas por lote del cursor del servidor: la memoria de la exportación depende solo de este valor
+DEFAULT_CHUNK_SIZE = 50000
+# Archivos Parquet abiertos a la vez; al superarlo se cierra el menos usado y su partición sigue en otro archivo
+MAX_OPEN_WRITERS = 64
+
+SIN_SITIO = "sin-sitio"
+SIN_FECHA = "sin-fecha"
+
+# Qué exportar de cada tabla:
+# - statement: SELECT con las columnas exportadas, en el orden del esquema
+# - ubicacion / fecha: columnas que definen la partición sitio=.../mes=... (sin fecha: solo sitio)
+# - ruta: nombre de la columna añadida con la ruta completa de la ubicación
+EntidadExportacion = namedtuple("EntidadExportacion", ["nombre", "statement", "ubicacion", "fecha", "ruta"])
+
+def _entidades():
+    return [
+        EntidadExportacion(
+            "inventario_items",
+            select(InventarioItem.id, InventarioItem.numero_item, InventarioItem.tipo_item, InventarioItem.numero_serie,
+                   InventarioItem.descripcion_breve, InventarioItem.estado_funcionamiento, InventarioItem.fecha_alta,
+                   InventarioItem.cantidad, InventarioItem.precio_estimado_usd, InventarioItem.dado_de_alta_por_id,
+                   InventarioItem.ubicacion_id, InventarioItem.producto_asociado_id).order_by(InventarioItem.id),
+            "ubicacion_id", "fecha_alta", "ruta_ubicacion"
+        ),
+        EntidadExportacion(
+            "ordenes_trabajo",
+            select(OrdenTrabajo.id, OrdenTrabajo.numero_orden, OrdenTrabajo.titulo, OrdenTrabajo.descripcion,
+                   OrdenTrabajo.estado, OrdenTrabajo.criticidad, OrdenTrabajo.fecha_creacion, OrdenTrabajo.fecha_limite,
+                   OrdenTrabajo.fecha_cierre, OrdenTrabajo.ubicacion_id, OrdenTrabajo.generado_por_id,
+                   OrdenTrabajo.asignado_a_id).order_by(OrdenTrabajo.id),
+            "ubicacion_id", "fecha_creacion", "ruta_ubicacion"
+        ),
+        EntidadExportacion(
+            # Los ítems de una orden se particionan con la ubicación y la fecha de su orden
+            "items_orden",
+            select(ItemOrden.id, ItemOrden.orden_id, ItemOrden.producto_id, ItemOrden.nombre_item, ItemOrden.cantidad,
+                   ItemOrden.precio_unitario_actual, OrdenTrabajo.ubicacion_id, OrdenTrabajo.fecha_creacion)
+            .join(OrdenTrabajo, ItemOrden.orden_id == OrdenTrabajo.id).order_by(ItemOrden.id),
+            "ubicacion_id", "fecha_creacion", "ruta_ubicacion"
+        ),
+        EntidadExportacion(
+            "activos",
+            select(Activo.id, Activo.nombre, Activo.tipo, Activo.descripcion, Activo.parent_id).order_by(Activo.id),
+            "id", None, "ruta"
+        ),
+    ]
+
+ENTIDADES = [entidad.nombre for entidad in _entidades()]
+
+def _partition_value(value: str) -> str:
+    # Valor seguro como nombre de carpeta en el formato clave=valor
+    return re.sub(r"[\\/=:*?\"<>|\s]+", "_", value).strip("_") or SIN_SITIO
+
+def _arrow_schema(statement, ruta: str) -> pa.Schema:
+    # Tipos fijos desde las columnas del modelo: un lote con una columna toda NULL no cambia el esquema
+    fields = []
+    for column in statement.selected_columns:
+        if isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    fields.append(pa.field(ruta, pa.string()))
+    return pa.schema(fields)
+
+class _EscritorParticionado:
+    """
+    Escribe una entidad como dataset Parquet particionado (entidad/sitio=X/mes=YYYY-MM/part-N.parquet),
+    con un ParquetWriter por partición y como mucho MAX_OPEN_WRITERS abiertos.
+    """
+
+    def __init__(self, base_dir: str, schema: pa.Schema, max_open: int = MAX_OPEN_WRITERS):
+        self.base_dir = base_dir
+        self.schema = schema
+        self.max_open = max_open
+        self._writers = OrderedDict()
+        self._parts = {}
+        self.files = 0
+
+    def write(self, key: tuple, table: pa.Table):
+        writer = self._writers.get(key)
+        if writer is None:
+            if len(self._writers) >= self.max_open:
+                _, oldest = self._writers.popitem(last=False)
+                oldest.close()
+            part = self._parts.get(key, 0)
+            self._parts[key] = part + 1
+            directory = os.path.join(self.base_dir, *[f"{name}={value}" for name, value in key])
+            os.makedirs(directory, exist_ok=True)
+            writer = pq.ParquetWriter(os.path.join(directory, f"part-{part:04d}.parquet"), self.schema, compression="zstd")
+            self._writers[key] = writer
+            self.files += 1
+        else:
+            self._writers.move_to_end(key)
+        writer.write_table(table)
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+def export_entidad(db: Session, entidad: EntidadExportacion, base_dir: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> tuple:
+    """
+    Exporta una entidad leyendo en lotes de 'chunk_size' filas con un cursor del servidor (yield_per)
+    y añadiendo la ruta completa de la ubicación. Retorna (filas, archivos).
+    """
+    arbol = get_arbol_activos(db)
+    resueltas = {} # ubicacion_id -> (sitio, ruta), acotado por la cantidad de activos
+
+    def resolve(ubicacion_id):
+        resolved = resueltas.get(ubicacion_id)
+        if resolved is None:
+            chain = arbol.ancestor_ids(ubicacion_id)
+            sitio = _partition_value(arbol.nombre(chain[0])) if chain else SIN_SITIO
+            resolved = resueltas[ubicacion_id] = (sitio, arbol.path(ubicacion_id))
+        return resolved
+
+    result = db.execute(entidad.statement.execution_options(yield_per=chunk_size))
+    columns = list(result.keys())
+    ubicacion_pos = columns.index(entidad.ubicacion)
+    fecha_pos = columns.index(entidad.fecha) if entidad.fecha else None
+
+    escritor = _EscritorParticionado(os.path.join(base_dir, entidad.nombre), _arrow_schema(entidad.statement, entidad.ruta))
+    total = 0
+    try:
+        for rows in result.partitions():
+            data = {name: [row[i] for row in rows] for i, name in enumerate(columns)}
+            keys = []
+            rutas = []
+            for row in rows:
+                sitio, ruta = resolve(row[ubicacion_pos])
+                rutas.append(ruta)
+                if fecha_pos is None:
+                    keys.append((("sitio", sitio),))
+                else:
+                    fecha = row[fecha_pos]
+                    keys.append((("sitio", sitio), ("mes", fecha.strftime("%Y-%m") if fecha else SIN_FECHA)))
+            data[entidad.ruta] = rutas
+            table = pa.table(data, schema=escritor.schema)
+
+            grupos = {}
+            for i, key in enumerate(keys):
+                grupos.setdefault(key, []).append(i)
+            for key, indices in grupos.items():
+                escritor.write(key, table.take(indices))
+            total += len(rows)
+    finally:
+        escritor.close()
+    return total, escritor.files
+
+def export_parquet(db: Session, destino: str, entidades: list[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   progreso=None) -> dict:
+    """
+    Exporta las entidades indicadas (todas por defecto) como datasets Parquet particionados por sitio y mes
+    en la carpeta 'destino'. 'progreso' (opcional) recibe (entidad, filas) al terminar cada una.
+    Retorna {entidad: (filas, archivos)}.
+    """
+    resumen = {}
+    for entidad in _entidades():
+        if entidades is not None and entidad.nombre not in entidades:
+            continue
+        resumen[entidad.nombre] = export_entidad(db, entidad, destino, chunk_size)
+        if progreso:
+            progreso(entidad.nombre, resumen[entidad.nombre][0])
+    return resumen
+
+def zip_exportacion(directorio: str, destino_zip: str) -> str:
+    """
+    Empaqueta la carpeta exportada en un único .zip sin recomprimir (Parquet ya está comprimido).
+    Copia archivo por archivo en bloques, sin cargarlos en memoria.
+    """
+    with zipfile.ZipFile(destino_zip, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for root, _, files in os.walk(directorio):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                zf.write(path, os.path.relpath(path, directorio))
+    return destino_zip
+
+def new_export_path() -> str:
+    """
+    Carpeta para una exportación nueva dentro de EXPORT_DIR; descarta las más antiguas (conserva EXPORT_KEEP).
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    previas = sorted(name for name in os.listdir(EXPORT_DIR) if name.startswith("export_"))
+    carpetas = [name for name in previas if not name.endswith(".zip")]
+    for name in carpetas[:max(len(carpetas) - EXPORT_KEEP + 1, 0)]:
+        shutil.rmtree(os.path.join(EXPORT_DIR, name), ignore_errors=True)
+        zip_path = os.path.join(EXPORT_DIR, f"{name}.zip")
+        if os.path.exists(zip_path):
+            os.remove(zip_path)
+    return os.path.join(EXPORT_DIR, f"export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}")
@@ -0,0 +1,238 @@
+# utils/importacion_inventario.py
+
+import csv
+import io
+import os
+from datetime import datetime
+from collections import namedtuple
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import InventarioItem
+from utils.secuencias import reserve_block
+from utils.carga_masiva import insert_rows
+from utils.agregados import record_inventory_items
+from utils.valoracion import record_item_valoracion
+from utils.movimientos_inventario import Movimiento, record_movimientos
+from utils.busqueda import register_in_search_index
+from utils.ordenes_trabajo import find_activo_ids_by_tag
+from utils.arbol_activos import get_arbol_activos
+
+# Filas validadas e insertadas por transacción
+IMPORT_CHUNK_SIZE = 5000
+# Carpeta de los reportes de errores de cada importación
+IMPORT_REPORT_DIR = os.environ.get("IMPORT_REPORT_DIR", "importaciones")
+
+ESTADOS_VALIDOS = ("Funcionando", "No Funcionando")
+
+# Columnas del archivo: obligatorias y opcionales (con su valor por defecto).
+# 'ubicacion' es el tag del activo o, si el tag se repite, su ruta completa (ej: Depósito > Estante 01).
+COLUMNAS_OBLIGATORIAS = ("numero_serie", "tipo_item", "descripcion_breve", "estado_funcionamiento", "ubicacion")
+COLUMNAS_OPCIONALES = {"descripcion_detallada": None, "cantidad": "1", "precio_estimado_usd": "1.0"}
+
+# Fila lista para insertar; tiene los atributos que usan los agregados y la valoración
+FilaItem = namedtuple("FilaItem", [
+    "numero_item", "tipo_item", "numero_serie", "descripcion_breve", "descripcion_detallada",
+    "estado_funcionamiento", "fecha_alta", "cantidad", "precio_estimado_usd", "dado_de_alta_por_id", "ubicacion_id"
+])
+
+ResultadoImportacion = namedtuple("ResultadoImportacion", ["filas", "importadas", "errores", "reporte"])
+
+def _normalize_header(name) -> str:
+    return str(name or "").strip().lower().replace(" ", "_")
+
+def _read_csv(stream, chunk_size: int):
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    sample = text_stream.read(4096)
+    text_stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(text_stream, dialect)
+    header = [_normalize_header(h) for h in next(reader, [])]
+    yield header
+    chunk = []
+    for row in reader:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _read_xlsx(stream, chunk_size: int):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("La importación de Excel requiere openpyxl (pip install openpyxl). Usa CSV en su lugar.")
+    # read_only recorre la hoja fila a fila sin cargarla entera
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_normalize_header(h) for h in next(rows, ())]
+        yield header
+        chunk = []
+        for row in rows:
+            chunk.append(["" if value is None else str(value) for value in row])
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
+
+def read_chunks(stream, nombre_archivo: str, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """
+    Lee por lotes un archivo binario (ej: el de st.file_uploader): CSV separado por coma,
+    punto y coma o tabulador, o XLSX. El primer elemento es la cabecera normalizada; luego, listas de filas (listas de textos).
+    """
+    if nombre_archivo.lower().endswith((".xlsx", ".xlsm")):
+        return _read_xlsx(stream, chunk_size)
+    return _read_csv(stream, chunk_size)
+
+def _path_key(ruta: str) -> tuple:
+    return tuple(part.strip().lower() for part in ruta.split(">"))
+
+def _parse_row(values: dict, resolve_ubicacion, errores: list, fila: int):
+    for columna in COLUMNAS_OBLIGATORIAS:
+        if not values.get(columna):
+            errores.append((fila, values.get("numero_serie", ""), f"Falta '{columna}'"))
+            return None
+    if values["estado_funcionamiento"] not in ESTADOS_VALIDOS:
+        errores.append((fila, values["numero_serie"], f"Estado inválido: {values['estado_funcionamiento']}"))
+        return None
+    try:
+        cantidad = int(float(values.get("cantidad") or COLUMNAS_OPCIONALES["cantidad"]))
+        precio = float((values.get("precio_estimado_usd") or COLUMNAS_OPCIONALES["precio_estimado_usd"]).replace(",", "."))
+    except ValueError:
+        errores.append((fila, values["numero_serie"], "Cantidad o precio no numérico"))
+        return None
+    if cantidad < 1 or precio < 0:
+        errores.append((fila, values["numero_serie"], "Cantidad debe ser >= 1 y precio >= 0"))
+        return None
+    ubicacion_id, motivo = resolve_ubicacion(values["ubicacion"])
+    if ubicacion_id is None:
+        errores.append((fila, values["numero_serie"], motivo))
+        return None
+    return values, cantidad, precio, ubicacion_id
+
+def import_inventory_items(db: Session, stream, nombre_archivo: str, dado_de_alta_por_id: int,
+                           reporte_path: str, chunk_size: int = IMPORT_CHUNK_SIZE, progreso=None) -> ResultadoImportacion:
+    """
+    Importa ítems de inventario desde un CSV o XLSX, lote a lote (una transacción por lote):
+    - valida cada fila y resuelve el tag de ubicación contra el índice de tags en memoria (memorizado por tag);
+    - rechaza números de serie repetidos en el archivo y, con una consulta IN por lote, los ya existentes;
+    - reserva los números de ítem del lote de una vez y lo inserta con insert_rows (COPY en PostgreSQL);
+    - registra las altas en el libro de movimientos y actualiza agregados (un upsert por clave),
+      existencias, valoración e índice de búsqueda.
+    Los errores por fila se escriben en 'reporte_path' (CSV: fila, numero_serie, error).
+    'progreso' (opcional) recibe (filas_leídas, importadas) después de cada lote.
+    """
+    chunks = read_chunks(stream, nombre_archivo, chunk_size)
+    header = next(chunks, [])
+    faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in header]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
+    positions = {name: header.index(name) for name in (*COLUMNAS_OBLIGATORIAS, *COLUMNAS_OPCIONALES) if name in header}
+
+    ubicaciones = {}
+    def resolve_ubicacion(tag):
+        resolved = ubicaciones.get(tag.lower())
+        if resolved is None:
+            ids = find_activo_ids_by_tag(db, tag.split(">")[-1], for_module='inventario')
+            if ">" in tag:
+                arbol = get_arbol_activos(db)
+                ids = [activo_id for activo_id in ids if _path_key(arbol.path(activo_id)) == _path_key(tag)]
+            if len(ids) == 1:
+                resolved = (ids[0], None)
+            elif ids:
+                resolved = (None, f"Ubicación ambigua: {tag} ({len(ids)} activos)")
+            else:
+                resolved = (None, f"Ubicación no encontrada en los sitios de inventario: {tag}")
+            ubicaciones[tag.lower()] = resolved
+        return resolved
+
+    vistos = set() # números de serie del archivo ya procesados
+    filas = importadas = total_errores = 0
+    os.makedirs(os.path.dirname(os.path.abspath(reporte_path)), exist_ok=True)
+    with open(reporte_path, "w", newline="", encoding="utf-8") as reporte_file:
+        reporte = csv.writer(reporte_file)
+        reporte.writerow(["fila", "numero_serie", "error"])
+
+        for chunk in chunks:
+            errores = []
+            validas = []
+            for offset, raw in enumerate(chunk):
+                fila = filas + offset + 2 # +1 por la cabecera, +1 para numerar desde 1
+                values = {name: (raw[pos].strip() if pos < len(raw) and raw[pos] is not None else "")
+                          for name, pos in positions.items()}
+                if not any(values.values()):
+                    continue
+                parsed = _parse_row(values, resolve_ubicacion, errores, fila)
+                if parsed is None:
+                    continue
+                serie = parsed[0]["numero_serie"]
+                if serie in vistos:
+                    errores.append((fila, serie, "Número de serie repetido en el archivo"))
+                    continue
+                vistos.add(serie)
+                validas.append((fila, parsed))
+            filas += len(chunk)
+
+            # Una sola consulta por lote para los números de serie que ya existen
+            series = [parsed[0]["numero_serie"] for _, parsed in validas]
+            existentes = set(db.execute(
+                select(InventarioItem.numero_serie).where(InventarioItem.numero_serie.in_(series))
+            ).scalars()) if series else set()
+            if existentes:
+                errores.extend((fila, parsed[0]["numero_serie"], "Número de serie ya registrado")
+                               for fila, parsed in validas if parsed[0]["numero_serie"] in existentes)
+                validas = [(fila, parsed) for fila, parsed in validas if parsed[0]["numero_serie"] not in existentes]
+
+            if validas:
+                fecha_alta = datetime.utcnow()
+                numeros = reserve_block(db, "numero_item", len(validas))
+                items = [
+                    FilaItem(str(numero), values["tipo_item"], values["numero_serie"], values["descripcion_breve"],
+                             values.get("descripcion_detallada") or values["descripcion_breve"],
+                             values["estado_funcionamiento"], fecha_alta, cantidad, precio, dado_de_alta_por_id, ubicacion_id)
+                    for numero, (_, (values, cantidad, precio, ubicacion_id)) in zip(numeros, validas)
+                ]
+                try:
+                    # COPY en PostgreSQL, executemany en SQLite; luego una consulta para los IDs asignados
+                    insert_rows(db.connection(), InventarioItem.__table__, FilaItem._fields, items)
+                    id_por_numero = dict(db.execute(
+                        select(InventarioItem.numero_item, InventarioItem.id)
+                        .where(InventarioItem.numero_item.in_([item.numero_item for item in items]))
+                    ).all())
+                    ids = [id_por_numero[item.numero_item] for item in items]
+                    record_inventory_items(db, items) # Agregados de informes, en la misma transacción
+                    record_movimientos(db, [Movimiento("alta", item_id, None, None, item.ubicacion_id, item.cantidad,
+                                                       None, dado_de_alta_por_id)
+                                            for item_id, item in zip(ids, items)], fecha=fecha_alta)
+                    db.commit()
+                except IntegrityError:
+                    # Otro usuario registró alguna de estas series durante la importación: se descarta el lote
+                    db.rollback()
+                    errores.extend((fila, parsed[0]["numero_serie"], "Lote descartado: conflicto con un alta simultánea")
+                                   for fila, parsed in validas)
+                else:
+                    for item_id, item in zip(ids, items):
+                        register_in_search_index("inventario", item_id, item.numero_item, item.numero_serie, item.descripcion_breve)
+                        record_item_valoracion(item)
+                    importadas += len(items)
+
+            reporte.writerows(sorted(errores))
+            total_errores += len(errores)
+            if progreso:
+                progreso(filas, importadas)
+
+    return ResultadoImportacion(filas, importadas, total_errores, reporte_path)
+
+def new_report_path() -> str:
+    """
+    Ruta para el reporte de errores de una importación nueva dentro de IMPORT_REPORT_DIR.
+    """
+    return os.path.join(IMPORT_REPORT_DIR, f"errores_{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}.csv")
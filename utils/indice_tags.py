@@ -0,0 +1,91 @@
+# utils/indice_tags.py
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from sqlalchemy.orm import Session
+from utils.arbol_activos import get_arbol_activos
+
+DEFAULT_TAG_LIMIT = 20
+
+class IndiceTags:
+    """
+    Índice de prefijos de los tags (nombres) de activos: un arreglo ordenado de tags en minúsculas
+    y otro paralelo con sus IDs. Una búsqueda por prefijo es un bisect sobre el arreglo
+    (equivalente a descender un trie, sin sus nodos); las altas se insertan en su lugar.
+    """
+
+    def __init__(self, items):
+        pairs = sorted((nombre.lower(), activo_id) for activo_id, nombre in items if nombre)
+        self._tags = [tag for tag, _ in pairs]
+        self._ids = array('q', (activo_id for _, activo_id in pairs))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tags)
+
+    def add(self, activo_id: int, nombre: str):
+        if not nombre:
+            return
+        tag = nombre.lower()
+        with self._lock:
+            pos = bisect_right(self._tags, tag)
+            self._tags.insert(pos, tag)
+            self._ids.insert(pos, activo_id)
+
+    def exact(self, tag: str) -> list[int]:
+        """
+        IDs de los activos cuyo tag es exactamente 'tag' (sin distinguir mayúsculas).
+        """
+        tag = tag.strip().lower()
+        lo = bisect_left(self._tags, tag)
+        hi = bisect_right(self._tags, tag, lo)
+        return self._ids[lo:hi].tolist()
+
+    def prefix(self, prefix: str, limit: int = None) -> list[int]:
+        """
+        IDs de los activos cuyo tag empieza por 'prefix', en orden alfabético de tag.
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        lo = bisect_left(self._tags, prefix)
+        hi = bisect_left(self._tags, prefix + "\uffff", lo)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self._ids[lo:hi].tolist()
+
+
+# Índice compartido por todas las sesiones del proceso
+_indice = None
+_indice_lock = threading.Lock()
+
+def get_indice_tags(db: Session) -> IndiceTags:
+    """
+    Obtiene el índice de tags del proceso, construyéndolo desde el árbol de activos en memoria si no existe.
+    """
+    global _indice
+    indice = _indice
+    if indice is None:
+        with _indice_lock:
+            if _indice is None:
+                arbol = get_arbol_activos(db)
+                _indice = IndiceTags((activo_id, nombre) for activo_id, nombre, _ in arbol.items())
+            indice = _indice
+    return indice
+
+def add_to_indice_tags(activo_id: int, nombre: str):
+    """
+    Registra un activo nuevo en el índice de tags, si ya está construido.
+    """
+    indice = _indice
+    if indice is not None:
+        indice.add(activo_id, nombre)
+
+def invalidate_indice_tags():
+    """
+    Descarta el índice actual; la siguiente lectura lo reconstruye.
+    """
+    global _indice
+    with _indice_lock:
+        _indice = None
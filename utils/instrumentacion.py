@@ -0,0 +1,126 @@
+# utils/instrumentacion.py
+
+import os
+import json
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import event
+
+# Activación por defecto (también puede activarse por rerun, ver medir_rerun)
+INSTRUMENTACION_ACTIVA = os.environ.get("DB_INSTRUMENTACION", "0").lower() in ("1", "true", "si", "yes")
+# Archivo JSON lines donde se escribe un registro por rerun medido ("" para no escribir)
+INSTRUMENTACION_LOG = os.environ.get("DB_INSTRUMENTACION_LOG", os.path.join("logs", "consultas_sql.jsonl"))
+# Una misma sentencia repetida más de N veces en un rerun se reporta como patrón N+1
+UMBRAL_N_MAS_1 = int(os.environ.get("DB_UMBRAL_N_MAS_1", "10"))
+# Cantidad de sentencias más lentas que se conservan por rerun
+MAX_LENTAS = 5
+
+_actual = threading.local() # Streamlit ejecuta cada rerun en su propio hilo
+_log_lock = threading.Lock()
+_engines_instrumentados = set()
+
+class MedicionRerun:
+    """
+    Sentencias SQL ejecutadas durante un rerun: cantidad, tiempo total, las más lentas
+    y las repetidas (posibles N+1).
+    """
+
+    def __init__(self, pagina: str = None):
+        self.pagina = pagina
+        self.inicio = time.perf_counter()
+        self.duracion_ms = 0.0
+        self.sentencias = 0
+        self.tiempo_db_ms = 0.0
+        self.lentas = [] # (ms, sql), ordenadas de mayor a menor
+        self.repeticiones = Counter()
+
+    def registrar(self, statement: str, ms: float):
+        self.sentencias += 1
+        self.tiempo_db_ms += ms
+        self.repeticiones[statement] += 1
+        if len(self.lentas) < MAX_LENTAS or ms > self.lentas[-1][0]:
+            self.lentas.append((ms, statement))
+            self.lentas.sort(key=lambda x: x[0], reverse=True)
+            del self.lentas[MAX_LENTAS:]
+
+    def n_mas_1(self, umbral: int = None) -> list[tuple[str, int]]:
+        """
+        Sentencias repetidas más de 'umbral' veces, de más a menos repetida.
+        """
+        umbral = UMBRAL_N_MAS_1 if umbral is None else umbral
+        return [(sql, n) for sql, n in self.repeticiones.most_common() if n > umbral]
+
+    def to_dict(self) -> dict:
+        return {
+            "fecha": datetime.utcnow().isoformat(timespec="seconds"),
+            "pagina": self.pagina,
+            "duracion_ms": round(self.duracion_ms, 2),
+            "sentencias": self.sentencias,
+            "tiempo_db_ms": round(self.tiempo_db_ms, 2),
+            "lentas": [{"ms": round(ms, 2), "sql": sql} for ms, sql in self.lentas],
+            "n_mas_1": [{"veces": n, "sql": sql} for sql, n in self.n_mas_1()],
+        }
+
+# El inicio se guarda en el contexto de ejecución de cada sentencia (no en la conexión): si la sentencia
+# falla, after_cursor_execute no se llama y el contexto se descarta sin dejar nada en la conexión del pool
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and getattr(_actual, "medicion", None) is not None:
+        context._instrumentacion_inicio = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    medicion = getattr(_actual, "medicion", None)
+    inicio = getattr(context, "_instrumentacion_inicio", None)
+    if medicion is None or inicio is None:
+        return
+    ms = (time.perf_counter() - inicio) * 1000
+    medicion.registrar(" ".join(statement.split()), ms)
+
+def instrumentar_engine(engine):
+    """
+    Registra (una sola vez) los eventos que miden las sentencias del motor.
+    Sin un rerun medido en curso en el hilo, los eventos no registran nada.
+    """
+    if id(engine) in _engines_instrumentados:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    _engines_instrumentados.add(id(engine))
+
+def escribir_log(medicion: MedicionRerun, path: str = None):
+    path = INSTRUMENTACION_LOG if path is None else path
+    if not path:
+        return
+    directorio = os.path.dirname(path)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    with _log_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(medicion.to_dict(), ensure_ascii=False) + "\n")
+
+@contextmanager
+def medir_rerun(engine, activa: bool = None, pagina: str = None):
+    """
+    Mide las sentencias SQL ejecutadas en el hilo actual dentro del bloque.
+    Entrega la MedicionRerun (o None si la instrumentación no está activa) y al salir
+    escribe su registro en el log JSON lines.
+    """
+    activa = INSTRUMENTACION_ACTIVA if activa is None else activa
+    if not activa:
+        yield None
+        return
+
+    instrumentar_engine(engine)
+    medicion = MedicionRerun(pagina)
+    _actual.medicion = medicion
+    try:
+        yield medicion
+    finally:
+        _actual.medicion = None
+        medicion.duracion_ms = (time.perf_counter() - medicion.inicio) * 1000
+        try:
+            escribir_log(medicion)
+        except OSError as e:
+            print(f"No se pudo escribir el log de instrumentación: {e}")
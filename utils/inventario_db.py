@@ -1,24 +1,29 @@
 # utils/inventario_db.py
 
 from sqlalchemy.orm import Session
+from sqlalchemy import func, text, tuple_, update
 from datetime import datetime
-from models import InventarioItem, Usuario, Activo, Producto
-from utils.ordenes_trabajo import get_all_descendant_activo_ids
+from models import InventarioItem, Usuario, Activo, Producto, SEQ_NUMERO_ITEM
+from utils.jerarquia import subtree_condition
+from utils.secuencias import next_value, peek_next
+from utils.busqueda import search_condition, register_in_search_index
+from utils.agregados import record_inventory_item, record_inventory_item_move, record_inventory_item_cantidad
+from utils.valoracion import record_item_valoracion, move_item_valoracion, update_item_valoracion
+from utils.movimientos_inventario import Movimiento, record_movimientos, movimiento_alta
+from utils.reservas_stock import consume_reserva, lock_disponible, get_disponible
 
 # Número inicial para la secuencia de ítems
-INITIAL_ITEM_NUMBER = 200000
+INITIAL_ITEM_NUMBER = SEQ_NUMERO_ITEM.start
+
+# Tamaño de página por defecto del listado de inventario
+DEFAULT_PAGE_SIZE = 50
 
 def get_next_item_number(db: Session) -> str:
     """
-    Genera el siguiente número de ítem de inventario.
-    Busca el último número de ítem y le suma 1. Si no hay ítems, usa INITIAL_ITEM_NUMBER.
+    Muestra el siguiente número de ítem de inventario sin consumirlo.
+    La asignación real ocurre en create_inventory_item a partir de la secuencia.
     """
-    last_item = db.query(InventarioItem).order_by(InventarioItem.id.desc()).first()
-    if last_item and last_item.numero_item.isdigit():
-        next_num = int(last_item.numero_item) + 1
-    else:
-        next_num = INITIAL_ITEM_NUMBER
-    return str(next_num)
+    return str(peek_next(db, "numero_item"))
 
 def create_inventory_item(
     db: Session,
@@ -36,7 +41,7 @@ def create_inventory_item(
     """
     Crea un nuevo ítem individual en el inventario.
     """
-    next_item_num = get_next_item_number(db)
+    next_item_num = str(next_value(db, "numero_item"))
 
     new_item = InventarioItem(
         numero_item=next_item_num,
@@ -54,29 +59,171 @@ def create_inventory_item(
     )
 
     db.add(new_item)
+    db.flush()
+    record_inventory_item(db, new_item) # Agregados de informes, en la misma transacción
+    record_movimientos(db, [movimiento_alta(new_item)], fecha=new_item.fecha_alta)
     db.commit()
     db.refresh(new_item)
+    register_in_search_index("inventario", new_item.id, new_item.numero_item, new_item.numero_serie, new_item.descripcion_breve)
+    record_item_valoracion(new_item)
     return new_item
 
-def get_inventory_items(db: Session, item_number_filter: str = None, location_id_filter: int = None):
+def move_inventory_item(db: Session, item_id: int, nueva_ubicacion_id: int, usuario_id: int = None):
     """
-    Obtiene todos los ítems individuales del inventario, con opciones de filtrado.
-    - item_number_filter: Filtra por el número de item (coincidencia parcial).
-    - location_id_filter: Filtra por la ubicación y todos sus descendientes.
+    Cambia la ubicación de un ítem (movimiento 'traslado' en el libro) y traslada su aporte en los
+    agregados y en la valoración del árbol. Retorna el ítem actualizado, o None si no existe;
+    ValueError si otro movimiento cambió el ítem entre la lectura y el traslado.
+    """
+    item = db.query(InventarioItem).filter(InventarioItem.id == item_id).first()
+    if not item:
+        return None
+    numero_item, old_ubicacion_id, cantidad = item.numero_item, item.ubicacion_id, item.cantidad or 0
+    if old_ubicacion_id == nueva_ubicacion_id:
+        return item
+
+    # Condicionado a la ubicación y cantidad leídas (como en _reduce_cantidad): de dos traslados simultáneos
+    # solo uno sale de la ubicación de origen, y el libro registra las unidades que realmente se movieron
+    result = db.execute(
+        update(InventarioItem)
+        .where(InventarioItem.id == item_id, InventarioItem.ubicacion_id == old_ubicacion_id,
+               func.coalesce(InventarioItem.cantidad, 0) == cantidad)
+        .values(ubicacion_id=nueva_ubicacion_id).execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        raise ValueError(f"El ítem {numero_item} cambió mientras se registraba el movimiento; vuelve a intentarlo.")
+    db.refresh(item, ["ubicacion_id"])
+    record_inventory_item_move(db, item, old_ubicacion_id)
+    record_movimientos(db, [Movimiento("traslado", item.id, item.producto_asociado_id, old_ubicacion_id,
+                                       nueva_ubicacion_id, cantidad, None, usuario_id)])
+    db.commit()
+    db.refresh(item)
+    move_item_valoracion(item, old_ubicacion_id)
+    return item
+
+def _reduce_cantidad(db: Session, item_id: int, tipo: str, cantidad: int = None, orden_id: int = None, usuario_id: int = None):
+    item = db.query(InventarioItem).filter(InventarioItem.id == item_id).first()
+    if not item:
+        return None
+    numero_item, leida = item.numero_item, item.cantidad or 0
+    cantidad = leida if cantidad is None else cantidad
+    if cantidad <= 0 or cantidad > leida:
+        raise ValueError(f"Cantidad no válida: {cantidad} (disponible: {leida})")
+
+    # Descuento condicional sobre la fila (no leer y escribir old - n): dos consumos simultáneos del mismo
+    # ítem se serializan y el segundo falla si ya no quedan unidades. La baja exige que la cantidad no
+    # haya cambiado desde la lectura, para registrar en el libro exactamente lo que sale.
+    condicion = InventarioItem.cantidad == cantidad if tipo == "baja" else InventarioItem.cantidad >= cantidad
+    result = db.execute(
+        update(InventarioItem).where(InventarioItem.id == item_id, condicion)
+        .values(cantidad=InventarioItem.cantidad - cantidad).execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        raise ValueError(f"El ítem {numero_item} cambió mientras se registraba el movimiento; vuelve a intentarlo.")
+    db.refresh(item, ["cantidad"])
+    old_cantidad = item.cantidad + cantidad
+
+    producto_id = item.producto_asociado_id
+    if producto_id is not None:
+        # Lo que la orden tenía reservado de este producto sale con el consumo; el resto de las unidades
+        # tiene que salir del disponible, no de lo reservado por otras órdenes
+        if orden_id is not None:
+            consume_reserva(db, orden_id, producto_id, cantidad)
+        if not lock_disponible(db, producto_id, cantidad):
+            disponible = get_disponible(db, [producto_id])[producto_id]
+            db.rollback()
+            raise ValueError(f"No hay stock libre del producto: se piden {cantidad} unidad(es) y hay {max(disponible, 0)} "
+                             "disponibles (el resto está reservado por órdenes abiertas).")
+    record_inventory_item_cantidad(db, item, old_cantidad)
+    record_movimientos(db, [Movimiento(tipo, item.id, producto_id, item.ubicacion_id, None,
+                                       cantidad, orden_id, usuario_id)])
+    db.commit()
+    db.refresh(item)
+    update_item_valoracion(item, old_cantidad)
+    return item
+
+def consume_inventory_item(db: Session, item_id: int, cantidad: int, orden_id: int = None, usuario_id: int = None):
+    """
+    Descuenta 'cantidad' unidades de un ítem usadas en una orden de trabajo (movimiento 'consumo')
+    y, si el ítem tiene producto, las descuenta también de lo que la orden tenía reservado.
+    Retorna el ítem actualizado, o None si no existe; ValueError si no hay unidades suficientes
+    o si las que excedan la reserva de la orden están reservadas por otras órdenes.
+    """
+    return _reduce_cantidad(db, item_id, "consumo", cantidad, orden_id, usuario_id)
+
+def retire_inventory_item(db: Session, item_id: int, usuario_id: int = None):
     """
-    query = db.query(InventarioItem).order_by(InventarioItem.fecha_alta.desc())
+    Da de baja las unidades restantes de un ítem (movimiento 'baja'). El ítem se conserva con cantidad 0
+    para mantener su historial. Retorna el ítem actualizado, o None si no existe; ValueError si esas
+    unidades están reservadas por órdenes abiertas (hay que liberar la reserva antes).
+    """
+    return _reduce_cantidad(db, item_id, "baja", usuario_id=usuario_id)
+
+def _filtered_inventory_query(db: Session, item_number_filter: str = None, location_id_filter: int = None,
+                              search_text: str = None):
+    query = db.query(InventarioItem)
 
     if item_number_filter:
         query = query.filter(InventarioItem.numero_item.ilike(f'%{item_number_filter}%'))
 
+    if search_text and search_text.strip():
+        query = query.filter(search_condition(db, "inventario", search_text))
+
     if location_id_filter:
-        descendant_ids = get_all_descendant_activo_ids(db, location_id_filter)
-        if descendant_ids:
-            query = query.filter(InventarioItem.ubicacion_id.in_(descendant_ids))
-        else:
-            return []
+        query = query.filter(subtree_condition(db, InventarioItem.ubicacion_id, location_id_filter))
+
+    return query
+
+def get_inventory_items(db: Session, item_number_filter: str = None, location_id_filter: int = None,
+                        search_text: str = None):
+    """
+    Obtiene todos los ítems individuales del inventario, con opciones de filtrado.
+    - item_number_filter: Filtra por el número de item (coincidencia parcial).
+    - location_id_filter: Filtra por la ubicación y todos sus descendientes.
+    - search_text: Filtra por número de item, número de serie o descripción breve (ver utils/busqueda).
+    """
+    query = _filtered_inventory_query(db, item_number_filter, location_id_filter, search_text)
+    return query.order_by(InventarioItem.fecha_alta.desc()).all()
 
-    return query.all()
+def get_inventory_items_page(
+    db: Session,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    after: tuple = None,
+    item_number_filter: str = None,
+    location_id_filter: int = None,
+    search_text: str = None
+):
+    """
+    Obtiene una página de ítems ordenada por (fecha_alta, id) descendente usando paginación por clave:
+    el coste no depende de cuántas páginas se hayan recorrido.
+    - after: cursor (fecha_alta, id) del último ítem de la página anterior; None para la primera.
+    Retorna (items, next_cursor); next_cursor es None si no hay más páginas.
+    """
+    query = _filtered_inventory_query(db, item_number_filter, location_id_filter, search_text)
+    if after is not None:
+        query = query.filter(tuple_(InventarioItem.fecha_alta, InventarioItem.id) < tuple_(*after))
+
+    rows = query.order_by(InventarioItem.fecha_alta.desc(), InventarioItem.id.desc()).limit(page_size + 1).all()
+    items = rows[:page_size]
+    next_cursor = (items[-1].fecha_alta, items[-1].id) if len(rows) > page_size else None
+    return items, next_cursor
+
+def estimate_inventory_count(db: Session, item_number_filter: str = None, location_id_filter: int = None,
+                             search_text: str = None) -> int:
+    """
+    Estima el total de ítems que cumplen los filtros.
+    En PostgreSQL usa la estimación del planificador (EXPLAIN), sin recorrer la tabla;
+    en otros motores hace un COUNT(*) exacto.
+    """
+    query = _filtered_inventory_query(db, item_number_filter, location_id_filter, search_text)
+    if db.get_bind().dialect.name == "postgresql":
+        statement = query.with_entities(InventarioItem.id).statement.compile(
+            dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}
+        )
+        plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {statement}")).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"])
+    return query.with_entities(func.count(InventarioItem.id)).scalar()
 
 def get_inventory_item_by_id(db: Session, item_id: int):
     """
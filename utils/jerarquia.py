@@ -0,0 +1,151 @@
+# utils/jerarquia.py
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, literal, text, union_all, update, and_
+from models import Activo, ActivoClausura
+
+# Tamaño máximo de las listas IN (...) para no superar el límite de parámetros de SQLite
+IN_CHUNK_SIZE = 500
+
+# Filas por lote al rellenar la columna path
+PATH_BATCH_SIZE = 5000
+
+# Reconstruye la tabla de clausura completa en una sola sentencia (PostgreSQL y SQLite soportan WITH RECURSIVE)
+REBUILD_CLAUSURA_SQL = text("""
+    INSERT INTO activos_clausura (ancestro_id, descendiente_id, profundidad)
+    WITH RECURSIVE clausura(ancestro_id, descendiente_id, profundidad) AS (
+        SELECT id, id, 0 FROM activos
+        UNION ALL
+        SELECT c.ancestro_id, a.id, c.profundidad + 1
+        FROM clausura c
+        JOIN activos a ON a.parent_id = c.descendiente_id
+    )
+    SELECT ancestro_id, descendiente_id, profundidad FROM clausura
+""")
+
+def add_activo_to_clausura(db: Session, activo_id: int, parent_id: int = None):
+    """
+    Registra un activo recién creado en la tabla de clausura.
+    Copia las filas de ancestros del padre (profundidad + 1) y añade la fila propia.
+    No hace commit: se ejecuta dentro de la transacción de quien crea el activo.
+    """
+    propia = select(literal(activo_id), literal(activo_id), literal(0))
+    if parent_id is not None:
+        ancestros = select(
+            ActivoClausura.ancestro_id,
+            literal(activo_id),
+            ActivoClausura.profundidad + 1
+        ).where(ActivoClausura.descendiente_id == parent_id)
+        origen = union_all(ancestros, propia)
+    else:
+        origen = propia
+
+    db.execute(
+        ActivoClausura.__table__.insert().from_select(
+            ["ancestro_id", "descendiente_id", "profundidad"], origen
+        )
+    )
+
+def rebuild_activo_clausura(db: Session) -> int:
+    """
+    Borra y vuelve a generar la tabla de clausura a partir de activos.parent_id.
+    Retorna el número de filas generadas.
+    """
+    db.query(ActivoClausura).delete(synchronize_session=False)
+    db.execute(REBUILD_CLAUSURA_SQL)
+    db.commit()
+    return db.query(ActivoClausura).count()
+
+def get_descendant_ids_from_clausura(db: Session, activo_id: int) -> list[int]:
+    """
+    Obtiene los IDs del activo y de todos sus descendientes con una única consulta indexada.
+    Retorna una lista vacía si el activo no está registrado en la clausura.
+    """
+    rows = db.query(ActivoClausura.descendiente_id).filter(ActivoClausura.ancestro_id == activo_id).all()
+    return [row[0] for row in rows]
+
+def get_descendant_ids_by_level(db: Session, activo_id: int) -> list[int]:
+    """
+    Recorre la jerarquía nivel por nivel (una consulta por nivel, no por nodo).
+    Se usa como respaldo cuando la tabla de clausura aún no se ha construido.
+    """
+    descendants_ids = {activo_id}
+    frontier = [activo_id]
+    while frontier:
+        next_frontier = []
+        for start in range(0, len(frontier), IN_CHUNK_SIZE):
+            chunk = frontier[start:start + IN_CHUNK_SIZE]
+            children = db.query(Activo.id).filter(Activo.parent_id.in_(chunk)).all()
+            next_frontier.extend(row[0] for row in children if row[0] not in descendants_ids)
+        descendants_ids.update(next_frontier)
+        frontier = next_frontier
+    return list(descendants_ids)
+
+def build_activo_path(parent_path: str, activo_id: int):
+    """
+    Construye la ruta materializada de un activo a partir de la de su padre ("/" para raíces).
+    Retorna None si el padre aún no tiene ruta (datos sin migrar).
+    """
+    if not parent_path:
+        return None
+    return f"{parent_path}{activo_id}/"
+
+def set_activo_path(db: Session, activo: Activo):
+    """
+    Asigna la ruta materializada a un activo ya insertado (requiere activo.id). No hace commit.
+    """
+    if activo.parent_id is None:
+        parent_path = "/"
+    else:
+        parent_path = db.query(Activo.path).filter(Activo.id == activo.parent_id).scalar()
+    activo.path = build_activo_path(parent_path, activo.id)
+
+def rebuild_activo_paths(db: Session) -> int:
+    """
+    Recalcula la columna path de todos los activos a partir de parent_id y la guarda por lotes.
+    Retorna el número de activos actualizados.
+    """
+    parent_of = dict(db.query(Activo.id, Activo.parent_id).all())
+
+    paths = {}
+    for activo_id in parent_of:
+        chain = []
+        current = activo_id
+        while current is not None and current not in paths:
+            chain.append(current)
+            current = parent_of.get(current)
+        prefix = paths[current] if current is not None else "/"
+        for node_id in reversed(chain):
+            prefix = build_activo_path(prefix, node_id)
+            paths[node_id] = prefix
+
+    rows = [{"id": activo_id, "path": path} for activo_id, path in paths.items()]
+    for start in range(0, len(rows), PATH_BATCH_SIZE):
+        db.execute(update(Activo), rows[start:start + PATH_BATCH_SIZE])
+    db.commit()
+    return len(rows)
+
+def path_prefix_condition(db: Session, prefix: str):
+    """
+    Condición "path empieza por prefix" que aprovecha el índice ix_activos_path.
+    En PostgreSQL usa LIKE (índice text_pattern_ops); en SQLite, un rango equivalente
+    porque su LIKE no distingue mayúsculas y no usa índices por defecto.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return Activo.path.like(f"{prefix}%")
+    # El carácter siguiente a '/' es '0', así que [prefix, prefix sin '/' + '0') cubre todo el subárbol
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(Activo.path >= prefix, Activo.path < upper)
+
+def subtree_condition(db: Session, column, activo_id: int):
+    """
+    Condición SQL "column pertenece al subárbol de activo_id" (incluido el propio activo).
+    Usa un rango sobre la ruta materializada; si el activo aún no tiene ruta,
+    recurre a la lista de descendientes de la tabla de clausura.
+    """
+    root_path = db.query(Activo.path).filter(Activo.id == activo_id).scalar()
+    if root_path:
+        return column.in_(select(Activo.id).where(path_prefix_condition(db, root_path)))
+
+    descendant_ids = get_descendant_ids_from_clausura(db, activo_id) or get_descendant_ids_by_level(db, activo_id)
+    return column.in_(descendant_ids)
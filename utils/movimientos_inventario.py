@@ -0,0 +1,268 @@
+# utils/movimientos_inventario.py
+
+import os
+from datetime import datetime
+from collections import namedtuple, defaultdict
+from sqlalchemy import select, func, insert, delete, update, literal, text
+from sqlalchemy.orm import Session
+from models import (
+    InventarioItem, Inventario, MovimientoInventario, StockUbicacion, CheckpointStock, CheckpointStockFila
+)
+from utils.jerarquia import subtree_condition
+from utils.agregados import upsert_increments
+
+TIPOS_MOVIMIENTO = ("alta", "traslado", "consumo", "baja")
+
+# Ítems sin producto asociado se acumulan bajo este producto_id
+SIN_PRODUCTO = 0
+
+# Movimientos desde el último punto de control a partir de los cuales maybe_checkpoint crea uno nuevo
+STOCK_CHECKPOINT_CADA = int(os.environ.get("STOCK_CHECKPOINT_CADA", "50000"))
+
+# Un movimiento del libro: origen vacío en las altas, destino vacío en consumos y bajas
+Movimiento = namedtuple("Movimiento", [
+    "tipo", "item_id", "producto_id", "ubicacion_origen_id", "ubicacion_destino_id", "cantidad", "orden_id", "usuario_id"
+], defaults=(None, None))
+
+def _producto(producto_id) -> int:
+    return producto_id if producto_id is not None else SIN_PRODUCTO
+
+def _stock_deltas(movimientos) -> dict:
+    """
+    Efecto de los movimientos sobre las existencias: {(ubicacion_id, producto_id): delta}.
+    """
+    deltas = defaultdict(int)
+    for mov in movimientos:
+        if mov.ubicacion_origen_id is not None:
+            deltas[(mov.ubicacion_origen_id, _producto(mov.producto_id))] -= mov.cantidad
+        if mov.ubicacion_destino_id is not None:
+            deltas[(mov.ubicacion_destino_id, _producto(mov.producto_id))] += mov.cantidad
+    return deltas
+
+def record_movimientos(db: Session, movimientos, fecha: datetime = None):
+    """
+    Añade movimientos al libro y aplica su efecto en la misma transacción (no hace commit):
+    un INSERT en lote para el libro, un upsert por (ubicación, producto) afectado en stock_ubicaciones
+    y uno por producto en inventario.cantidad (los traslados no cambian el total de un producto).
+    """
+    movimientos = list(movimientos)
+    if not movimientos:
+        return
+    fecha = fecha or datetime.utcnow()
+    for mov in movimientos:
+        if mov.tipo not in TIPOS_MOVIMIENTO:
+            raise ValueError(f"Tipo de movimiento no válido: {mov.tipo}")
+    db.execute(insert(MovimientoInventario), [
+        dict(mov._asdict(), fecha=fecha, producto_id=_producto(mov.producto_id)) for mov in movimientos
+    ])
+
+    deltas = _stock_deltas(movimientos)
+    # Orden fijo de claves para que dos transacciones concurrentes no se bloqueen mutuamente
+    upsert_increments(db, StockUbicacion, ("ubicacion_id", "producto_id"), [
+        dict(ubicacion_id=ubicacion_id, producto_id=producto_id, cantidad=delta)
+        for (ubicacion_id, producto_id), delta in sorted(deltas.items()) if delta
+    ])
+    por_producto = defaultdict(int)
+    for (_, producto_id), delta in deltas.items():
+        if producto_id != SIN_PRODUCTO:
+            por_producto[producto_id] += delta
+    upsert_increments(db, Inventario, ("producto_id",), [
+        dict(producto_id=producto_id, cantidad=delta) for producto_id, delta in sorted(por_producto.items()) if delta
+    ])
+
+def movimiento_alta(item, usuario_id: int = None) -> Movimiento:
+    """
+    Movimiento de alta de un ítem (acepta cualquier objeto con los atributos de InventarioItem).
+    """
+    return Movimiento("alta", item.id, getattr(item, "producto_asociado_id", None), None, item.ubicacion_id,
+                      item.cantidad or 0, None, usuario_id if usuario_id is not None else item.dado_de_alta_por_id)
+
+# --- LECTURA ---
+
+def _filtrar(db: Session, query, ubicacion_col, producto_col, ubicacion_id: int = None, producto_id: int = None):
+    if ubicacion_id is not None:
+        query = query.where(subtree_condition(db, ubicacion_col, ubicacion_id))
+    if producto_id is not None:
+        query = query.where(producto_col == producto_id)
+    return query
+
+def get_stock_actual(db: Session, ubicacion_id: int = None, producto_id: int = None) -> dict:
+    """
+    Existencias actuales {(ubicacion_id, producto_id): cantidad} leídas de stock_ubicaciones,
+    opcionalmente solo del subárbol de 'ubicacion_id' y de un producto.
+    """
+    query = _filtrar(db, select(StockUbicacion.ubicacion_id, StockUbicacion.producto_id, StockUbicacion.cantidad)
+                     .where(StockUbicacion.cantidad != 0),
+                     StockUbicacion.ubicacion_id, StockUbicacion.producto_id, ubicacion_id, producto_id)
+    return {(u, p): c for u, p, c in db.execute(query)}
+
+def _replay(db: Session, stock: dict, desde_id: int, hasta_id: int = None, fecha: datetime = None,
+            ubicacion_id: int = None, producto_id: int = None) -> dict:
+    """
+    Aplica a 'stock' los movimientos con id > desde_id (y <= hasta_id, y fecha <= 'fecha' si se indican),
+    agrupados en SQL por ubicación y producto: una consulta para las salidas y otra para las entradas.
+    """
+    M = MovimientoInventario
+    for ubicacion_col, signo in ((M.ubicacion_origen_id, -1), (M.ubicacion_destino_id, 1)):
+        query = select(ubicacion_col, M.producto_id, func.sum(M.cantidad)).where(M.id > desde_id, ubicacion_col.is_not(None))
+        if hasta_id is not None:
+            query = query.where(M.id <= hasta_id)
+        if fecha is not None:
+            query = query.where(M.fecha <= fecha)
+        query = _filtrar(db, query, ubicacion_col, M.producto_id, ubicacion_id, producto_id)
+        for u, p, cantidad in db.execute(query.group_by(ubicacion_col, M.producto_id)):
+            stock[(u, p)] = stock.get((u, p), 0) + signo * int(cantidad)
+    return stock
+
+def _checkpoint_rows(db: Session, checkpoint_id: int, ubicacion_id: int = None, producto_id: int = None) -> dict:
+    F = CheckpointStockFila
+    query = _filtrar(db, select(F.ubicacion_id, F.producto_id, F.cantidad).where(F.checkpoint_id == checkpoint_id),
+                     F.ubicacion_id, F.producto_id, ubicacion_id, producto_id)
+    return {(u, p): c for u, p, c in db.execute(query)}
+
+def get_stock_at(db: Session, fecha: datetime, ubicacion_id: int = None, producto_id: int = None,
+                 usar_checkpoint: bool = True) -> dict:
+    """
+    Existencias {(ubicacion_id, producto_id): cantidad} a la fecha indicada: las filas del último punto
+    de control con fecha <= 'fecha' más los movimientos posteriores a él hasta esa fecha
+    (sin punto de control, o con usar_checkpoint=False, se recorre el libro completo).
+    Los movimientos se numeran en orden de registro, así que un punto de control contiene
+    exactamente los movimientos con id <= hasta_movimiento_id.
+    """
+    checkpoint = None
+    if usar_checkpoint:
+        checkpoint = db.execute(
+            select(CheckpointStock.id, CheckpointStock.hasta_movimiento_id)
+            .where(CheckpointStock.fecha <= fecha).order_by(CheckpointStock.fecha.desc(), CheckpointStock.id.desc()).limit(1)
+        ).first()
+    stock = _checkpoint_rows(db, checkpoint.id, ubicacion_id, producto_id) if checkpoint else {}
+    stock = _replay(db, stock, checkpoint.hasta_movimiento_id if checkpoint else 0, fecha=fecha,
+                    ubicacion_id=ubicacion_id, producto_id=producto_id)
+    return {key: cantidad for key, cantidad in stock.items() if cantidad != 0}
+
+def get_movimientos_item(db: Session, item_id: int) -> list:
+    """
+    Historial de movimientos de un ítem, del más antiguo al más reciente.
+    """
+    return db.query(MovimientoInventario).filter(MovimientoInventario.item_id == item_id).order_by(MovimientoInventario.id).all()
+
+# --- PUNTOS DE CONTROL ---
+
+def _wait_for_movimientos_en_curso(db: Session):
+    """
+    En PostgreSQL el id de un movimiento se asigna al insertarlo pero la fila se ve recién con el commit:
+    una transacción en curso puede tener un id menor que el MAX(id) visible. LOCK ... IN EXCLUSIVE MODE
+    espera a que terminen las transacciones que insertaron movimientos (tienen ROW EXCLUSIVE hasta el
+    commit) y bloquea nuevas inserciones hasta el commit del llamador; las lecturas siguen libres.
+    En SQLite no hace falta: las escrituras están serializadas y un id no se ve antes que los menores.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"LOCK TABLE {MovimientoInventario.__tablename__} IN EXCLUSIVE MODE"))
+
+def create_stock_checkpoint(db: Session, fecha: datetime = None) -> CheckpointStock:
+    """
+    Guarda las existencias hasta el último movimiento registrado con fecha <= 'fecha' (por defecto, ahora).
+    Parte del punto de control anterior y aplica solo los movimientos nuevos, así que el coste
+    depende de lo ocurrido desde entonces y no del tamaño del libro. Hace commit.
+    El límite (hasta_movimiento_id) se lee con el libro bloqueado para escritura (ver
+    _wait_for_movimientos_en_curso), así que ningún movimiento con id menor puede confirmarse después;
+    el bloqueo se libera en cuanto se lee el límite.
+    """
+    fecha = fecha or datetime.utcnow()
+    _wait_for_movimientos_en_curso(db)
+    hasta_id = db.execute(select(func.max(MovimientoInventario.id)).where(MovimientoInventario.fecha <= fecha)).scalar() or 0
+    db.commit() # Libera el bloqueo: los movimientos nuevos tendrán ids mayores que hasta_id
+    anterior = db.execute(
+        select(CheckpointStock.id, CheckpointStock.hasta_movimiento_id)
+        .where(CheckpointStock.hasta_movimiento_id <= hasta_id)
+        .order_by(CheckpointStock.hasta_movimiento_id.desc(), CheckpointStock.id.desc()).limit(1)
+    ).first()
+    stock = _checkpoint_rows(db, anterior.id) if anterior else {}
+    stock = _replay(db, stock, anterior.hasta_movimiento_id if anterior else 0, hasta_id=hasta_id)
+
+    checkpoint = CheckpointStock(fecha=fecha, hasta_movimiento_id=hasta_id)
+    db.add(checkpoint)
+    db.flush()
+    filas = [dict(checkpoint_id=checkpoint.id, ubicacion_id=u, producto_id=p, cantidad=c)
+             for (u, p), c in sorted(stock.items()) if c != 0]
+    if filas:
+        db.execute(insert(CheckpointStockFila), filas)
+    db.commit()
+    return checkpoint
+
+def maybe_checkpoint(db: Session, cada: int = STOCK_CHECKPOINT_CADA):
+    """
+    Crea un punto de control si desde el último hay al menos 'cada' movimientos.
+    Retorna el punto de control creado, o None.
+    """
+    ultimo = db.execute(select(func.max(CheckpointStock.hasta_movimiento_id))).scalar() or 0
+    pendientes = db.execute(select(func.count()).select_from(MovimientoInventario).where(MovimientoInventario.id > ultimo)).scalar()
+    if pendientes < cada:
+        return None
+    return create_stock_checkpoint(db)
+
+# --- RECÁLCULO Y RECONCILIACIÓN ---
+
+def _stock_items(db: Session) -> dict:
+    producto = func.coalesce(InventarioItem.producto_asociado_id, SIN_PRODUCTO)
+    query = (select(InventarioItem.ubicacion_id, producto, func.sum(InventarioItem.cantidad))
+             .group_by(InventarioItem.ubicacion_id, producto))
+    return {(u, p): int(c) for u, p, c in db.execute(query) if c}
+
+def _totales_producto(stock: dict) -> dict:
+    totales = defaultdict(int)
+    for (_, producto_id), cantidad in stock.items():
+        if producto_id != SIN_PRODUCTO:
+            totales[producto_id] += cantidad
+    return {producto_id: cantidad for producto_id, cantidad in totales.items() if cantidad != 0}
+
+def _differences(origen: str, guardado: dict, esperado: dict) -> list[tuple]:
+    return [(origen, key, guardado.get(key, 0), esperado.get(key, 0))
+            for key in sorted(set(guardado) | set(esperado)) if guardado.get(key, 0) != esperado.get(key, 0)]
+
+def reconcile_stock(db: Session, fix: bool = False) -> list[tuple]:
+    """
+    Compara stock_ubicaciones e inventario.cantidad con un recorrido completo del libro, y el libro con
+    las cantidades actuales de los ítems. Retorna las diferencias como (origen, clave, guardado, esperado),
+    con origen 'stock', 'inventario' o 'items'. Con fix=True reescribe stock_ubicaciones e inventario.cantidad
+    desde el libro (y hace commit); las diferencias 'items' indican cambios hechos fuera del libro.
+    """
+    libro = {key: c for key, c in _replay(db, {}, 0).items() if c != 0}
+    stock = get_stock_actual(db)
+    inventario = {p: c for p, c in db.execute(select(Inventario.producto_id, Inventario.cantidad)) if c != 0}
+
+    differences = (_differences("stock", stock, libro)
+                   + _differences("inventario", inventario, _totales_producto(libro))
+                   + _differences("items", libro, _stock_items(db)))
+
+    if fix and any(origen != "items" for origen, *_ in differences):
+        db.execute(delete(StockUbicacion))
+        if libro:
+            db.execute(insert(StockUbicacion), [
+                dict(ubicacion_id=u, producto_id=p, cantidad=c) for (u, p), c in sorted(libro.items())
+            ])
+        db.execute(update(Inventario).values(cantidad=0))
+        upsert_increments(db, Inventario, ("producto_id",), [
+            dict(producto_id=p, cantidad=c) for p, c in sorted(_totales_producto(libro).items())
+        ])
+        db.commit()
+    return differences
+
+def sync_stock(db: Session):
+    """
+    Inicia el libro en bases anteriores a él: si no tiene movimientos pero hay ítems, registra un alta
+    por ítem (con su fecha de alta, su ubicación y cantidad actuales) con un INSERT ... SELECT y
+    construye las existencias.
+    """
+    if db.query(MovimientoInventario.id).first() is not None:
+        return
+    if db.query(InventarioItem.id).first() is None:
+        return
+    I = InventarioItem
+    db.execute(insert(MovimientoInventario).from_select(
+        ["fecha", "tipo", "item_id", "producto_id", "ubicacion_destino_id", "cantidad", "usuario_id"],
+        select(I.fecha_alta, literal("alta"), I.id, func.coalesce(I.producto_asociado_id, SIN_PRODUCTO),
+               I.ubicacion_id, I.cantidad, I.dado_de_alta_por_id).order_by(I.fecha_alta, I.id)
+    ))
+    db.commit()
+    reconcile_stock(db, fix=True)
@@ -1,25 +1,51 @@
 # utils/ordenes_trabajo.py
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func, inspect
+import time
+import threading
+from collections import namedtuple
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, inspect, select
 from datetime import datetime
-from models import OrdenTrabajo, Usuario, Activo, ItemOrden, Producto
+from models import OrdenTrabajo, Usuario, Activo, ItemOrden, Producto, SEQ_NUMERO_ORDEN
 from utils.database import get_db
+from utils.secuencias import next_value, peek_next
+from utils.carga_masiva import insert_rows
+from utils.arbol_activos import get_arbol_activos, invalidate_arbol_activos, paths_for
+from utils.busqueda import search_activos, register_in_search_index
+from utils.agregados import record_orden, record_ordenes, record_orden_estado_change
+from utils.analitica_ordenes import ESTADOS_CERRADOS, record_orden_creada, record_ordenes_creadas, record_orden_estado
+from utils.reservas_stock import reserve_lineas, release_lineas
+from utils.indice_tags import DEFAULT_TAG_LIMIT, get_indice_tags, add_to_indice_tags
+from utils.jerarquia import (
+    add_activo_to_clausura, get_descendant_ids_from_clausura, get_descendant_ids_by_level,
+    set_activo_path, subtree_condition
+)
 
-# Constante para el número inicial de órdenes
-INITIAL_ORDER_NUMBER = 10000
+# Constante para el número inicial de órdenes (inicio de la secuencia)
+INITIAL_ORDER_NUMBER = SEQ_NUMERO_ORDEN.start
+
+# Segundos que se reutilizan las opciones de un nivel de la cascada (recoge altas hechas desde otros procesos)
+CHILDREN_CACHE_TTL = 300
+
+# Opciones de un nivel de la cascada, listas para un selectbox: etiquetas "nombre (tipo)" e IDs paralelos
+OpcionesNivel = namedtuple("OpcionesNivel", ["labels", "ids"])
+
+# Orden lista para insertar en lote; tiene los atributos que usan los agregados y los hechos diarios
+FilaOrden = namedtuple("FilaOrden", [
+    "numero_orden", "titulo", "descripcion", "estado", "criticidad", "fecha_creacion", "fecha_actualizacion",
+    "fecha_limite", "ubicacion_id", "generado_por_id", "asignado_a_id", "campana"
+], defaults=(None,))
+FILA_ITEM_COLUMNAS = ("orden_id", "producto_id", "nombre_item", "cantidad", "precio_unitario_actual")
+
+_children_cache = {} # (parent_id, for_module) -> (vencimiento, OpcionesNivel)
+_children_cache_lock = threading.Lock()
 
 def get_next_order_number(db: Session) -> str:
     """
-    Genera el siguiente número de orden de trabajo.
-    Busca el último número de orden y le suma 1. Si no hay órdenes, usa INITIAL_ORDER_NUMBER.
+    Muestra el siguiente número de orden de trabajo sin consumirlo.
+    La asignación real ocurre en create_orden_trabajo a partir de la secuencia.
     """
-    last_order = db.query(OrdenTrabajo).order_by(OrdenTrabajo.id.desc()).first()
-    if last_order and last_order.numero_orden.isdigit():
-        next_num = int(last_order.numero_orden) + 1
-    else:
-        next_num = INITIAL_ORDER_NUMBER
-    return str(next_num)
+    return str(peek_next(db, "numero_orden"))
 
 def create_orden_trabajo(
     db: Session,
@@ -31,12 +57,15 @@ def create_orden_trabajo(
     ubicacion_id: int,
     generado_por_id: int,
     asignado_a_id: int = None,
-    items_orden: list = None
+    items_orden: list = None,
+    reservar_stock: bool = False
 ):
     """
     Crea una nueva orden de trabajo con todos los campos.
+    Con reservar_stock=True reserva en inventario las unidades de sus ítems en la misma transacción
+    (ver utils/reservas_stock.py); si falta stock no crea la orden y lanza ValueError.
     """
-    numero_orden = get_next_order_number(db)
+    numero_orden = str(next_value(db, "numero_orden"))
 
     new_orden = OrdenTrabajo(
         numero_orden=numero_orden,
@@ -54,42 +83,141 @@ def create_orden_trabajo(
     db.add(new_orden)
     db.flush() 
 
-    if items_orden:
-        for item_data in items_orden:
-            producto = db.query(Producto).filter(Producto.id == item_data["producto_id"]).first()
-            if not producto:
-                raise ValueError(f"Producto con ID {item_data['producto_id']} no encontrado.")
-            
-            item = ItemOrden(
-                orden_id=new_orden.id,
-                producto_id=item_data["producto_id"],
-                nombre_item=item_data.get("nombre_item", producto.nombre),
-                cantidad=item_data["cantidad"],
-                precio_unitario_actual=producto.precio_unitario
-            )
-            db.add(item)
-    
+    lineas = []
+    for producto_id, nombre_item, cantidad, precio in resolve_items_orden(db, items_orden or []):
+        lineas.append(ItemOrden(
+            orden_id=new_orden.id,
+            producto_id=producto_id,
+            nombre_item=nombre_item,
+            cantidad=cantidad,
+            precio_unitario_actual=precio
+        ))
+    db.add_all(lineas)
+
+    record_orden(db, new_orden) # Agregados de informes, en la misma transacción
+    record_orden_creada(db, new_orden)
+    record_orden_estado(db, new_orden, None, estado, cuando=new_orden.fecha_creacion)
+    if reservar_stock and lineas:
+        # Al final de la transacción: las filas de inventario quedan bloqueadas lo menos posible
+        faltantes = reserve_lineas(db, lineas)
+        if faltantes:
+            db.rollback()
+            nombres = {linea.producto_id: linea.nombre_item for linea in lineas}
+            raise ValueError("Stock insuficiente: " + ", ".join(
+                f"{nombres[producto_id]} (solicitado {solicitado}, disponible {max(disponible, 0)})"
+                for producto_id, solicitado, disponible in faltantes
+            ))
     db.commit()
     db.refresh(new_orden)
     return new_orden
 
-def get_ordenes_trabajo(db: Session, estado: str = None):
+def resolve_items_orden(db: Session, items_orden: list) -> list[tuple]:
     """
-    Obtiene todas las órdenes de trabajo, opcionalmente filtradas por estado.
+    Resuelve los ítems de una orden ({producto_id, cantidad, nombre_item opcional}) con una sola consulta
+    de productos. Retorna [(producto_id, nombre_item, cantidad, precio_unitario)].
+    """
+    ids = {item["producto_id"] for item in items_orden}
+    productos = {p.id: p for p in db.query(Producto).filter(Producto.id.in_(ids))} if ids else {}
+    resueltos = []
+    for item in items_orden:
+        producto = productos.get(item["producto_id"])
+        if producto is None:
+            raise ValueError(f"Producto con ID {item['producto_id']} no encontrado.")
+        resueltos.append((producto.id, item.get("nombre_item", producto.nombre), item["cantidad"], producto.precio_unitario))
+    return resueltos
+
+def insert_ordenes(db: Session, ordenes: list, items: list = None) -> int:
     """
+    Inserta un lote de FilaOrden ya numeradas (ver reserve_block) con insert_rows (COPY en PostgreSQL),
+    añade a cada una los ítems resueltos 'items' (ver resolve_items_orden) y suma el lote a los agregados
+    y a los hechos diarios. No hace commit. Retorna la cantidad de ítems insertados.
+    """
+    conn = db.connection()
+    insert_rows(conn, OrdenTrabajo.__table__, FilaOrden._fields, ordenes)
+    total_items = 0
+    if items:
+        id_por_numero = dict(db.execute(
+            select(OrdenTrabajo.numero_orden, OrdenTrabajo.id)
+            .where(OrdenTrabajo.numero_orden.in_([orden.numero_orden for orden in ordenes]))
+        ).all())
+        total_items = insert_rows(conn, ItemOrden.__table__, FILA_ITEM_COLUMNAS, [
+            (id_por_numero[orden.numero_orden], producto_id, nombre_item, cantidad, precio)
+            for orden in ordenes
+            for producto_id, nombre_item, cantidad, precio in items
+        ])
+    record_ordenes(db, ordenes) # Agregados de informes, en la misma transacción
+    record_ordenes_creadas(db, ordenes)
+    return total_items
+
+def _ordenes_query(db: Session, estado: str = None, ubicacion_id_filter: int = None):
     query = db.query(OrdenTrabajo).order_by(OrdenTrabajo.fecha_creacion.desc())
     if estado:
         query = query.filter(OrdenTrabajo.estado == estado)
-    return query.all()
+    if ubicacion_id_filter:
+        query = query.filter(subtree_condition(db, OrdenTrabajo.ubicacion_id, ubicacion_id_filter))
+    return query
+
+def get_ordenes_trabajo(db: Session, estado: str = None, ubicacion_id_filter: int = None):
+    """
+    Obtiene todas las órdenes de trabajo, opcionalmente filtradas por estado
+    y por ubicación (incluyendo todos sus descendientes).
+    """
+    return _ordenes_query(db, estado, ubicacion_id_filter).all()
+
+def get_ordenes_listado(db: Session, estado: str = None, ubicacion_id_filter: int = None) -> list[dict]:
+    """
+    Obtiene las órdenes de trabajo listas para mostrar en una tabla, con un número constante de consultas:
+    creador y asignado se cargan en la misma consulta (JOIN) y las ubicaciones se resuelven
+    en lote contra el árbol de activos en memoria.
+    Para órdenes sobre un Equipo, 'ubicacion' es la ruta de su padre y 'activo_final' el nombre del equipo.
+    """
+    ordenes = _ordenes_query(db, estado, ubicacion_id_filter).options(
+        joinedload(OrdenTrabajo.generado_por),
+        joinedload(OrdenTrabajo.asignado_a)
+    ).all()
+
+    # paths_for recarga el árbol una vez si alguna ubicación es más nueva que la instantánea
+    paths = paths_for(db, [orden.ubicacion_id for orden in ordenes])
+    arbol = get_arbol_activos(db)
+
+    listado = []
+    for orden in ordenes:
+        ubicacion = paths.get(orden.ubicacion_id, "N/A")
+        activo_final = None
+        if arbol.tipo(orden.ubicacion_id) == "Equipo":
+            activo_final = arbol.nombre(orden.ubicacion_id)
+            equipo_parent_id = arbol.parent_id(orden.ubicacion_id)
+            ubicacion = arbol.path(equipo_parent_id) if equipo_parent_id else "N/A"
+
+        listado.append({
+            "id": orden.id,
+            "numero_orden": orden.numero_orden,
+            "titulo": orden.titulo,
+            "estado": orden.estado,
+            "criticidad": orden.criticidad,
+            "ubicacion": ubicacion,
+            "activo_final": activo_final,
+            "generado_por": orden.generado_por.nombre_usuario if orden.generado_por else None,
+            "asignado_a": orden.asignado_a.nombre_usuario if orden.asignado_a else None,
+            "fecha_creacion": orden.fecha_creacion,
+            "fecha_limite": orden.fecha_limite,
+        })
+    return listado
 
 def update_orden_estado(db: Session, orden_id: int, new_estado: str):
     """
-    Actualiza el estado de una orden de trabajo.
+    Actualiza el estado de una orden de trabajo. Al cerrarla (Completada o Cancelada) libera
+    el stock que sus ítems aún tuvieran reservado.
     """
     orden = db.query(OrdenTrabajo).filter(OrdenTrabajo.id == orden_id).first()
     if orden:
+        now = datetime.utcnow()
+        if new_estado in ESTADOS_CERRADOS and orden.estado not in ESTADOS_CERRADOS:
+            release_lineas(db, [linea for linea in orden.items if linea.cantidad_reservada])
+        record_orden_estado_change(db, orden.estado, new_estado)
+        record_orden_estado(db, orden, orden.estado, new_estado, cuando=now)
         orden.estado = new_estado
-        orden.fecha_actualizacion = datetime.utcnow()
+        orden.fecha_actualizacion = now
         db.commit()
         db.refresh(orden)
         return orden
@@ -123,8 +251,15 @@ def create_activo(db: Session, nombre: str, tipo: str, descripcion: str = None,
     """
     new_activo = Activo(nombre=nombre, tipo=tipo, descripcion=descripcion, parent_id=parent_id)
     db.add(new_activo)
+    db.flush()
+    set_activo_path(db, new_activo)
+    add_activo_to_clausura(db, new_activo.id, parent_id)
     db.commit()
     db.refresh(new_activo)
+    invalidate_arbol_activos()
+    register_in_search_index("activos", new_activo.id, new_activo.nombre, new_activo.descripcion)
+    add_to_indice_tags(new_activo.id, new_activo.nombre)
+    invalidate_children_of(parent_id)
     return new_activo
 
 def get_activos(db: Session, parent_id: int = None, for_module: str = None):
@@ -151,59 +286,140 @@ def get_activos(db: Session, parent_id: int = None, for_module: str = None):
             
     return query.order_by(Activo.nombre).all()
 
+def children_of(db: Session, parent_id: int = None, for_module: str = None) -> OpcionesNivel:
+    """
+    Opciones de un nivel de la cascada de ubicaciones: los hijos de 'parent_id' (o el nivel superior
+    si es None) con el mismo filtro que get_activos. Se memorizan por proceso durante CHILDREN_CACHE_TTL
+    segundos y create_activo invalida el nivel donde agrega, así que los reruns no consultan la base de datos.
+    """
+    key = (parent_id, for_module)
+    cached = _children_cache.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    activos = get_activos(db, parent_id=parent_id, for_module=for_module)
+    opciones = OpcionesNivel(
+        labels=tuple(f"{a.nombre} ({a.tipo})" for a in activos),
+        ids=tuple(a.id for a in activos)
+    )
+    with _children_cache_lock:
+        _children_cache[key] = (time.monotonic() + CHILDREN_CACHE_TTL, opciones)
+    return opciones
+
+def invalidate_children_of(parent_id: int = None):
+    """
+    Descarta las opciones memorizadas del nivel 'parent_id' (para todos los módulos).
+    """
+    with _children_cache_lock:
+        for key in [key for key in _children_cache if key[0] == parent_id]:
+            del _children_cache[key]
+
 def get_activo_by_id(db: Session, activo_id: int):
     """
     Obtiene un activo por su ID.
     """
     return db.query(Activo).filter(Activo.id == activo_id).first()
 
+def _root_allowed_for_module(root_tipo: str, for_module: str = None) -> bool:
+    # Mismo criterio que get_activos para el nivel superior de cada módulo
+    if for_module == 'ordenes':
+        return root_tipo not in ('Centro de Almacenamiento', 'Centro de Pruebas', 'Estante')
+    if for_module == 'inventario':
+        return root_tipo in ('Centro de Almacenamiento', 'Centro de Pruebas')
+    return True
+
+def find_activos_by_tag_prefix(db: Session, prefix: str, limit: int = DEFAULT_TAG_LIMIT, for_module: str = None) -> list[dict]:
+    """
+    Autocompletado de tags: activos cuyo nombre empieza por 'prefix' (ej: P01-HSV-C042-M1),
+    resueltos desde el índice de tags y el árbol en memoria, sin consultas a la base de datos.
+    Las coincidencias exactas van primero. Retorna dicts con id, nombre, tipo y ruta.
+    - for_module: mismo filtro de sitios de nivel superior que get_activos.
+    """
+    if not prefix or not prefix.strip():
+        return []
+    indice = get_indice_tags(db)
+    arbol = get_arbol_activos(db)
+
+    exact_ids = indice.exact(prefix)
+    candidate_ids = exact_ids + [activo_id for activo_id in indice.prefix(prefix) if activo_id not in exact_ids]
+
+    results = []
+    for activo_id in candidate_ids:
+        chain = arbol.ancestor_ids(activo_id)
+        if not chain or not _root_allowed_for_module(arbol.tipo(chain[0]), for_module):
+            continue
+        results.append({
+            "id": activo_id,
+            "nombre": arbol.nombre(activo_id),
+            "tipo": arbol.tipo(activo_id),
+            "ruta": arbol.path(activo_id),
+        })
+        if len(results) >= limit:
+            break
+    return results
+
+def find_activo_ids_by_tag(db: Session, tag: str, for_module: str = None) -> list[int]:
+    """
+    IDs de los activos cuyo tag es exactamente 'tag' (sin distinguir mayúsculas), con el filtro de sitios
+    de 'for_module'. Solo usa el índice de tags y el árbol en memoria (para resolver tags en lote).
+    """
+    if not tag or not tag.strip():
+        return []
+    arbol = get_arbol_activos(db)
+    ids = []
+    for activo_id in get_indice_tags(db).exact(tag):
+        chain = arbol.ancestor_ids(activo_id)
+        if chain and _root_allowed_for_module(arbol.tipo(chain[0]), for_module):
+            ids.append(activo_id)
+    return ids
+
+def resolve_activo_tag(db: Session, tag: str, for_module: str = None):
+    """
+    Resuelve un tag completo (ej: P01-HSV-C042-M117) a su Activo.
+    Retorna None si no existe o si es ambiguo (varios activos con el mismo nombre).
+    """
+    matches = [m for m in find_activos_by_tag_prefix(db, tag, for_module=for_module) if m["nombre"].lower() == tag.strip().lower()]
+    if len(matches) != 1:
+        return None
+    return get_activo_by_id(db, matches[0]["id"])
+
+def get_activo_ancestor_ids(db: Session, activo_id: int) -> list[int]:
+    """
+    IDs desde la raíz hasta el activo (inclusive), según el árbol en memoria.
+    """
+    return get_arbol_activos(db).ancestor_ids(activo_id)
+
 def get_activo_full_path(db: Session, activo_id: int):
     """
     Obtiene la ruta completa de un activo (ej: Planta A > Almacén 1 > Rack 2).
+    Se resuelve contra la instantánea del árbol en memoria, sin consultas por nivel.
     """
-    path_parts = []
-    current_activo = get_activo_by_id(db, activo_id)
-    while current_activo:
-        path_parts.insert(0, current_activo.nombre)
-        current_activo = current_activo.parent
-    return " > ".join(path_parts)
+    if activo_id is None:
+        return ""
+    return paths_for(db, [activo_id]).get(activo_id, "")
 
 def find_activos_by_name_or_tag(db: Session, query_string: str, parent_id: int = None, activo_type: str = None) -> list[Activo]:
     """
-    Busca activos por su nombre o tag (coincidencia parcial e insensible a mayúsculas/minúsculas).
-    Opcionalmente, puede filtrar por parent_id y/o tipo de activo.
+    Busca activos por su nombre, tag o descripción (coincidencia parcial e insensible a mayúsculas/minúsculas),
+    ordenados por relevancia. Opcionalmente, puede filtrar por parent_id y/o tipo de activo.
     Retorna una lista de Activo objects.
     """
     if not query_string:
         return []
-    
-    query = db.query(Activo).filter(Activo.nombre.ilike(f'%{query_string}%'))
-    
-    if parent_id is not None:
-        query = query.filter(Activo.parent_id == parent_id)
-    
-    if activo_type:
-        query = query.filter(Activo.tipo == activo_type)
 
-    return query.limit(20).all()
+    return search_activos(db, query_string, limit=20, parent_id=parent_id, activo_type=activo_type)
 
 def get_all_descendant_activo_ids(db: Session, parent_id: int) -> list[int]:
     """
     Obtiene una lista de todos los IDs de activos descendientes (incluyendo el parent_id)
     dada una ubicación padre.
+    Usa la tabla de clausura (una sola consulta); si el activo aún no figura en ella
+    (clausura sin reconstruir), recorre la jerarquía nivel por nivel.
     """
     if parent_id is None:
         return []
 
-    descendants_ids = set()
-    queue = [parent_id] # Usamos una cola para búsqueda en anchura
-
-    while queue:
-        current_id = queue.pop(0)
-        if current_id not in descendants_ids:
-            descendants_ids.add(current_id)
-            # Encuentra hijos directos
-            children = db.query(Activo.id).filter(Activo.parent_id == current_id).all()
-            for child_id_tuple in children:
-                queue.append(child_id_tuple[0])
-    return list(descendants_ids)
+    descendants_ids = get_descendant_ids_from_clausura(db, parent_id)
+    if descendants_ids:
+        return descendants_ids
+    return get_descendant_ids_by_level(db, parent_id)
@@ -0,0 +1,292 @@
+# utils/planes_mantenimiento.py
+
+import os
+import calendar
+import threading
+from datetime import datetime, timedelta
+from collections import namedtuple
+from sqlalchemy import select, update, bindparam, func
+from sqlalchemy.orm import Session
+from models import PlanMantenimiento, OrdenTrabajo
+from utils.secuencias import reserve_block
+from utils.ordenes_trabajo import FilaOrden, create_orden_trabajo, insert_ordenes
+from utils.campanas import create_campaign
+
+UNIDADES = ("dias", "meses")
+
+# Planes leídos por consulta en cada pasada del planificador
+PLANES_LOTE = int(os.environ.get("PLANES_LOTE", "500"))
+# Segundos entre pasadas del hilo del planificador
+PLANES_TICK_SEGUNDOS = int(os.environ.get("PLANES_TICK_SEGUNDOS", "60"))
+# Si es "1", la aplicación arranca el planificador en un hilo de fondo (si no, usar scripts/ejecutar_planes.py)
+PLANES_EN_SEGUNDO_PLANO = os.environ.get("PLANES_EN_SEGUNDO_PLANO", "0") == "1"
+
+ResultadoPasada = namedtuple("ResultadoPasada", ["planes", "ordenes", "errores"])
+
+# Un plan vencido tal como se leyó. El período se toma contra este vencimiento y no contra el objeto ORM:
+# un commit lo expira y al recargarlo podría traer el período siguiente, ya avanzado por otro planificador.
+PlanVencido = namedtuple("PlanVencido", [
+    "id", "titulo", "descripcion", "criticidad", "activo_id", "creado_por_id", "tipo_objetivo", "tipo_padre",
+    "intervalo", "unidad", "proximo_vencimiento"
+])
+
+def add_interval(fecha: datetime, intervalo: int, unidad: str) -> datetime:
+    """
+    Suma 'intervalo' días o meses a 'fecha'. En meses, el día se ajusta al último del mes
+    si no existe (ej: 31 de enero + 1 mes = 28/29 de febrero).
+    """
+    if unidad == "dias":
+        return fecha + timedelta(days=intervalo)
+    meses = fecha.month - 1 + intervalo
+    anio, mes = fecha.year + meses // 12, meses % 12 + 1
+    return fecha.replace(year=anio, month=mes, day=min(fecha.day, calendar.monthrange(anio, mes)[1]))
+
+def next_due_after(vencimiento: datetime, intervalo: int, unidad: str, ahora: datetime) -> datetime:
+    """
+    Primer vencimiento posterior a 'ahora' de la serie que empieza en 'vencimiento'.
+    Los períodos perdidos (ej: el planificador estuvo detenido) no generan órdenes atrasadas.
+    """
+    siguiente = add_interval(vencimiento, intervalo, unidad)
+    while siguiente <= ahora:
+        siguiente = add_interval(siguiente, intervalo, unidad)
+    return siguiente
+
+def create_plan(db: Session, nombre: str, titulo: str, descripcion: str, criticidad: str, activo_id: int,
+                intervalo: int, unidad: str, creado_por_id: int, tipo_objetivo: str = None, tipo_padre: str = None,
+                primer_vencimiento: datetime = None) -> PlanMantenimiento:
+    """
+    Crea un plan recurrente. Sin 'tipo_objetivo' genera una orden sobre el activo; con él, una por cada
+    activo de ese tipo en su subárbol (como una campaña). El primer período vence en 'primer_vencimiento'
+    (ahora, por defecto).
+    """
+    if unidad not in UNIDADES:
+        raise ValueError(f"Unidad de intervalo inválida: {unidad}")
+    if intervalo < 1:
+        raise ValueError("El intervalo debe ser de al menos 1.")
+    plan = PlanMantenimiento(
+        nombre=nombre, titulo=titulo, descripcion=descripcion, criticidad=criticidad, activo_id=activo_id,
+        tipo_objetivo=tipo_objetivo or None, tipo_padre=tipo_padre or None, intervalo=intervalo, unidad=unidad,
+        proximo_vencimiento=primer_vencimiento or datetime.utcnow(), creado_por_id=creado_por_id
+    )
+    db.add(plan)
+    db.commit()
+    db.refresh(plan)
+    return plan
+
+def get_planes(db: Session, habilitado: bool = None) -> list[PlanMantenimiento]:
+    """
+    Obtiene los planes ordenados por próximo vencimiento, opcionalmente solo habilitados o deshabilitados.
+    """
+    query = db.query(PlanMantenimiento).order_by(PlanMantenimiento.proximo_vencimiento)
+    if habilitado is not None:
+        query = query.filter(PlanMantenimiento.habilitado == habilitado)
+    return query.all()
+
+def set_plan_habilitado(db: Session, plan_id: int, habilitado: bool):
+    """
+    Habilita o pausa un plan.
+    """
+    db.execute(update(PlanMantenimiento).where(PlanMantenimiento.id == plan_id).values(habilitado=habilitado))
+    db.commit()
+
+def get_due_plans(db: Session, ahora: datetime, limit: int = PLANES_LOTE, excluir=()) -> list[PlanMantenimiento]:
+    """
+    Planes habilitados con vencimiento <= ahora, los más atrasados primero.
+    Lee solo las filas vencidas (rango sobre el índice), no todos los planes.
+    """
+    query = (select(PlanMantenimiento)
+             .where(PlanMantenimiento.habilitado == True, PlanMantenimiento.proximo_vencimiento <= ahora)
+             .order_by(PlanMantenimiento.proximo_vencimiento).limit(limit))
+    if excluir:
+        query = query.where(PlanMantenimiento.id.notin_(excluir))
+    return list(db.execute(query).scalars())
+
+def _claim_period(db: Session, plan_id: int, vencimiento: datetime, siguiente: datetime, ordenes: int = 0) -> bool:
+    # UPDATE condicionado al vencimiento leído: si otro proceso ya tomó este período no cambia ninguna fila,
+    # así cada período genera sus órdenes una sola vez aunque haya varios planificadores. No hace commit.
+    result = db.execute(
+        update(PlanMantenimiento)
+        .where(PlanMantenimiento.id == plan_id, PlanMantenimiento.proximo_vencimiento == vencimiento)
+        .values(proximo_vencimiento=siguiente, ultimo_periodo=vencimiento,
+                ordenes_generadas=PlanMantenimiento.ordenes_generadas + ordenes)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def _vencido(plan) -> PlanVencido:
+    return PlanVencido(*(getattr(plan, campo) for campo in PlanVencido._fields))
+
+def _clave_campana(plan) -> str:
+    # Una clave por plan y período: el reintento de un período fallido no duplica sus órdenes
+    return f"plan-{plan.id}-{plan.proximo_vencimiento.isoformat()}"
+
+def _titulo(plan: PlanMantenimiento) -> str:
+    return f"{plan.titulo} ({plan.proximo_vencimiento.strftime('%Y-%m-%d')})"
+
+def run_plan(db: Session, plan: PlanMantenimiento, ahora: datetime) -> int:
+    """
+    Genera las órdenes del período vencido de un plan y lo avanza al siguiente vencimiento.
+    El avance y las órdenes se confirman en la misma transacción (en campañas, el avance se confirma
+    con la reserva de números; si un lote falla, el período se devuelve para que la próxima pasada lo
+    reintente, y la clave del período evita repetir las órdenes ya creadas). Retorna las órdenes creadas,
+    o None si otro proceso ya tomó el período o si el plan todavía no vence (ej: 'plan' es un objeto que
+    se recargó después de que otro lo avanzara).
+    Conviene pasar el PlanVencido capturado al leer los planes vencidos.
+    """
+    plan = _vencido(plan)
+    if plan.proximo_vencimiento > ahora:
+        return None
+    siguiente = next_due_after(plan.proximo_vencimiento, plan.intervalo, plan.unidad, ahora)
+    titulo = _titulo(plan)
+    if not plan.tipo_objetivo:
+        if not _claim_period(db, plan.id, plan.proximo_vencimiento, siguiente, ordenes=1):
+            db.rollback()
+            return None
+        create_orden_trabajo(db, titulo, plan.descripcion, "Pendiente", plan.criticidad, siguiente,
+                             plan.activo_id, plan.creado_por_id)
+        return 1
+
+    if not _claim_period(db, plan.id, plan.proximo_vencimiento, siguiente):
+        db.rollback()
+        return None
+    clave = _clave_campana(plan)
+    try:
+        creadas = create_campaign(db, plan.activo_id, plan.tipo_objetivo, titulo, plan.descripcion, plan.criticidad,
+                                  siguiente, plan.creado_por_id, tipo_padre=plan.tipo_padre, clave=clave).ordenes
+    except Exception:
+        db.rollback()
+        db.execute(update(PlanMantenimiento)
+                   .where(PlanMantenimiento.id == plan.id, PlanMantenimiento.proximo_vencimiento == siguiente)
+                   .values(proximo_vencimiento=plan.proximo_vencimiento))
+        db.commit()
+        raise
+    # Todas las órdenes del período, también las de intentos anteriores que fallaron a mitad
+    del_periodo = db.execute(select(func.count()).select_from(OrdenTrabajo).where(OrdenTrabajo.campana == clave)).scalar()
+    db.execute(update(PlanMantenimiento).where(PlanMantenimiento.id == plan.id)
+               .values(ordenes_generadas=PlanMantenimiento.ordenes_generadas + del_periodo))
+    db.commit()
+    return creadas
+
+def _claim_periods(db: Session, reclamos: list) -> bool:
+    # Toma de un lote de períodos [(plan_id, vencimiento, siguiente)] en un solo executemany del mismo UPDATE condicionado.
+    # Retorna False (sin hacer rollback) si el motor no informa las filas de un executemany o si alguna
+    # no cambió: el llamador deshace y toma los períodos uno por uno.
+    if not db.get_bind().dialect.supports_sane_multi_rowcount:
+        return False
+    table = PlanMantenimiento.__table__
+    stmt = (update(table)
+            .where(table.c.id == bindparam("b_id"), table.c.proximo_vencimiento == bindparam("b_vencimiento"))
+            .values(proximo_vencimiento=bindparam("b_siguiente"), ultimo_periodo=bindparam("b_vencimiento"),
+                    ordenes_generadas=table.c.ordenes_generadas + 1))
+    result = db.connection().execute(stmt, [
+        {"b_id": plan_id, "b_vencimiento": vencimiento, "b_siguiente": siguiente}
+        for plan_id, vencimiento, siguiente in reclamos
+    ])
+    return result.rowcount == len(reclamos)
+
+def run_single_plans(db: Session, planes: list, ahora: datetime) -> tuple:
+    """
+    Genera en una sola transacción las órdenes de un lote de planes de un solo activo: toma los períodos
+    (un executemany), reserva los números en bloque e inserta las órdenes con insert_ordenes.
+    Retorna (planes ejecutados, IDs de los planes cuyo período ya había tomado otro proceso).
+    """
+    datos = [(plan.id, _titulo(plan), plan.descripcion, plan.criticidad, plan.activo_id, plan.creado_por_id,
+              plan.proximo_vencimiento, next_due_after(plan.proximo_vencimiento, plan.intervalo, plan.unidad, ahora))
+             for plan in planes]
+    omitidos = []
+    if not _claim_periods(db, [(dato[0], dato[6], dato[7]) for dato in datos]):
+        db.rollback()
+        tomados = []
+        for dato in datos:
+            plan_id, *_, vencimiento, siguiente = dato
+            if _claim_period(db, plan_id, vencimiento, siguiente, ordenes=1):
+                tomados.append(dato)
+            else:
+                omitidos.append(plan_id)
+        datos = tomados
+    creacion = datetime.utcnow()
+    filas = [
+        FilaOrden(str(numero), titulo, descripcion, "Pendiente", criticidad, creacion, creacion,
+                  siguiente, activo_id, creado_por_id, None)
+        for numero, (_, titulo, descripcion, criticidad, activo_id, creado_por_id, _, siguiente)
+        in zip(reserve_block(db, "numero_orden", len(datos)), datos)
+    ]
+    if filas:
+        insert_ordenes(db, filas)
+    db.commit()
+    return len(filas), omitidos
+
+def run_due_plans(db: Session, ahora: datetime = None, limit: int = PLANES_LOTE) -> ResultadoPasada:
+    """
+    Una pasada del planificador: procesa, en lotes de 'limit', todos los planes vencidos a 'ahora'.
+    Un plan que falla se informa y se reintenta en la próxima pasada; no detiene a los demás.
+    """
+    ahora = ahora or datetime.utcnow()
+    planes = ordenes = 0
+    fallidos = []
+    omitidos = [] # Períodos tomados por otro proceso entre la lectura y el UPDATE
+    while True:
+        # Se capturan antes de cualquier commit, que expira los objetos leídos
+        due = [_vencido(plan) for plan in get_due_plans(db, ahora, limit, excluir=fallidos + omitidos)]
+        if not due:
+            break
+        # Planes de un solo activo: todo el lote en una transacción; si falla, uno por uno para aislar el error.
+        campanas = [plan for plan in due if plan.tipo_objetivo]
+        simples = [plan for plan in due if not plan.tipo_objetivo]
+        if simples:
+            try:
+                ejecutados, tomados = run_single_plans(db, simples, ahora)
+                planes += ejecutados
+                ordenes += ejecutados
+                omitidos.extend(tomados)
+                simples = []
+            except Exception:
+                db.rollback()
+        for plan in campanas + simples:
+            try:
+                creadas = run_plan(db, plan, ahora)
+            except Exception as e:
+                db.rollback()
+                print(f"Error al ejecutar el plan de mantenimiento {plan.id}: {e}")
+                fallidos.append(plan.id)
+                continue
+            if creadas is None:
+                omitidos.append(plan.id)
+            else:
+                ordenes += creadas
+                planes += 1
+        db.expire_all()
+    return ResultadoPasada(planes, ordenes, len(fallidos))
+
+# --- HILO DE FONDO ---
+
+_scheduler_thread = None
+_scheduler_stop = threading.Event()
+_scheduler_lock = threading.Lock()
+
+def _scheduler_loop(intervalo: int):
+    from utils.database import SessionLocal
+    while not _scheduler_stop.is_set():
+        db = SessionLocal()
+        try:
+            run_due_plans(db)
+        except Exception as e:
+            print(f"Error en el planificador de mantenimiento: {e}")
+        finally:
+            db.close()
+        _scheduler_stop.wait(intervalo)
+
+def start_scheduler(intervalo: int = PLANES_TICK_SEGUNDOS):
+    """
+    Arranca el planificador en un hilo de fondo, una sola vez por proceso.
+    """
+    global _scheduler_thread
+    with _scheduler_lock:
+        if _scheduler_thread is not None and _scheduler_thread.is_alive():
+            return
+        _scheduler_stop.clear()
+        _scheduler_thread = threading.Thread(target=_scheduler_loop, args=(intervalo,), name="planes-mantenimiento", daemon=True)
+        _scheduler_thread.start()
+
+def stop_scheduler():
+    _scheduler_stop.set()
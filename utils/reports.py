@@ -1,25 +1,46 @@
 # utils/reports.py
 
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from models import Inventario, OrdenTrabajo, Usuario, Producto # Asegúrate de importar Producto también
+from utils.agregados import METRICA_INVENTARIO, METRICA_ORDENES, get_agregado, get_agregados
 
 def get_inventario_stats(db: Session):
     """
-    Obtiene el total de items en inventario y el valor total.
+    Obtiene el total de items en inventario (suma de cantidades) y el valor total
+    (precio_estimado_usd * cantidad), leyendo la fila de totales de los agregados.
     """
-    total_items = db.query(func.sum(Inventario.cantidad)).scalar()
-    total_items = total_items if total_items is not None else 0
-    total_value = total_value if total_value is not None else 0
-
+    _, total_items, total_value = get_agregado(db, METRICA_INVENTARIO)
     return total_items, total_value
 
 def get_ordenes_by_status_count(db: Session):
     """
-    Cuenta el número de órdenes por estado.
+    Cuenta el número de órdenes por estado (desde los agregados, sin GROUP BY sobre las órdenes).
+    """
+    return [(estado, registros) for estado, registros, _, _ in get_agregados(db, METRICA_ORDENES, "estado")]
+
+def get_inventario_by_tipo(db: Session):
+    """
+    Items, unidades y valor del inventario por tipo de item.
     """
-    return db.query(OrdenTrabajo.estado, func.count(OrdenTrabajo.id)). \
-            group_by(OrdenTrabajo.estado).all()
+    return get_agregados(db, METRICA_INVENTARIO, "tipo_item")
+
+def get_inventario_by_ubicacion(db: Session, activo_ids: list[int]) -> dict:
+    """
+    Items, unidades y valor del inventario en el subárbol de cada ubicación indicada.
+    Retorna {activo_id: (registros, unidades, valor)}.
+    """
+    rows = get_agregados(db, METRICA_INVENTARIO, "ubicacion", claves=activo_ids)
+    return {int(clave): (registros, unidades, valor) for clave, registros, unidades, valor in rows}
+
+def get_ordenes_by_dia(db: Session, dias: int = 30):
+    """
+    Órdenes creadas por día en los últimos 'dias' días (solo esas filas de la dimensión 'dia').
+    """
+    desde = (datetime.utcnow() - timedelta(days=dias)).date().isoformat()
+    # 'sin fecha' también es >= desde al comparar texto: se descarta aquí
+    return [(dia, registros) for dia, registros, _, _ in get_agregados(db, METRICA_ORDENES, "dia", desde=desde) if dia[:1].isdigit()]
 
 def get_users_with_most_orders(db: Session, limit: int = 5):
     """
@@ -30,4 +51,3 @@ def get_users_with_most_orders(db: Session, limit: int = 5):
             group_by(Usuario.nombre_usuario). \
             order_by(func.count(OrdenTrabajo.id).desc()). \
             limit(limit).all()
-
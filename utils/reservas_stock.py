@@ -0,0 +1,170 @@
+# utils/reservas_stock.py
+
+from collections import defaultdict
+from sqlalchemy import select, update, case, func, bindparam
+from sqlalchemy.orm import Session
+from models import Inventario, ItemOrden
+
+def _por_producto(lineas) -> dict:
+    """
+    Suma las líneas [(producto_id, cantidad)] por producto, ignorando las que no tienen producto o cantidad.
+    """
+    totales = defaultdict(int)
+    for producto_id, cantidad in lineas:
+        if producto_id is not None and cantidad and cantidad > 0:
+            totales[producto_id] += cantidad
+    return dict(totales)
+
+def get_disponible(db: Session, producto_ids) -> dict:
+    """
+    Unidades disponibles (cantidad - reservado) de cada producto; 0 si no tiene fila en inventario.
+    """
+    producto_ids = list(producto_ids)
+    rows = dict(db.execute(
+        select(Inventario.producto_id, Inventario.cantidad - Inventario.reservado).where(Inventario.producto_id.in_(producto_ids))
+    ).all()) if producto_ids else {}
+    return {producto_id: rows.get(producto_id, 0) for producto_id in producto_ids}
+
+def reserve_stock(db: Session, cantidades: dict) -> list[tuple]:
+    """
+    Reserva {producto_id: unidades} de una vez, todo o nada. Cada producto es un UPDATE condicional
+    (reservado = reservado + n WHERE cantidad - reservado >= n): la condición se evalúa sobre la fila ya
+    bloqueada, así que dos sesiones no pueden tomar la misma última unidad y nunca hay que leer antes de
+    escribir. Solo se bloquea la fila de cada producto reservado, hasta el commit del llamador; los
+    productos se recorren en orden para que dos reservas de varias líneas no se bloqueen mutuamente.
+    En SQLite la misma sentencia es atómica porque las escrituras están serializadas.
+    Retorna [] si reservó todo; si no, deshace lo reservado en esta llamada y retorna los faltantes
+    [(producto_id, solicitado, disponible)]. No hace commit.
+    """
+    reservados = []
+    for producto_id, cantidad in sorted(cantidades.items()):
+        result = db.execute(
+            update(Inventario)
+            .where(Inventario.producto_id == producto_id, Inventario.cantidad - Inventario.reservado >= cantidad)
+            .values(reservado=Inventario.reservado + cantidad)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            release_stock(db, dict(reservados))
+            disponible = get_disponible(db, cantidades)
+            return [(p, n, disponible[p]) for p, n in sorted(cantidades.items()) if p == producto_id or disponible[p] < n]
+        reservados.append((producto_id, cantidad))
+    return []
+
+def release_stock(db: Session, cantidades: dict):
+    """
+    Libera {producto_id: unidades} reservadas (sin bajar de cero). No hace commit.
+    """
+    for producto_id, cantidad in sorted(cantidades.items()):
+        db.execute(
+            update(Inventario)
+            .where(Inventario.producto_id == producto_id)
+            .values(reservado=case((Inventario.reservado >= cantidad, Inventario.reservado - cantidad), else_=0))
+            .execution_options(synchronize_session=False)
+        )
+
+def lock_disponible(db: Session, producto_id: int, cantidad: int) -> bool:
+    """
+    Antes de que 'cantidad' unidades de un producto salgan del inventario (consumo o baja), comprueba que
+    no sean unidades reservadas: un UPDATE condicional sin cambios (WHERE cantidad - reservado >= n)
+    que evalúa la condición sobre la fila bloqueada y la mantiene bloqueada hasta el commit del llamador,
+    igual que reserve_stock. Retorna False si el disponible no alcanza. No hace commit.
+    """
+    result = db.execute(
+        update(Inventario)
+        .where(Inventario.producto_id == producto_id, Inventario.cantidad - Inventario.reservado >= cantidad)
+        .values(reservado=Inventario.reservado)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def reserve_lineas(db: Session, lineas: list) -> list[tuple]:
+    """
+    Reserva lo que falta de cada línea (ItemOrden) de una o varias órdenes con reserve_stock, sumando
+    las líneas del mismo producto, y lo anota en cantidad_reservada. Todo o nada; retorna los faltantes
+    como reserve_stock. No hace commit.
+    """
+    pendientes = [(linea, linea.cantidad - (linea.cantidad_reservada or 0)) for linea in lineas]
+    faltantes = reserve_stock(db, _por_producto((linea.producto_id, n) for linea, n in pendientes))
+    if not faltantes:
+        for linea, n in pendientes:
+            if linea.producto_id is not None and n > 0:
+                linea.cantidad_reservada = linea.cantidad
+    return faltantes
+
+def release_lineas(db: Session, lineas: list) -> int:
+    """
+    Libera lo reservado por las líneas indicadas. Retorna las unidades liberadas. No hace commit.
+    """
+    cantidades = _por_producto((linea.producto_id, linea.cantidad_reservada) for linea in lineas)
+    release_stock(db, cantidades)
+    for linea in lineas:
+        linea.cantidad_reservada = 0
+    return sum(cantidades.values())
+
+def _lineas_orden(db: Session, orden_ids) -> list:
+    return (db.query(ItemOrden).filter(ItemOrden.orden_id.in_(list(orden_ids)), ItemOrden.producto_id.is_not(None))
+            .order_by(ItemOrden.id).all())
+
+def reserve_ordenes(db: Session, orden_ids) -> list[tuple]:
+    """
+    Reserva el stock de todas las líneas de las órdenes indicadas en una sola transacción (todo o nada)
+    y hace commit si no faltó nada. Retorna los faltantes [(producto_id, solicitado, disponible)].
+    """
+    try:
+        faltantes = reserve_lineas(db, _lineas_orden(db, orden_ids))
+        if faltantes:
+            db.rollback()
+        else:
+            db.commit()
+        return faltantes
+    except Exception:
+        db.rollback()
+        raise
+
+def release_ordenes(db: Session, orden_ids) -> int:
+    """
+    Libera las reservas de las órdenes indicadas y hace commit. Retorna las unidades liberadas.
+    """
+    liberadas = release_lineas(db, [linea for linea in _lineas_orden(db, orden_ids) if linea.cantidad_reservada])
+    db.commit()
+    return liberadas
+
+def consume_reserva(db: Session, orden_id: int, producto_id: int, cantidad: int) -> int:
+    """
+    Al consumir unidades de un producto en una orden, descuenta hasta 'cantidad' de lo que esa orden
+    tenía reservado (las unidades salen del inventario, así que dejan de estar comprometidas).
+    Retorna las unidades descontadas de la reserva. No hace commit.
+    """
+    restante = cantidad
+    consumidas = 0
+    for linea in _lineas_orden(db, [orden_id]):
+        if linea.producto_id != producto_id or not linea.cantidad_reservada or restante <= 0:
+            continue
+        n = min(restante, linea.cantidad_reservada)
+        linea.cantidad_reservada -= n
+        restante -= n
+        consumidas += n
+    if consumidas:
+        release_stock(db, {producto_id: consumidas})
+    return consumidas
+
+def reconcile_reservas(db: Session, fix: bool = False) -> list[tuple]:
+    """
+    Compara inventario.reservado con la suma de cantidad_reservada de las líneas de órdenes.
+    Retorna las diferencias (producto_id, guardado, esperado); con fix=True corrige inventario.reservado
+    (y hace commit).
+    """
+    esperado = dict(db.execute(
+        select(ItemOrden.producto_id, func.sum(ItemOrden.cantidad_reservada))
+        .where(ItemOrden.producto_id.is_not(None), ItemOrden.cantidad_reservada > 0).group_by(ItemOrden.producto_id)
+    ).all())
+    guardado = dict(db.execute(select(Inventario.producto_id, Inventario.reservado).where(Inventario.reservado != 0)).all())
+    differences = [(p, guardado.get(p, 0), esperado.get(p, 0)) for p in sorted(set(esperado) | set(guardado))
+                   if guardado.get(p, 0) != esperado.get(p, 0)]
+    if fix and differences:
+        table = Inventario.__table__
+        db.execute(update(table).where(table.c.producto_id == bindparam("p")).values(reservado=bindparam("r")),
+                   [dict(p=p, r=e) for p, _, e in differences])
+        db.commit()
+    return differences
@@ -0,0 +1,97 @@
+# utils/secuencias.py
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, text, update, insert
+from models import Contador, OrdenTrabajo, InventarioItem, SEQ_NUMERO_ORDEN, SEQ_NUMERO_ITEM
+
+# Nombre lógico -> (secuencia de PostgreSQL, modelo, columna con los números ya emitidos)
+SECUENCIAS = {
+    "numero_orden": (SEQ_NUMERO_ORDEN, OrdenTrabajo, OrdenTrabajo.numero_orden),
+    "numero_item": (SEQ_NUMERO_ITEM, InventarioItem, InventarioItem.numero_item),
+}
+
+def _uses_native_sequences(db) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+def _last_issued_number(conn, nombre: str):
+    """
+    Último número emitido según los datos existentes (mismo criterio que la numeración anterior:
+    el de la última fila por ID). Retorna None si no hay filas o no es numérico.
+    """
+    _, model, column = SECUENCIAS[nombre]
+    last = conn.execute(select(column).order_by(model.id.desc()).limit(1)).scalar()
+    if last and last.isdigit():
+        return int(last)
+    return None
+
+def _initial_counter_value(conn, nombre: str) -> int:
+    seq = SECUENCIAS[nombre][0]
+    last = _last_issued_number(conn, nombre)
+    return last if last is not None else seq.start - 1
+
+def reserve_block(db: Session, nombre: str, cantidad: int) -> list[int]:
+    """
+    Reserva 'cantidad' números únicos de la secuencia indicada ('numero_orden' o 'numero_item').
+    En PostgreSQL usa nextval (sin bloqueos, puede dejar huecos si hay rollback).
+    En otros motores incrementa la fila del contador dentro de la transacción del llamador:
+    el UPDATE bloquea la fila (en SQLite, toma el bloqueo de escritura) hasta su commit,
+    por lo que dos sesiones nunca obtienen el mismo número. No hace commit.
+    """
+    if cantidad <= 0:
+        return []
+
+    if _uses_native_sequences(db):
+        seq = SECUENCIAS[nombre][0]
+        rows = db.execute(
+            text(f"SELECT nextval('{seq.name}') FROM generate_series(1, :cantidad)"),
+            {"cantidad": cantidad}
+        ).all()
+        return [row[0] for row in rows]
+
+    result = db.execute(
+        update(Contador).where(Contador.nombre == nombre).values(valor=Contador.valor + cantidad)
+    )
+    if result.rowcount == 0:
+        # Contador aún no inicializado (normalmente lo crea sync_secuencias al arrancar)
+        db.execute(insert(Contador).values(nombre=nombre, valor=_initial_counter_value(db, nombre) + cantidad))
+    valor = db.execute(select(Contador.valor).where(Contador.nombre == nombre)).scalar()
+    return list(range(valor - cantidad + 1, valor + 1))
+
+def next_value(db: Session, nombre: str) -> int:
+    """
+    Obtiene y consume el siguiente número de la secuencia.
+    """
+    return reserve_block(db, nombre, 1)[0]
+
+def peek_next(db: Session, nombre: str) -> int:
+    """
+    Retorna el próximo número que se entregaría, sin consumirlo (lectura de una sola fila).
+    Es orientativo: otra sesión puede consumirlo antes.
+    """
+    seq = SECUENCIAS[nombre][0]
+    if _uses_native_sequences(db):
+        last_value, is_called = db.execute(text(f"SELECT last_value, is_called FROM {seq.name}")).one()
+        return last_value + 1 if is_called else last_value
+
+    valor = db.execute(select(Contador.valor).where(Contador.nombre == nombre)).scalar()
+    if valor is None:
+        valor = _initial_counter_value(db, nombre)
+    return valor + 1
+
+def sync_secuencias(db: Session):
+    """
+    Alinea secuencias y contadores con los números ya existentes en los datos
+    (bases creadas con la numeración anterior). Es idempotente.
+    """
+    for nombre, (seq, _, _) in SECUENCIAS.items():
+        last = _last_issued_number(db, nombre)
+        if _uses_native_sequences(db):
+            if last is not None and last >= peek_next(db, nombre):
+                db.execute(text(f"SELECT setval('{seq.name}', :valor, true)"), {"valor": last})
+        else:
+            valor = db.execute(select(Contador.valor).where(Contador.nombre == nombre)).scalar()
+            if valor is None:
+                db.add(Contador(nombre=nombre, valor=_initial_counter_value(db, nombre)))
+            elif last is not None and last > valor:
+                db.execute(update(Contador).where(Contador.nombre == nombre).values(valor=last))
+    db.commit()
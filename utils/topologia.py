@@ -0,0 +1,197 @@
+# utils/topologia.py
+
+import json
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from utils.jerarquia import build_activo_path
+
+# Nodo ya emitido: su ID, su ruta materializada y los IDs de sus ancestros (de la raíz al padre)
+Nodo = namedtuple("Nodo", ["id", "path", "ancestros"])
+
+# Fila de activo generada: columnas de la tabla activos más los ancestros (para la clausura)
+ACTIVO_COLUMNS = ["id", "nombre", "tipo", "descripcion", "parent_id", "path"]
+CLAUSURA_COLUMNS = ["ancestro_id", "descendiente_id", "profundidad"]
+
+# Formato de una topología (JSON, o YAML si PyYAML está instalado):
+#
+# {
+#   "plantillas": {"nombre_plantilla": <nodo> | [<nodo>, ...]},
+#   "sitios": [<nodo>, ...]
+# }
+#
+# Cada <nodo> admite:
+#   - nombre, tipo, descripcion: patrones str.format con las variables del contexto
+#     ({n} es el índice de la repetición; {nombre} el nombre ya resuelto del nodo).
+#   - cantidad (1 por defecto) e inicio (1 por defecto) de las repeticiones.
+#   - escalable: si es true, la cantidad se multiplica por el factor --scale.
+#   - contador: nombre de un contador global; {n} continúa la numeración entre nodos hermanos.
+#   - variable: guarda el nombre resuelto en esa variable para los descendientes.
+#   - variables: {clave: patrón} con variables adicionales para los descendientes.
+#   - hijos: lista de <nodo> o de {"plantilla": "nombre_plantilla"}.
+#   - paralelo: si es true, cada repetición es un subárbol independiente que puede
+#     generarse en otro proceso. Sus descendientes no pueden usar contadores.
+
+def load_topology(path: str) -> dict:
+    """
+    Lee y valida una topología de sitio desde un archivo JSON o YAML.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Las topologías YAML requieren PyYAML (pip install pyyaml). Usa JSON en su lugar.")
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    validate_topology(spec)
+    return spec
+
+def validate_topology(spec: dict):
+    """
+    Verifica la estructura de la topología. Lanza ValueError con el primer problema encontrado.
+    """
+    if not isinstance(spec, dict) or not isinstance(spec.get("sitios"), list):
+        raise ValueError("La topología debe tener una lista 'sitios'.")
+    plantillas = spec.get("plantillas", {})
+
+    def check(node, inside_parallel, trail):
+        if "nombre" not in node or "tipo" not in node:
+            raise ValueError(f"Nodo sin 'nombre' o 'tipo' en {' > '.join(trail) or 'raíz'}.")
+        if inside_parallel and "contador" in node:
+            raise ValueError(f"El nodo '{node['nombre']}' usa un contador dentro de un subárbol paralelo.")
+        if int(node.get("cantidad", 1)) < 0:
+            raise ValueError(f"El nodo '{node['nombre']}' tiene una cantidad negativa.")
+        for child in _children(node, plantillas):
+            check(child, inside_parallel or bool(node.get("paralelo")), trail + [node["nombre"]])
+
+    for sitio in spec["sitios"]:
+        check(sitio, False, [])
+
+def _children(node: dict, plantillas: dict) -> list:
+    children = []
+    for child in node.get("hijos", []):
+        if "plantilla" in child:
+            if child["plantilla"] not in plantillas:
+                raise ValueError(f"Plantilla '{child['plantilla']}' no definida.")
+            template = plantillas[child["plantilla"]]
+            children.extend(template if isinstance(template, list) else [template])
+        else:
+            children.append(child)
+    return children
+
+def _cantidad(node: dict, scale: int) -> int:
+    cantidad = int(node.get("cantidad", 1))
+    return cantidad * scale if node.get("escalable") else cantidad
+
+def _single_size(node: dict, plantillas: dict, scale: int) -> int:
+    """
+    Número de activos que genera UNA repetición del nodo (él mismo más sus descendientes).
+    """
+    return 1 + sum(subtree_size(child, plantillas, scale) for child in _children(node, plantillas))
+
+def subtree_size(node: dict, plantillas: dict, scale: int = 1) -> int:
+    """
+    Número total de activos que genera el nodo con todas sus repeticiones.
+    """
+    return _cantidad(node, scale) * _single_size(node, plantillas, scale)
+
+def topology_size(spec: dict, scale: int = 1) -> int:
+    plantillas = spec.get("plantillas", {})
+    return sum(subtree_size(sitio, plantillas, scale) for sitio in spec["sitios"])
+
+def clausura_rows(row) -> list:
+    """
+    Filas (ancestro_id, descendiente_id, profundidad) de un activo generado, incluida la propia.
+    """
+    activo_id, ancestros = row[0], row[6]
+    depth = len(ancestros)
+    rows = [(ancestro_id, activo_id, depth - i) for i, ancestro_id in enumerate(ancestros)]
+    rows.append((activo_id, activo_id, 0))
+    return rows
+
+
+class _Estado:
+    """
+    Estado mutable de una expansión: siguiente ID a asignar y valores de los contadores globales.
+    """
+
+    def __init__(self, next_id: int):
+        self.next_id = next_id
+        self.contadores = {}
+
+    def next_n(self, node: dict, i: int) -> int:
+        inicio = int(node.get("inicio", 1))
+        if "contador" not in node:
+            return inicio + i
+        n = self.contadores.get(node["contador"], inicio)
+        self.contadores[node["contador"]] = n + 1
+        return n
+
+
+def _expand(node, ctx, parent, estado, plantillas, scale, executor, max_in_flight):
+    if node.get("paralelo") and executor is not None:
+        yield from _expand_parallel(node, ctx, parent, estado, plantillas, scale, executor, max_in_flight)
+        return
+    for i in range(_cantidad(node, scale)):
+        n = estado.next_n(node, i)
+        yield from _expand_one(node, n, ctx, parent, estado, plantillas, scale, executor, max_in_flight)
+
+def _expand_one(node, n, ctx, parent, estado, plantillas, scale, executor=None, max_in_flight=0):
+    local = dict(ctx)
+    local["n"] = n
+    for key, pattern in node.get("variables", {}).items():
+        local[key] = pattern.format(**local)
+    nombre = node["nombre"].format(**local)
+    local["nombre"] = nombre
+    if node.get("variable"):
+        local[node["variable"]] = nombre
+    tipo = node["tipo"].format(**local)
+    descripcion = node["descripcion"].format(**local) if node.get("descripcion") else None
+
+    activo_id = estado.next_id
+    estado.next_id += 1
+    if parent is None:
+        nodo = Nodo(activo_id, build_activo_path("/", activo_id), ())
+        parent_id = None
+    else:
+        nodo = Nodo(activo_id, build_activo_path(parent.path, activo_id), parent.ancestros + (parent.id,))
+        parent_id = parent.id
+
+    yield (activo_id, nombre, tipo, descripcion, parent_id, nodo.path, nodo.ancestros)
+    for child in _children(node, plantillas):
+        yield from _expand(child, local, nodo, estado, plantillas, scale, executor, max_in_flight)
+
+def _expand_parallel(node, ctx, parent, estado, plantillas, scale, executor, max_in_flight):
+    # Cada repetición recibe un bloque de IDs contiguo del tamaño exacto de su subárbol,
+    # así el resultado es idéntico (IDs y orden) al de la expansión secuencial.
+    single_size = _single_size(node, plantillas, scale)
+    pending = deque()
+    for i in range(_cantidad(node, scale)):
+        n = estado.next_n(node, i)
+        pending.append(executor.submit(_expand_subtree_task, node, n, ctx, parent, estado.next_id, plantillas, scale))
+        estado.next_id += single_size
+        # Limita los subárboles en vuelo para que la memoria no crezca con el tamaño del sitio
+        if len(pending) >= max_in_flight:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+def _expand_subtree_task(node, n, ctx, parent, first_id, plantillas, scale):
+    return list(_expand_one(node, n, ctx, parent, _Estado(first_id), plantillas, scale))
+
+def expand_topology(spec: dict, first_id: int = 1, scale: int = 1, workers: int = 1):
+    """
+    Genera perezosamente las filas de activos de la topología en orden de profundidad.
+    Cada fila es (id, nombre, tipo, descripcion, parent_id, path, ancestros).
+    Con workers > 1, los nodos marcados como 'paralelo' se generan en un pool de procesos.
+    """
+    plantillas = spec.get("plantillas", {})
+    estado = _Estado(first_id)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for sitio in spec["sitios"]:
+                yield from _expand(sitio, {}, None, estado, plantillas, scale, executor, workers * 2)
+    else:
+        for sitio in spec["sitios"]:
+            yield from _expand(sitio, {}, None, estado, plantillas, scale, None, 0)
@@ -0,0 +1,174 @@
+# utils/valoracion.py
+
+import time
+import threading
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case
+from models import InventarioItem
+from utils.arbol_activos import get_arbol_activos
+
+# Columnas de la matriz de totales (una fila por ID de activo)
+COLUMNAS = ("items", "unidades", "funcionando", "no_funcionando", "valor")
+ITEMS, UNIDADES, FUNCIONANDO, NO_FUNCIONANDO, VALOR = range(len(COLUMNAS))
+
+ESTADO_FUNCIONANDO = "Funcionando"
+ESTADO_NO_FUNCIONANDO = "No Funcionando"
+
+# Segundos antes de recalcular (recoge altas y movimientos hechos desde otros procesos)
+VALORACION_TTL_SEGUNDOS = 300
+
+def item_vector(cantidad: int, precio_estimado_usd: float, estado_funcionamiento: str) -> np.ndarray:
+    """
+    Aporte de un ítem a los totales de su ubicación y de cada ancestro.
+    """
+    vector = np.zeros(len(COLUMNAS))
+    vector[ITEMS] = 1
+    vector[UNIDADES] = cantidad or 0
+    vector[FUNCIONANDO] = estado_funcionamiento == ESTADO_FUNCIONANDO
+    vector[NO_FUNCIONANDO] = estado_funcionamiento == ESTADO_NO_FUNCIONANDO
+    vector[VALOR] = (precio_estimado_usd or 0.0) * (cantidad or 0)
+    return vector
+
+class ValoracionArbol:
+    """
+    Totales de inventario por subárbol para todos los nodos de la jerarquía de activos.
+    'propios' guarda lo ubicado directamente en cada activo y 'totales' lo de todo su subárbol,
+    ambos en matrices NumPy indexadas por ID de activo. El cálculo es de abajo hacia arriba
+    por niveles: cada nivel suma sus filas a las de sus padres en una sola operación vectorizada.
+    """
+
+    def __init__(self, arbol, rows):
+        ids_array, parent_pos_array = arbol.id_arrays()
+        ids = np.frombuffer(ids_array, dtype=np.int64) if len(ids_array) else np.empty(0, dtype=np.int64)
+        parent_pos = np.frombuffer(parent_pos_array, dtype=np.int64) if len(parent_pos_array) else np.empty(0, dtype=np.int64)
+
+        self.arbol = arbol
+        size = int(ids.max()) + 1 if len(ids) else 1
+        self.parent = np.full(size, -1, dtype=np.int64)
+        self.parent[ids] = np.where(parent_pos >= 0, ids[np.maximum(parent_pos, 0)], -1)
+
+        self.propios = np.zeros((size, len(COLUMNAS)))
+        for ubicacion_id, items, unidades, funcionando, no_funcionando, valor in rows:
+            if 0 <= ubicacion_id < size:
+                self.propios[ubicacion_id] += (items, unidades or 0, funcionando or 0, no_funcionando or 0, valor or 0.0)
+
+        self.totales = self._roll_up(ids)
+        self.creado = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _roll_up(self, ids: np.ndarray) -> np.ndarray:
+        # Profundidad de cada activo por saltos de puntero vectorizados (una pasada por nivel)
+        depth = np.zeros(len(self.parent), dtype=np.int64)
+        ancestor = self.parent[ids]
+        while True:
+            has_parent = ancestor >= 0
+            if not has_parent.any():
+                break
+            depth[ids[has_parent]] += 1
+            ancestor = np.where(has_parent, self.parent[np.maximum(ancestor, 0)], -1)
+
+        totales = self.propios.copy()
+        node_depth = depth[ids]
+        for level in range(int(node_depth.max()) if len(ids) else 0, 0, -1):
+            nodes = ids[node_depth == level]
+            np.add.at(totales, self.parent[nodes], totales[nodes])
+        return totales
+
+    def _ancestors(self, activo_id: int):
+        node = activo_id
+        steps = 0
+        while 0 <= node < len(self.parent) and steps <= len(self.parent):
+            yield node
+            node = self.parent[node]
+            steps += 1
+
+    def add(self, ubicacion_id: int, vector: np.ndarray):
+        """
+        Suma (o resta, con un vector negativo) un aporte en la ubicación y en todos sus ancestros.
+        """
+        if not 0 <= ubicacion_id < len(self.parent):
+            return
+        with self._lock:
+            self.propios[ubicacion_id] += vector
+            for node in self._ancestors(ubicacion_id):
+                self.totales[node] += vector
+
+    def move(self, old_ubicacion_id: int, new_ubicacion_id: int, vector: np.ndarray):
+        self.add(old_ubicacion_id, -vector)
+        self.add(new_ubicacion_id, vector)
+
+    def subtree(self, activo_id: int) -> dict:
+        """
+        Totales del subárbol del activo como dict {columna: valor}.
+        """
+        row = self.totales[activo_id] if 0 <= activo_id < len(self.totales) else np.zeros(len(COLUMNAS))
+        return {name: (float(row[i]) if i == VALOR else int(row[i])) for i, name in enumerate(COLUMNAS)}
+
+    def subtrees(self, activo_ids) -> dict:
+        return {activo_id: self.subtree(activo_id) for activo_id in activo_ids}
+
+
+def _ubicacion_rows(db: Session):
+    cantidad = func.coalesce(InventarioItem.cantidad, 0)
+    return db.query(
+        InventarioItem.ubicacion_id,
+        func.count(InventarioItem.id),
+        func.sum(cantidad),
+        func.sum(case((InventarioItem.estado_funcionamiento == ESTADO_FUNCIONANDO, 1), else_=0)),
+        func.sum(case((InventarioItem.estado_funcionamiento == ESTADO_NO_FUNCIONANDO, 1), else_=0)),
+        func.sum(func.coalesce(InventarioItem.precio_estimado_usd, 0.0) * cantidad)
+    ).group_by(InventarioItem.ubicacion_id).all()
+
+
+# Valoración compartida por todas las sesiones del proceso
+_valoracion = None
+_valoracion_lock = threading.Lock()
+
+def get_valoracion(db: Session) -> ValoracionArbol:
+    """
+    Obtiene la valoración del árbol, recalculándola (un GROUP BY por ubicación y una pasada vectorizada)
+    si no existe, si venció su TTL o si el árbol de activos se recargó.
+    """
+    global _valoracion
+    arbol = get_arbol_activos(db)
+    valoracion = _valoracion
+    if valoracion is None or valoracion.arbol is not arbol or time.monotonic() - valoracion.creado > VALORACION_TTL_SEGUNDOS:
+        with _valoracion_lock:
+            valoracion = _valoracion
+            if valoracion is None or valoracion.arbol is not arbol or time.monotonic() - valoracion.creado > VALORACION_TTL_SEGUNDOS:
+                valoracion = ValoracionArbol(arbol, _ubicacion_rows(db))
+                _valoracion = valoracion
+    return valoracion
+
+def record_item_valoracion(item: InventarioItem):
+    """
+    Suma un ítem nuevo a la valoración en memoria, si ya está calculada.
+    """
+    valoracion = _valoracion
+    if valoracion is not None:
+        valoracion.add(item.ubicacion_id, item_vector(item.cantidad, item.precio_estimado_usd, item.estado_funcionamiento))
+
+def move_item_valoracion(item: InventarioItem, old_ubicacion_id: int):
+    """
+    Traslada el aporte de un ítem movido de ubicación en la valoración en memoria, si ya está calculada.
+    """
+    valoracion = _valoracion
+    if valoracion is not None:
+        valoracion.move(old_ubicacion_id, item.ubicacion_id,
+                        item_vector(item.cantidad, item.precio_estimado_usd, item.estado_funcionamiento))
+
+def update_item_valoracion(item: InventarioItem, old_cantidad: int):
+    """
+    Ajusta la valoración en memoria, si ya está calculada, a la nueva cantidad de un ítem.
+    """
+    valoracion = _valoracion
+    if valoracion is not None:
+        valoracion.add(item.ubicacion_id,
+                       item_vector(item.cantidad, item.precio_estimado_usd, item.estado_funcionamiento)
+                       - item_vector(old_cantidad, item.precio_estimado_usd, item.estado_funcionamiento))
+
+def invalidate_valoracion():
+    global _valoracion
+    with _valoracion_lock:
+        _valoracion = None